@@ -0,0 +1,80 @@
+import os
+
+ASPECT_RATIOS = {"16:9": (16, 9), "9:16": (9, 16), "1:1": (1, 1)}
+# crop fills the frame and cuts the edges, pad keeps the whole picture with bars
+FIT_POLICIES = ("crop", "pad")
+ENCODE_ARGS = ["-c:v", "libx264", "-preset", "medium", "-crf", "18", "-pix_fmt", "yuv420p"]
+
+
+def aspect_suffix(aspect):
+    return aspect.replace(":", "x")
+
+
+def aspect_output_path(output_path, aspect):
+    base, ext = output_path.rsplit(".", 1)
+    return f"{base}_{aspect_suffix(aspect)}.{ext}"
+
+
+def _even(value):
+    return max(2, int(round(value / 2.0)) * 2)
+
+
+def target_size(resolution, aspect):
+    # The short side of the source is kept, e.g. 1920x1080 -> 1080x1920 for 9:16 and 1080x1080 for 1:1
+    width, height = (int(v) for v in resolution.split("x"))
+    a, b = ASPECT_RATIOS[aspect]
+    short = min(width, height)
+    if a >= b:
+        return _even(short * a / b), _even(short)
+    return _even(short), _even(short * b / a)
+
+
+def is_native(resolution, aspect):
+    width, height = (int(v) for v in resolution.split("x"))
+    a, b = ASPECT_RATIOS[aspect]
+    return abs(width * b - height * a) <= 0.01 * height * a
+
+
+def _fit_filter(resolution, aspect, policy):
+    w, h = target_size(resolution, aspect)
+    if policy == "pad":
+        return (f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+                f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,setsar=1")
+    return f"scale={w}:{h}:force_original_aspect_ratio=increase,crop={w}:{h},setsar=1"
+
+
+def build_aspect_graph(resolution, aspects, policy="crop", extra_maps=None):
+    # One split of the decoded video feeds every reframed output. Returns the filter_complex
+    # string (or None) and, per aspect, the graph label to map or None for a stream copy.
+    # extra_maps {aspect: n} asks for n more labels of the same frame, as labels[(aspect, k)],
+    # since a graph label can only be mapped to one output.
+    reframed = [a for a in aspects if not is_native(resolution, a)]
+    labels = {a: None for a in aspects}
+    if not reframed:
+        return None, labels
+    splits = "".join(f"[s{i}]" for i in range(len(reframed)))
+    chains = [f"[0:v]split={len(reframed)}{splits}" if len(reframed) > 1 else None]
+    for i, aspect in enumerate(reframed):
+        source = f"[s{i}]" if len(reframed) > 1 else "[0:v]"
+        suffix = aspect_suffix(aspect)
+        labels[aspect] = f"[v{suffix}]"
+        extra = (extra_maps or {}).get(aspect, 0)
+        if not extra:
+            chains.append(f"{source}{_fit_filter(resolution, aspect, policy)}{labels[aspect]}")
+            continue
+        for k in range(extra):
+            labels[(aspect, k)] = f"[v{suffix}_{k}]"
+        copies = "".join([labels[aspect]] + [labels[(aspect, k)] for k in range(extra)])
+        chains.append(f"{source}{_fit_filter(resolution, aspect, policy)},split={extra + 1}{copies}")
+    return ";".join(c for c in chains if c), labels
+
+
+def plan_aspect_outputs(output_path, aspects, resolution):
+    # The aspect that matches the source keeps the plain name; the others get _9x16, _1x1, ...
+    outputs = []
+    for aspect in aspects:
+        native = bool(resolution) and is_native(resolution, aspect)
+        path = output_path if native else aspect_output_path(output_path, aspect)
+        path = os.path.abspath(path)
+        outputs.append({"output_path": path, "aspect": aspect})
+    return outputs
@@ -0,0 +1,79 @@
+import os
+import sys
+import random
+import itertools
+
+# Compares duration_optimizer's plans with a brute-force search over every subset of small
+# random orders, on the NumPy path (when NumPy is installed) and on the plain-list path.
+# Every plan must reach the target, and may overshoot the best subset by at most the
+# rounding of its clips to the optimizer's grid (one step each).
+#
+#   python bench_duration_optimizer.py [cases] [seed]
+TARGET = 120.0
+# Large enough that every clip of the small orders is considered, as in the brute force
+WINDOW_FACTOR = 100.0
+
+
+def brute_force(durations, order, target):
+    # Smallest total >= target over subsets that keep the first clip, or None
+    best = None
+    rest = order[1:]
+    for r in range(len(rest) + 1):
+        for picked in itertools.combinations(rest, r):
+            total = durations[order[0]] + sum(durations[i] for i in picked)
+            if total + 1e-9 >= target and (best is None or total < best):
+                best = total
+    return best
+
+
+def _case(rng):
+    count = rng.randint(1, 11)
+    if rng.random() < 0.3:
+        # Pairs just off the 40 ms grid, where rounding every clip up or down adds up
+        durations = [round(rng.choice([20.0, 30.0, 40.0, 60.0]) + rng.choice([-0.03, -0.01, 0.01, 0.03]), 2)
+                     for _ in range(count)]
+    else:
+        durations = [round(rng.uniform(3.0, 45.0), 2) for _ in range(count)]
+    orders = [rng.sample(range(count), count) for _ in range(rng.randint(1, 4))]
+    return durations, orders
+
+
+def run(cases=500, seed=1):
+    import duration_optimizer
+    paths = [("plain list", lambda d, o: duration_optimizer._plan_without_numpy(
+        d, o, TARGET, duration_optimizer.RESOLUTION, WINDOW_FACTOR))]
+    if duration_optimizer.np is not None:
+        paths.insert(0, ("NumPy", lambda d, o: duration_optimizer.plan_compilations(
+            d, o, target=TARGET, window_factor=WINDOW_FACTOR)))
+    else:
+        print("NumPy is not installed; only the plain-list path is checked.")
+    rng = random.Random(seed)
+    problems = 0
+    for _ in range(cases):
+        durations, orders = _case(rng)
+        expected = [brute_force(durations, order, TARGET) for order in orders]
+        for name, plan in paths:
+            for order, best, got in zip(orders, expected, plan(durations, orders)):
+                if best is None and got is None:
+                    continue
+                if got is None or best is None:
+                    problem = f"plan {got} but brute force {best}"
+                elif got["total"] + 1e-9 < TARGET:
+                    problem = f"plan of {got['total']:.2f} s is under the target"
+                elif got["total"] > best + len(order) * duration_optimizer.RESOLUTION + 1e-9:
+                    problem = f"plan of {got['total']:.2f} s where {best:.2f} s exists"
+                elif sorted(got["clips"]) != sorted(set(got["clips"])) or got["clips"][0] != order[0]:
+                    problem = f"plan {got['clips']} is not a subset starting with clip {order[0]}"
+                else:
+                    continue
+                problems += 1
+                print(f"{name}: {problem}\n  durations {durations}\n  order {order}")
+    print(f"{cases} cases on {', '.join(name for name, _ in paths)}: {problems} problems")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    cases = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    sys.exit(run(cases, seed))
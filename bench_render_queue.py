@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import multiprocessing
+
+# Runs several render_queue worker processes against a temporary queue with a stand-in export,
+# then checks that every job was rendered exactly once and that batch_status agrees.
+#
+#   python bench_render_queue.py [workers] [jobs]
+JOB_SECONDS = 0.05
+LEASE_SECONDS = 2
+
+
+def fake_render(job):
+    # Appends one line per render; O_APPEND keeps lines from different processes whole.
+    # "-slow" jobs outlast a lease, so only the heartbeat keeps them from being requeued.
+    time.sleep(LEASE_SECONDS * 1.5 if "-slow" in job["output_path"] else JOB_SECONDS)
+    with open(job["log"], "a", encoding="utf-8") as f:
+        f.write(job["output_path"] + "\n")
+    return not job["output_path"].endswith("-fail")
+
+
+def _worker(queue_dir):
+    from render_queue import run_worker
+    run_worker(queue_dir, lease_seconds=LEASE_SECONDS, poll_interval=0.1, once=True, runner=fake_render)
+
+
+def run(workers=4, jobs=40):
+    from render_queue import enqueue_jobs, batch_status
+    queue_dir = tempfile.mkdtemp(prefix="legopy-queue-")
+    log = os.path.join(queue_dir, "renders.log")
+    try:
+        outputs = [f"out-{i:04d}" + ("-slow" if i % 20 == 5 else "") + ("-fail" if i % 10 == 9 else "")
+                   for i in range(jobs)]
+        batch = enqueue_jobs(queue_dir, [{"output_path": o, "files": [], "log": log} for o in outputs])
+        enqueue_jobs(queue_dir, [{"output_path": "other-batch", "files": [], "log": log}])
+        # Jobs that waited in pending for longer than a lease must still be claimed only once
+        old = time.time() - 10 * LEASE_SECONDS
+        for name in os.listdir(os.path.join(queue_dir, "pending")):
+            os.utime(os.path.join(queue_dir, "pending", name), (old, old))
+        started = time.monotonic()
+        procs = [multiprocessing.Process(target=_worker, args=(queue_dir,)) for _ in range(workers)]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+        elapsed = time.monotonic() - started
+        with open(log, "r", encoding="utf-8") as f:
+            rendered = [line.strip() for line in f if line.strip()]
+        status = batch_status(queue_dir, batch)
+    finally:
+        shutil.rmtree(queue_dir, ignore_errors=True)
+
+    twice = sorted({o for o in rendered if rendered.count(o) > 1})
+    missing = sorted(set(outputs + ["other-batch"]) - set(rendered))
+    failed = sorted(o for o in outputs if o.endswith("-fail"))
+    print(f"{workers} workers, {jobs + 1} jobs in {elapsed:.2f} s")
+    print(f"Batch status: {status['done']} done, {status['failed']} failed, "
+          f"{status['pending']} pending, {status['claimed']} claimed")
+    problems = []
+    if twice:
+        problems.append(f"rendered more than once: {', '.join(twice)}")
+    if missing:
+        problems.append(f"never rendered: {', '.join(missing)}")
+    if status["done"] != jobs - len(failed) or status["failed"] != len(failed):
+        problems.append("batch_status does not match the renders")
+    if sorted(status["failed_outputs"]) != failed:
+        problems.append("batch_status lists the wrong failed outputs")
+    for problem in problems:
+        print(f"Problem: {problem}")
+    if not problems:
+        print("Every job was rendered exactly once.")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    jobs = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    sys.exit(run(workers, jobs))
@@ -0,0 +1,56 @@
+import sys
+import subprocess
+from pathlib import Path
+
+# Modules that must not be imported before the Choose Batch menu is shown
+LAZY_MODULES = (
+    "first_batch_frame",
+    "next_batch_frame",
+    "compilations",
+    "utils",
+    "subprocess",
+    "tempfile",
+    "threading",
+)
+
+
+def measure_import_time(module="main"):
+    root = Path(__file__).resolve().parent
+    cmd = [sys.executable, "-X", "importtime", "-c", f"import {module}"]
+    result = subprocess.run(cmd, cwd=root, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Import of {module} failed:\n{result.stderr}")
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    totals = []
+    entries = []
+    for _ in range(runs):
+        entries = measure_import_time()
+        totals.append(sum(self_us for _, self_us, _ in entries))
+    imported = {name for name, _, _ in entries}
+    leaked = [name for name in LAZY_MODULES if name in imported]
+    slowest = sorted(entries, key=lambda e: e[1], reverse=True)[:10]
+
+    print(f"Startup import time over {runs} runs (ms): best {min(totals) / 1000:.1f}, worst {max(totals) / 1000:.1f}")
+    print(f"Modules imported: {len(entries)}")
+    print("Slowest modules (self ms):")
+    for name, self_us, _ in slowest:
+        print(f"  {self_us / 1000:7.2f}  {name}")
+    if leaked:
+        print(f"Eagerly imported modules that should be lazy: {', '.join(leaked)}")
+        return 1
+    print("No export modules imported at startup.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import os
+
+
+# Reverse index from each clip to every compilation or sequence that uses it. It is built in one
+# pass over the frames, so replacing or removing a clip only touches the frames that contain it.
+class ClipIndex:
+    def __init__(self, owners=()):
+        self._uses = {}
+        for owner in owners:
+            self.add(owner)
+
+    def add(self, owner):
+        for position, path in enumerate(owner.files):
+            self._uses.setdefault(os.path.abspath(path), []).append((owner, position))
+
+    def uses(self, path):
+        return list(self._uses.get(os.path.abspath(path), []))
+
+    def owners(self, path):
+        owners = []
+        for owner, _ in self.uses(path):
+            if not any(owner is seen for seen in owners):
+                owners.append(owner)
+        return owners
+
+    def replace(self, old_path, new_path):
+        # Swaps the clip at every position it is used and returns the owners that changed
+        old_path = os.path.abspath(old_path)
+        new_path = os.path.abspath(new_path)
+        for owner, position in self.uses(old_path):
+            owner.files[position] = new_path
+        changed = self.owners(old_path)
+        self._uses.setdefault(new_path, []).extend(self._uses.pop(old_path, []))
+        return changed
+
+    def remove(self, path):
+        path = os.path.abspath(path)
+        changed = self.owners(path)
+        for owner in changed:
+            owner.files = [f for f in owner.files if os.path.abspath(f) != path]
+        # Positions after the removed clip moved, so the touched owners are indexed again
+        self._uses = {p: [(o, i) for o, i in uses if not any(o is c for c in changed)]
+                      for p, uses in self._uses.items() if p != path}
+        for owner in changed:
+            self.add(owner)
+        return changed
+
+
+def replace_in_list(paths, old_path, new_path):
+    old_path = os.path.abspath(old_path)
+    return [os.path.abspath(new_path) if os.path.abspath(p) == old_path else p for p in paths]
+
+
+def remove_from_list(paths, path):
+    path = os.path.abspath(path)
+    return [p for p in paths if os.path.abspath(p) != path]
@@ -1,28 +1,189 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
-from utils import (
-    get_video_resolution,
-    get_video_duration,
-    concat_and_trim_videos,
-    ensure_folder_for_export,
-    safe_filename,
-    get_ffmpeg_path,
-    format_for_ffmpeg_concat
-)
+import threading
+
+# Rows waiting for their thumbnail; only the ones scrolled into view are requested
+_pending_thumbnails = set()
+
+
+def _is_visible(widget):
+    if not widget.winfo_viewable():
+        return False
+    top = widget.winfo_rooty()
+    bottom = top + widget.winfo_height()
+    parent = widget.master
+    while parent is not None:
+        if isinstance(parent, tk.Canvas):
+            view_top = parent.winfo_rooty()
+            if bottom < view_top or top > view_top + parent.winfo_height():
+                return False
+        parent = parent.master
+    return True
+
+
+def load_visible_thumbnails():
+    for item in list(_pending_thumbnails):
+        if not item.winfo_exists():
+            _pending_thumbnails.discard(item)
+        elif _is_visible(item):
+            _pending_thumbnails.discard(item)
+            item.load_thumbnail()
+
+
+def schedule_thumbnail_refresh(widget):
+    # Coalesces scroll and map events into one visibility pass when Tk is idle
+    root = widget.winfo_toplevel()
+    if not getattr(root, "_thumbnail_refresh_pending", False):
+        root._thumbnail_refresh_pending = True
+
+        def run():
+            root._thumbnail_refresh_pending = False
+            load_visible_thumbnails()
+        root.after_idle(run)
+
+
+def skip_duplicate_clips(widget, filepaths, then, existing=()):
+    # The same clip under two names would show up twice in every compilation. Comparing reads
+    # part of every clip (whole clips when two match), so it runs in a thread and then(kept)
+    # is called on the Tk thread once it is done.
+    from fingerprints import unique_clips, fingerprint_service
+    filepaths = [os.path.abspath(p) for p in filepaths]
+    existing = list(existing)
+
+    def finish(kept, skipped):
+        if skipped:
+            lines = [f"{os.path.basename(dup)} = {os.path.basename(orig)}" for dup, orig in skipped[:10]]
+            if len(skipped) > 10:
+                lines.append(f"... and {len(skipped) - 10} more")
+            messagebox.showwarning("Duplicate clips", "These files have the same content as another clip and were skipped:\n" + "\n".join(lines))
+        then(kept)
+
+    def work():
+        try:
+            kept, skipped = unique_clips(filepaths, existing)
+        except OSError:
+            kept, skipped = filepaths, []
+        fingerprint_service.warm_full_hashes(kept)
+        widget.after(0, finish, kept, skipped)
+    threading.Thread(target=work, daemon=True).start()
+
+
+def mark_changed(frame, changed=True):
+    # Frames whose clips were replaced or removed stay marked until they are exported again
+    frame.changed = changed
+    frame.configure(text="Changed - not exported yet" if changed else "")
+
+
+# Frames restored from a session build their clip rows a few frames at a time while the app is
+# idle, so the screen appears at once instead of after thousands of rows were created
+_deferred_rows = []
+ROWS_FRAMES_PER_STEP = 10
+
+
+def defer_file_items(frame):
+    if not _deferred_rows:
+        frame.after_idle(_build_deferred_rows, frame.winfo_toplevel())
+    _deferred_rows.append(frame)
+
+
+def _build_deferred_rows(root):
+    batch = _deferred_rows[:ROWS_FRAMES_PER_STEP]
+    del _deferred_rows[:ROWS_FRAMES_PER_STEP]
+    for frame in batch:
+        if frame.winfo_exists():
+            frame._refresh_file_items()
+    if _deferred_rows:
+        root.after(1, _build_deferred_rows, root)
+    else:
+        schedule_thumbnail_refresh(root)
+
+
+def _clip_actions_owner(widget):
+    parent = widget.master
+    while parent is not None and not hasattr(parent, "clip_actions"):
+        parent = parent.master
+    return parent
+
+
+def preview_compilation(frame):
+    # The proxy is built off the UI thread and opened in the system player when it is ready
+    if not frame.files:
+        messagebox.showinfo("Preview", "Add clips to the compilation first.")
+        return
+    files = list(frame.files)
+
+    def build():
+        from previews import build_preview
+        try:
+            path = build_preview(files)
+        except Exception as e:
+            frame.after(0, messagebox.showerror, "Preview", f"Could not build the preview:\n{e}")
+            return
+        frame.after(0, _open_preview, path)
+    threading.Thread(target=build, daemon=True).start()
+
+
+def _open_preview(path):
+    from previews import open_in_player
+    try:
+        open_in_player(path)
+    except OSError as e:
+        messagebox.showerror("Preview", f"Could not open a video player:\n{e}\n\nThe preview is at {path}")
+
 
 class FileItem(tk.Frame):
     def __init__(self, parent, filepath, move_up_cb, move_down_cb, delete_cb):
         super().__init__(parent)
         self.filepath = filepath
+        self.thumbnail = None
+        self.thumb_label = ttk.Label(self, width=8)
+        self.thumb_label.grid(row=0, column=0, sticky="w", padx=(0, 4))
         self.label = ttk.Label(self, text=os.path.basename(filepath), width=40, anchor="w")
-        self.label.grid(row=0, column=0, sticky="w")
+        self.label.grid(row=0, column=1, sticky="w")
         self.btn_up = ttk.Button(self, text="↑", width=3, command=move_up_cb)
-        self.btn_up.grid(row=0, column=1)
+        self.btn_up.grid(row=0, column=2)
         self.btn_down = ttk.Button(self, text="↓", width=3, command=move_down_cb)
-        self.btn_down.grid(row=0, column=2)
+        self.btn_down.grid(row=0, column=3)
         self.btn_delete = ttk.Button(self, text="Delete", width=6, command=delete_cb)
-        self.btn_delete.grid(row=0, column=3)
+        self.btn_delete.grid(row=0, column=4)
+        for widget in (self.thumb_label, self.label):
+            widget.bind("<Button-3>", self.show_clip_menu)
+            widget.bind("<Button-2>", self.show_clip_menu)
+        _pending_thumbnails.add(self)
+        self.bind("<Map>", lambda e: schedule_thumbnail_refresh(self))
+        self.bind("<Destroy>", lambda e: _pending_thumbnails.discard(self) if e.widget is self else None)
+
+    def show_clip_menu(self, event):
+        # The screen that holds this row decides what can be done with the clip everywhere
+        owner = _clip_actions_owner(self)
+        if owner is None:
+            return
+        menu = tk.Menu(self, tearoff=0)
+        for label, command in owner.clip_actions(self.filepath):
+            menu.add_command(label=label, command=command)
+        menu.tk_popup(event.x_root, event.y_root)
+
+    def load_thumbnail(self):
+        from thumbnails import thumbnail_cache
+        thumbnail_cache.request(self.filepath, self._thumbnail_ready)
+
+    def _thumbnail_ready(self, image_path):
+        # Called from a worker thread; the image is set on the UI thread
+        if image_path:
+            try:
+                self.after(0, self._show_thumbnail, image_path)
+            except (tk.TclError, RuntimeError):
+                pass
+
+    def _show_thumbnail(self, image_path):
+        if not self.winfo_exists():
+            return
+        try:
+            self.thumbnail = tk.PhotoImage(file=image_path)
+        except tk.TclError:
+            return
+        self.thumb_label.configure(image=self.thumbnail, width=0)
 
 class ScrollableFrame(ttk.Frame):
     def __init__(self, container, *args, **kwargs):
@@ -35,12 +196,164 @@ class ScrollableFrame(ttk.Frame):
             lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
         )
         canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
+
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            schedule_thumbnail_refresh(canvas)
+        canvas.configure(yscrollcommand=on_scroll)
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
 
+class RenderQueuePanel(ttk.Frame):
+    def __init__(self, parent, collect_jobs):
+        super().__init__(parent)
+        self.collect_jobs = collect_jobs
+        self.batch_id = None
+        self.queue_dir = None
+        self.status_var = tk.StringVar(value="")
+        ttk.Button(self, text="Send to Render Queue", command=self.send_to_queue).pack(fill="x")
+        ttk.Label(self, textvariable=self.status_var).pack(anchor="center", pady=(2, 0))
+
+    def send_to_queue(self):
+        from utils import load_settings, save_setting
+        jobs = self.collect_jobs()
+        if not jobs:
+            messagebox.showinfo("Render Queue", "No compilations to send.")
+            return
+        queue_dir = load_settings().get("render_queue_dir")
+        if not queue_dir or not os.path.isdir(queue_dir):
+            queue_dir = filedialog.askdirectory(title="Choose the shared render queue folder")
+            if not queue_dir:
+                return
+            save_setting("render_queue_dir", queue_dir)
+        from render_queue import enqueue_jobs
+        self.queue_dir = queue_dir
+        self.batch_id = enqueue_jobs(queue_dir, jobs)
+        self.status_var.set(f"Queued {len(jobs)} jobs")
+        self.after(2000, self.poll_status)
+
+    def poll_status(self):
+        if not self.batch_id or not self.winfo_exists():
+            return
+        from render_queue import batch_status
+        status = batch_status(self.queue_dir, self.batch_id)
+        total = sum(status[k] for k in ("pending", "claimed", "done", "failed"))
+        finished = status["done"] + status["failed"]
+        text = f"Queue: {status['done']}/{total} done, {status['claimed']} rendering"
+        if status["failed"]:
+            text += f", {status['failed']} failed"
+        self.status_var.set(text)
+        if finished < total:
+            self.after(2000, self.poll_status)
+        elif status["failed"]:
+            messagebox.showerror("Render Queue", "Failed to export: " + ", ".join(status["failed_outputs"]))
+
+
+class DeliveryPanel(ttk.Frame):
+    # What to deliver (aspect ratios, languages, copies, MP4 layout, loudness); remembered per project code
+    def __init__(self, parent, get_project_code):
+        super().__init__(parent)
+        from aspect_ratios import ASPECT_RATIOS, FIT_POLICIES
+        from utils import load_project_setting
+        self.get_project_code = get_project_code
+        code = get_project_code()
+        # Nothing ticked means the sequences are copied in the source's own format, as before
+        saved = load_project_setting(code, "aspect_ratios", [])
+        formats_row = ttk.Frame(self)
+        formats_row.pack(anchor="center")
+        self.aspect_vars = {}
+        ttk.Label(formats_row, text="Formats:").pack(side="left")
+        for aspect in ASPECT_RATIOS:
+            var = tk.BooleanVar(value=aspect in saved)
+            self.aspect_vars[aspect] = var
+            ttk.Checkbutton(formats_row, text=aspect, variable=var, command=self.save).pack(side="left", padx=2)
+        self.policy_var = tk.StringVar(value=load_project_setting(code, "aspect_policy", FIT_POLICIES[0]))
+        policy_box = ttk.Combobox(formats_row, textvariable=self.policy_var, values=FIT_POLICIES, state="readonly", width=5)
+        policy_box.pack(side="left", padx=(6, 0))
+        policy_box.bind("<<ComboboxSelected>>", lambda e: self.save())
+        ttk.Label(formats_row, text="Languages:").pack(side="left", padx=(10, 0))
+        self.languages_var = tk.StringVar(value=load_project_setting(code, "languages", ""))
+        languages_entry = ttk.Entry(formats_row, textvariable=self.languages_var, width=12)
+        languages_entry.pack(side="left", padx=(2, 0))
+        languages_entry.bind("<FocusOut>", lambda e: self.save())
+        copies_row = ttk.Frame(self)
+        copies_row.pack(anchor="center", pady=(2, 0))
+        self.destination_list = list(load_project_setting(code, "destinations", []))
+        self.destinations_var = tk.StringVar()
+        ttk.Label(copies_row, textvariable=self.destinations_var).pack(side="left")
+        ttk.Button(copies_row, text="Add copy folder...", command=self.add_destination).pack(side="left", padx=(6, 2))
+        ttk.Button(copies_row, text="Clear", command=self.clear_destinations).pack(side="left")
+        from utils import MP4_LAYOUTS
+        self.mp4_layout_var = tk.StringVar(value=MP4_LAYOUTS.get(load_project_setting(code, "mp4_layout", "standard"), "Standard"))
+        ttk.Label(copies_row, text="MP4:").pack(side="left", padx=(10, 0))
+        layout_box = ttk.Combobox(copies_row, textvariable=self.mp4_layout_var, values=list(MP4_LAYOUTS.values()),
+                                  state="readonly", width=10)
+        layout_box.pack(side="left", padx=(2, 0))
+        layout_box.bind("<<ComboboxSelected>>", lambda e: self.save())
+        from loudness import LOUDNESS_TARGETS
+        self.loudness_var = tk.StringVar(value=load_project_setting(code, "loudness", "Off"))
+        ttk.Label(copies_row, text="Loudness:").pack(side="left", padx=(10, 0))
+        loudness_box = ttk.Combobox(copies_row, textvariable=self.loudness_var, values=list(LOUDNESS_TARGETS),
+                                    state="readonly", width=9)
+        loudness_box.pack(side="left", padx=(2, 0))
+        loudness_box.bind("<<ComboboxSelected>>", lambda e: self.save())
+        self._show_destinations()
+
+    def selected_aspects(self):
+        return [aspect for aspect, var in self.aspect_vars.items() if var.get()]
+
+    def policy(self):
+        return self.policy_var.get()
+
+    def languages(self):
+        from languages import parse_languages
+        return parse_languages(self.languages_var.get())
+
+    def destinations(self):
+        return list(self.destination_list)
+
+    def mp4_layout(self):
+        from utils import MP4_LAYOUTS
+        return next((key for key, label in MP4_LAYOUTS.items() if label == self.mp4_layout_var.get()), "standard")
+
+    def delivery_options(self):
+        from loudness import LOUDNESS_TARGETS
+        return {"destinations": self.destinations(), "mp4_layout": self.mp4_layout(),
+                "loudness_target": LOUDNESS_TARGETS.get(self.loudness_var.get())}
+
+    def _show_destinations(self):
+        if not self.destination_list:
+            self.destinations_var.set("Copies: none")
+        else:
+            self.destinations_var.set("Copies: " + ", ".join(os.path.basename(d.rstrip("/\\")) or d for d in self.destination_list))
+
+    def add_destination(self):
+        folder = filedialog.askdirectory(title="Choose a folder that gets a copy of every export")
+        if not folder or folder in self.destination_list:
+            return
+        self.destination_list.append(folder)
+        self._show_destinations()
+        self.save()
+
+    def clear_destinations(self):
+        self.destination_list = []
+        self._show_destinations()
+        self.save()
+
+    def save(self):
+        from utils import save_project_setting
+        code = self.get_project_code()
+        save_project_setting(code, "aspect_ratios", self.selected_aspects())
+        save_project_setting(code, "aspect_policy", self.policy())
+        save_project_setting(code, "languages", self.languages_var.get().strip())
+        save_project_setting(code, "destinations", self.destination_list)
+        save_project_setting(code, "mp4_layout", self.mp4_layout())
+        save_project_setting(code, "loudness", self.loudness_var.get())
+
+
 class BaseCompilationFrame(ttk.LabelFrame):
-    def __init__(self, parent, index, on_delete_callback, files=None, allow_rename=True, name=None, duplicate_callback=None, export_checkbox=False):
+    def __init__(self, parent, index, on_delete_callback, files=None, allow_rename=True, name=None, duplicate_callback=None, export_checkbox=False,
+                 lazy_rows=False):
         super().__init__(parent)
         self.files = [os.path.abspath(f) for f in files] if files else []
         self.on_delete_callback = on_delete_callback
@@ -60,9 +373,13 @@ class BaseCompilationFrame(ttk.LabelFrame):
             ttk.Checkbutton(self, text="Export", variable=self.export_var).grid(row=0, column=4, padx=2, pady=4)
         self.files_frame = ttk.Frame(self)
         self.files_frame.grid(row=1, column=0, columnspan=5, sticky="ew")
-        self._refresh_file_items()
+        if lazy_rows:
+            defer_file_items(self)
+        else:
+            self._refresh_file_items()
         self.btn_add = ttk.Button(self, text="Add files", command=self.add_files_dialog)
         self.btn_add.grid(row=2, column=0, sticky="w", padx=(5,0), pady=(2,5))
+        ttk.Button(self, text="Preview", command=lambda: preview_compilation(self)).grid(row=2, column=1, sticky="w", padx=2, pady=(2,5))
 
     def set_name(self, name):
         self.name_var.set(name)
@@ -120,44 +437,24 @@ class BaseCompilationFrame(ttk.LabelFrame):
         return self.export_var.get() if self.export_var is not None else True
 
     # --- Tips Compilation export to '2min'
+    def build_export_job(self, duration_sec=120):
+        from utils import safe_filename, ensure_folder_for_export
+        from export_jobs import make_job
+        name = self.get_name() or "compilation"
+        out_dir = ensure_folder_for_export(self.files[0], folder_name="2min")
+        return make_job("concat", self.files, os.path.join(out_dir, safe_filename(name) + ".mp4"),
+                        error_log="tips_export_error.log")
+
     def export(self, duration_sec=120):
         if not self.files or not self.should_export():
             return False
-        try:
-            name = self.get_name() or "compilation"
-            safe_name = safe_filename(name) + ".mp4"
-            first_file = self.files[0]
-            # --- tips always to 2min folder
-            out_dir = ensure_folder_for_export(first_file, folder_name="2min")
-            output_path = os.path.join(out_dir, safe_name)
-            import tempfile
-            with tempfile.TemporaryDirectory() as tmpdir:
-                concat_list = os.path.join(tmpdir, "files.txt")
-                with open(concat_list, "w", encoding="utf-8") as f:
-                    for video_path in self.files:
-                        f.write(f"file '{format_for_ffmpeg_concat(video_path)}'\n")
-                ffmpeg_path = get_ffmpeg_path()
-                cmd = [
-                    ffmpeg_path, "-y", "-f", "concat", "-safe", "0",
-                    "-i", concat_list,
-                    "-c", "copy", output_path
-                ]
-                import subprocess
-                result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                if result.returncode != 0:
-                    with open(os.path.join(out_dir, "tips_export_error.log"), "w", encoding="utf-8") as logf:
-                        logf.write(f"CMD: {' '.join(cmd)}\n")
-                        logf.write(f"RET: {result.returncode}\n")
-                        logf.write(f"STDOUT:\n{result.stdout}\n\nSTDERR:\n{result.stderr}")
-                    return False
-            return True
-        except Exception as e:
-            with open(os.path.join(out_dir, "tips_export_error.log"), "a", encoding="utf-8") as logf:
-                logf.write(str(e))
-            return False
+        # The export engine is only loaded once something is actually exported
+        from export_jobs import run_export_job
+        return run_export_job(self.build_export_job(duration_sec))
 
 class CompilationFrame(ttk.LabelFrame):
-    def __init__(self, parent, index, on_delete_callback, files=None, allow_rename=True, name=None, duplicate_callback=None, export_checkbox=False):
+    def __init__(self, parent, index, on_delete_callback, files=None, allow_rename=True, name=None, duplicate_callback=None, export_checkbox=False,
+                 lazy_rows=False):
         super().__init__(parent)
         self.files = [os.path.abspath(f) for f in files] if files else []
         self.on_delete_callback = on_delete_callback
@@ -177,9 +474,13 @@ class CompilationFrame(ttk.LabelFrame):
             ttk.Checkbutton(self, text="Export", variable=self.export_var).grid(row=0, column=4, padx=2, pady=4)
         self.files_frame = ttk.Frame(self)
         self.files_frame.grid(row=1, column=0, columnspan=5, sticky="ew")
-        self._refresh_file_items()
+        if lazy_rows:
+            defer_file_items(self)
+        else:
+            self._refresh_file_items()
         self.btn_add = ttk.Button(self, text="Add files", command=self.add_files_dialog)
         self.btn_add.grid(row=2, column=0, sticky="w", padx=(5,0), pady=(2,5))
+        ttk.Button(self, text="Preview", command=lambda: preview_compilation(self)).grid(row=2, column=1, sticky="w", padx=2, pady=(2,5))
 
     def set_name(self, name):
         self.name_var.set(name)
@@ -225,26 +526,33 @@ class CompilationFrame(ttk.LabelFrame):
     def should_export(self):
         return self.export_var.get() if self.export_var is not None else True
 
-    def export(self, duration_sec=120):
+    def build_export_job(self, duration_sec=120, files=None, targets=None, suffix=""):
+        # Nazwa pliku wynikowego: nazwa pliku + _(MM'SS).mp4
+        # Each target duration is cut from the same concat and lands in its own folder (2min, 1min30s, ...).
+        # suffix (_v2, _v3, ...) tells apart variants that open with the same clip.
+        from utils import get_video_duration, ensure_folder_for_export, duration_folder
+        from export_jobs import make_job
+        files = files or self.files
+        targets = sorted(targets or [duration_sec], reverse=True)
+        first_file = files[0]
+        total_duration = get_video_duration(first_file)
+        mm = int(total_duration // 60)
+        ss = int(total_duration % 60)
+        base_name = os.path.splitext(os.path.basename(first_file))[0]
+        output_name = f"{base_name}{suffix}_({mm:02d}'{ss:02d}).mp4"
+        outputs = [
+            {"duration_sec": target,
+             "output_path": os.path.join(ensure_folder_for_export(first_file, folder_name=duration_folder(target)), output_name)}
+            for target in targets
+        ]
+        return make_job("concat_trim", files, outputs[0]["output_path"], duration_sec=targets[0],
+                        error_log="tips_export_error.log", extra_outputs=outputs[1:])
+
+    def export(self, duration_sec=120, targets=None):
         if not self.files or not self.should_export():
             return False
-        try:
-            first_file = self.files[0]
-            # Nazwa pliku wynikowego: nazwa pliku + _(MM'SS).mp4
-            from utils import get_video_duration, concat_and_trim_videos, ensure_folder_for_export
-            total_duration = get_video_duration(first_file)
-            mm = int(total_duration // 60)
-            ss = int(total_duration % 60)
-            base_name = os.path.splitext(os.path.basename(first_file))[0]
-            output_name = f"{base_name}_({mm:02d}'{ss:02d}).mp4"
-            out_dir = ensure_folder_for_export(first_file, folder_name="2min")
-            output_path = os.path.join(out_dir, output_name)
-            concat_and_trim_videos(self.files, output_path, duration_sec=120)
-            return True
-        except Exception as e:
-            with open(os.path.join(os.path.dirname(self.files[0]), "tips_export_error.log"), "a", encoding="utf-8") as logf:
-                logf.write(str(e))
-            return False
+        from export_jobs import run_export_job
+        return run_export_job(self.build_export_job(duration_sec, targets=targets))
 
 
 class SequenceCompilationFrame(BaseCompilationFrame):
@@ -252,42 +560,54 @@ class SequenceCompilationFrame(BaseCompilationFrame):
         super().__init__(*args, export_checkbox=export_checkbox, **kwargs)
 
     # --- Sequence Compilation export to 'sequences/comp1'
-    def export(self, duration_sec=120):
+    def build_export_job(self, duration_sec=120, aspects=None, aspect_policy="crop", languages=None):
+        return _sequence_export_job(self.get_name(), self.files, aspects, aspect_policy, languages)
+
+    def export(self, duration_sec=120, aspects=None, aspect_policy="crop", languages=None):
         if not self.files or not self.should_export():
             return False
-        try:
-            name = self.get_name() or "sequence"
-            safe_name = safe_filename(name) + ".mp4"
-            first_file = self.files[0]
-            base_dir = os.path.dirname(first_file)
-            out_dir = os.path.join(base_dir, "sequences", "comp1")
-            os.makedirs(out_dir, exist_ok=True)
-            output_path = os.path.join(out_dir, safe_name)
-            import tempfile
-            with tempfile.TemporaryDirectory() as tmpdir:
-                concat_list = os.path.join(tmpdir, "files.txt")
-                with open(concat_list, "w", encoding="utf-8") as f:
-                    for video_path in self.files:
-                        f.write(f"file '{format_for_ffmpeg_concat(video_path)}'\n")
-                ffmpeg_path = get_ffmpeg_path()
-                cmd = [
-                    ffmpeg_path, "-y", "-f", "concat", "-safe", "0",
-                    "-i", concat_list,
-                    "-c", "copy", output_path
-                ]
-                import subprocess
-                result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                if result.returncode != 0:
-                    with open(os.path.join(out_dir, "sequence_export_error.log"), "w", encoding="utf-8") as logf:
-                        logf.write(f"CMD: {' '.join(cmd)}\n")
-                        logf.write(f"RET: {result.returncode}\n")
-                        logf.write(f"STDOUT:\n{result.stdout}\n\nSTDERR:\n{result.stderr}")
-                    return False
-            return True
-        except Exception as e:
-            with open(os.path.join(out_dir, "sequence_export_error.log"), "a", encoding="utf-8") as logf:
-                logf.write(str(e))
-            return False
+        from export_jobs import run_export_job
+        return run_export_job(self.build_export_job(duration_sec, aspects=aspects, aspect_policy=aspect_policy,
+                                                    languages=languages))
+
+def _sequence_export_job(name, files, aspects=None, aspect_policy="crop", languages=None):
+    from utils import safe_filename
+    from export_jobs import make_concat_job
+    out_dir = os.path.join(os.path.dirname(files[0]), "sequences", "comp1")
+    return make_concat_job(files, os.path.join(out_dir, safe_filename(name or "sequence") + ".mp4"),
+                           error_log="sequence_export_error.log", aspects=aspects, aspect_policy=aspect_policy,
+                           languages=languages)
+
+
+class ListedSequence:
+    # A selected sequence past MAX_SEQUENCE_FRAMES: exported like a frame but without widgets.
+    # It has the few frame methods ClipIndex, mark_changed and the export code use.
+    def __init__(self, name, files):
+        self.name = name
+        self.files = files
+        self.changed = False
+
+    def get_name(self):
+        return self.name
+
+    def should_export(self):
+        return True
+
+    def _refresh_file_items(self):
+        pass
+
+    def configure(self, **kwargs):
+        pass
+
+    def build_export_job(self, duration_sec=120, aspects=None, aspect_policy="crop", languages=None):
+        return _sequence_export_job(self.name, self.files, aspects, aspect_policy, languages)
+
+
+# Variant 0 with every hook and intro, which is what was built before patterns existed
+DEFAULT_SEQUENCE_PATTERN = "V0H*I*"
+# Patterns like V*H*I* select thousands of cells; only this many get a frame on screen
+MAX_SEQUENCE_FRAMES = 100
+
 
 class SequenceCompilationsManager:
     def __init__(self, parent, get_global_resolution_ref, get_hooks_compilations, get_tips_compilations, get_project_code, get_intro_files=None):
@@ -298,6 +618,11 @@ class SequenceCompilationsManager:
         self.get_project_code = get_project_code
         self.get_intro_files = get_intro_files or (lambda: [])
         self.sequence_frames = []
+        # Selected sequences beyond MAX_SEQUENCE_FRAMES, exported with the frames
+        self.listed_sequences = []
+        self._plan = None
+        self._plan_key = None
+        self._loaded_key = None
         self.progress_var = tk.DoubleVar()
 
         button_frame = ttk.Frame(parent)
@@ -305,12 +630,24 @@ class SequenceCompilationsManager:
         ttk.Label(button_frame, text="Sequence Compilations", font=("Arial", 15, "bold")).pack(anchor="center")
         self.btn_add_empty_sequence = ttk.Button(button_frame, text="Add Empty Sequence Compilation", command=self.add_empty_sequence)
         self.btn_add_empty_sequence.pack(pady=5)
+        pattern_frame = ttk.Frame(parent)
+        pattern_frame.pack(fill="x", padx=5)
+        ttk.Label(pattern_frame, text="Pattern:").pack(side="left")
+        self.pattern_var = tk.StringVar(value=DEFAULT_SEQUENCE_PATTERN)
+        pattern_entry = ttk.Entry(pattern_frame, textvariable=self.pattern_var, width=22)
+        pattern_entry.pack(side="left", padx=4)
+        pattern_entry.bind("<Return>", lambda e: self.apply_pattern())
+        ttk.Button(pattern_frame, text="Apply", command=self.apply_pattern).pack(side="left")
+        self.selection_var = tk.StringVar()
+        ttk.Label(pattern_frame, textvariable=self.selection_var, foreground="gray").pack(side="left", padx=8)
         self.container_sequences = ScrollableFrame(parent)
         self.container_sequences.pack(fill="both", expand=True, padx=5, pady=5)
         self.progress_bar = ttk.Progressbar(parent, variable=self.progress_var, maximum=100)
         self.progress_bar.pack(side="bottom", fill="x", padx=20, pady=(0,2))
         export_frame = ttk.Frame(parent)
         export_frame.pack(side="bottom", fill="x", padx=20, pady=(2, 12))
+        self.delivery_panel = DeliveryPanel(export_frame, get_project_code)
+        self.delivery_panel.pack(anchor="center", pady=(0, 4))
         self.btn_export_sequences = ttk.Button(export_frame, text="Export Sequence Compilations", command=self.export_sequences)
         self.btn_export_sequences.pack(anchor="center")
 
@@ -364,80 +701,145 @@ class SequenceCompilationsManager:
         for i, seq in enumerate(self.sequence_frames):
             seq.set_name(self._build_sequence_name(i, 0))
 
-    def load_sequences(self):
-        for frame in getattr(self, "sequence_frames", []):
+    def _append_sequence_frame(self, name, files, export=True, lazy_rows=False):
+        seq_frame = SequenceCompilationFrame(
+            self.container_sequences.scrollable_frame,
+            index=len(self.sequence_frames),
+            on_delete_callback=self.remove_sequence,
+            duplicate_callback=self.duplicate_sequence,
+            allow_rename=True,
+            name=name,
+            files=files,
+            export_checkbox=True,
+            lazy_rows=lazy_rows
+        )
+        seq_frame.export_var.set(export)
+        seq_frame.pack(fill="x", pady=5)
+        self.sequence_frames.append(seq_frame)
+        return seq_frame
+
+    def restore_sequences(self, saved_sequences):
+        for frame in self.sequence_frames:
             frame.destroy()
         self.sequence_frames = []
+        for name, files, export in saved_sequences:
+            self._append_sequence_frame(name, files, export, lazy_rows=True)
+        # Only the frames are saved; the cells past them come from the pattern again
+        self.listed_sequences = []
+        selection = self._selection()
+        if selection is not None:
+            plan, selection = selection
+            self.listed_sequences = self._listed(plan, selection)
+        self.mark_loaded()
+
+    def all_sequences(self):
+        return self.sequence_frames + self.listed_sequences
+
+    def _inputs(self):
+        # Every Tips compilation keeps its slot, even when empty, so V numbers in the output
+        # names stay the same when a compilation is cleared
+        variants = tuple(tuple(comp.files) for comp in self.get_tips_compilations())
+        hooks = tuple(comp.files[0] if comp.files else None for comp in self.get_hooks_compilations())
+        intros = tuple(self.get_intro_files() or [])
+        return variants, hooks, intros
+
+    def build_plan(self):
+        # Reused while the clips stay the same, so clip sizes are only read once
+        from sequence_plan import SequencePlan
+        key = self._inputs()
+        if key != self._plan_key:
+            self._plan = SequencePlan(*key)
+            self._plan_key = key
+        return self._plan
+
+    def mark_loaded(self):
+        # The frames match the current clips and pattern; load_sequences leaves them alone
+        # (with their names and Export boxes) until one of those changes
+        self._loaded_key = (self._inputs(), self.pattern_var.get(), self.get_project_code())
+
+    def _selection(self):
+        plan = self.build_plan()
+        if not any(plan.variants):
+            return None
+        try:
+            return plan, plan.select(self.pattern_var.get())
+        except ValueError:
+            return None
+
+    def _listed(self, plan, selection):
+        listed = []
+        for n, (variant_idx, hook_idx, intro_idx) in enumerate(selection):
+            if n >= MAX_SEQUENCE_FRAMES:
+                name = self._build_sequence_name(variant_idx, hook_idx, intro_idx if plan.has_intros else None)
+                listed.append(ListedSequence(name, plan.files_for(variant_idx, hook_idx, intro_idx)))
+        return listed
+
+    def apply_pattern(self):
+        try:
+            self.build_plan().select(self.pattern_var.get())
+        except ValueError as e:
+            messagebox.showerror("Sequence pattern", f"{e}\nUse e.g. V0-4H*, V*H1I0 or V0H*; V1-2H0")
+            return
+        # Apply always rebuilds, even for the same pattern, to undo edits to the frames
+        self._loaded_key = None
+        self.load_sequences()
 
-        tips_compilations = self.get_tips_compilations()
-        hooks_compilations = self.get_hooks_compilations()
-        intro_files = list(self.get_intro_files() or [])
-
-        if not tips_compilations or not tips_compilations[0].files:
+    def load_sequences(self):
+        key = (self._inputs(), self.pattern_var.get(), self.get_project_code())
+        if key == self._loaded_key:
             return
+        self._loaded_key = key
+        for frame in self.sequence_frames:
+            frame.destroy()
+        self.sequence_frames = []
+        self.listed_sequences = []
 
-        base_tip_files = tips_compilations[0].files
-        base_sequences = [(0, 0, base_tip_files.copy())]
-
-        for idx, hook_comp in enumerate(hooks_compilations, start=1):
-            if not hook_comp.files:
-                continue
-            combined_files = hook_comp.files[:1] + base_tip_files
-            base_sequences.append((0, idx, combined_files))
-
-        def append_sequence(name: str, files):
-            seq_frame = SequenceCompilationFrame(
-                self.container_sequences.scrollable_frame,
-                index=len(self.sequence_frames),
-                on_delete_callback=self.remove_sequence,
-                duplicate_callback=self.duplicate_sequence,
-                allow_rename=True,
-                name=name,
-                files=files,
-                export_checkbox=True
-            )
-            seq_frame.pack(fill="x", pady=5)
-            self.sequence_frames.append(seq_frame)
-
-        for variant_idx, hook_idx, files in base_sequences:
-            if intro_files:
-                for intro_idx, intro_path in enumerate(intro_files):
-                    name = self._build_sequence_name(variant_idx, hook_idx, intro_idx)
-                    append_sequence(name, [intro_path] + files)
-            else:
-                name = self._build_sequence_name(variant_idx, hook_idx)
-                append_sequence(name, files)
+        plan = self.build_plan()
+        if not any(plan.variants):
+            self.selection_var.set("")
+            return
+        selection = self._selection()
+        if selection is None:
+            self.selection_var.set("Invalid pattern")
+            return
+        selection = selection[1]
+        total = len(selection)
+        gigabytes = selection.estimated_bytes() / 1024 ** 3
+        text = f"{total} of {len(plan)} sequences, ~{gigabytes:.1f} GB"
+        if total > MAX_SEQUENCE_FRAMES:
+            text += f" (first {MAX_SEQUENCE_FRAMES} shown, all exported)"
+        self.selection_var.set(text)
+
+        # Only the selected cells of the matrix get a frame, and only the first ones on screen
+        for n, (variant_idx, hook_idx, intro_idx) in enumerate(selection):
+            if n >= MAX_SEQUENCE_FRAMES:
+                break
+            name = self._build_sequence_name(variant_idx, hook_idx, intro_idx if plan.has_intros else None)
+            self._append_sequence_frame(name, plan.files_for(variant_idx, hook_idx, intro_idx))
+        self.listed_sequences = self._listed(plan, selection)
+
+    def export_files(self):
+        return {f for seq in self.all_sequences() if seq.should_export() for f in seq.files}
+
+    def collect_jobs(self, frames=None):
+        from export_jobs import with_delivery_options
+        panel = self.delivery_panel
+        jobs = [cf.build_export_job(aspects=panel.selected_aspects(), aspect_policy=panel.policy(), languages=panel.languages())
+                for cf in (self.all_sequences() if frames is None else frames) if cf.files and cf.should_export()]
+        return with_delivery_options(jobs, **panel.delivery_options())
 
     def export_sequences(self):
         if not self.sequence_frames:
             messagebox.showinfo("Export", "No sequences to export.")
             return
-        base_res = None
-        for cf in self.sequence_frames:
-            for f in cf.files:
-                if not base_res:
-                    base_res = get_video_resolution(f)
-                elif get_video_resolution(f) != base_res:
-                    messagebox.showerror("Resolution mismatch", "Not all files in all sequences have the same resolution!")
-                    return
-        errors = []
-        count = 0
-        total = len(self.sequence_frames)
-        for idx, cf in enumerate(self.sequence_frames):
-            if hasattr(cf, "should_export") and not cf.should_export():
-                continue
-            if not cf.files:
-                continue
-            try:
-                ok = cf.export()
-                if not ok:
-                    errors.append(cf.get_name())
-                else:
-                    count += 1
-            except Exception as e:
-                errors.append(cf.get_name())
-            progress_percent = ((idx + 1) / total) * 100
-            self.progress_var.set(progress_percent)
+        from utils import get_video_resolution
+        if len({get_video_resolution(f) for f in self.export_files()}) > 1:
+            messagebox.showerror("Resolution mismatch", "Not all files in all sequences have the same resolution!")
+            return
+        from export_jobs import run_export_jobs
+        jobs = self.collect_jobs()
+        errors = run_export_jobs(jobs, on_progress=lambda done, total: self.progress_var.set(done / total * 100))
+        count = len(jobs) - len(errors)
         self.progress_var.set(0)
         if errors:
             messagebox.showerror("Export error", f"Failed to export: {', '.join(errors)}")
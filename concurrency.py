@@ -0,0 +1,118 @@
+import os
+import time
+import threading
+
+# Per kind of work: (start, most) parallel jobs. Stream copies are bound by the source disk or
+# the NAS link, encodes by the CPU, probes are small reads that mostly wait on latency.
+def default_budgets():
+    cores = os.cpu_count() or 2
+    return {"probe": (4, 16), "copy": (2, 6), "encode": (max(1, cores // 2), cores)}
+
+
+ADJUST_INTERVAL = 2.0
+# Stall percentages (avg10 of /proc/pressure "some") above which a kind backs off, and
+# below which it may grow
+PRESSURE_HIGH = 40.0
+PRESSURE_LOW = 10.0
+ENCODE_MEMORY = 768 * 1024 ** 2
+# After a step up that did not pay off, the limit stays below it for this long
+CEILING_SECONDS = 30.0
+
+
+def read_pressure(resource):
+    # Share of the last 10 s in which some task stalled on io/cpu/memory; None without PSI
+    try:
+        with open(f"/proc/pressure/{resource}", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("some"):
+                    return float(line.split("avg10=")[1].split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+    return None
+
+
+def mem_available():
+    try:
+        with open("/proc/meminfo", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, IndexError, ValueError):
+        return None
+    return None
+
+
+# Keeps one limit per kind and moves it with the measured load: one step up while the
+# resource is idle and the last step up paid off in throughput, halved when it stalls.
+class ConcurrencyController:
+    def __init__(self, budgets=None, read_pressure=read_pressure, mem_available=mem_available):
+        self.budgets = budgets or default_budgets()
+        self.limits = {kind: start for kind, (start, _) in self.budgets.items()}
+        self.running = {kind: 0 for kind in self.budgets}
+        self._read_pressure = read_pressure
+        self._mem_available = mem_available
+        self._lock = threading.Lock()
+        self._bytes = {kind: 0 for kind in self.budgets}
+        self._last_rate = {kind: None for kind in self.budgets}
+        self._grew = {kind: False for kind in self.budgets}
+        self._ceiling = {}
+        self._last_adjust = time.monotonic()
+        self.history = []
+
+    @property
+    def max_workers(self):
+        return sum(most for _, most in self.budgets.values())
+
+    def can_start(self, kind):
+        with self._lock:
+            return self.running.get(kind, 0) < self.limits.get(kind, 1)
+
+    def started(self, kind):
+        with self._lock:
+            self.running[kind] = self.running.get(kind, 0) + 1
+
+    def finished(self, kind, processed_bytes=0):
+        with self._lock:
+            self.running[kind] -= 1
+            self._bytes[kind] = self._bytes.get(kind, 0) + processed_bytes
+
+    def _resource(self, kind):
+        return "cpu" if kind == "encode" else "io"
+
+    def _capped(self, kind, limit, now):
+        ceiling, until = self._ceiling.get(kind, (None, 0))
+        return ceiling is not None and now < until and limit >= ceiling
+
+    def adjust(self, now=None):
+        now = now or time.monotonic()
+        elapsed = now - self._last_adjust
+        if elapsed < ADJUST_INTERVAL:
+            return False
+        self._last_adjust = now
+        pressure = {resource: self._read_pressure(resource) for resource in ("io", "cpu")}
+        memory = self._mem_available()
+        with self._lock:
+            for kind, (_, most) in self.budgets.items():
+                rate = self._bytes[kind] / elapsed
+                self._bytes[kind] = 0
+                limit = self.limits[kind]
+                stall = pressure[self._resource(kind)]
+                busy = self.running[kind] >= limit
+                if stall is not None and stall > PRESSURE_HIGH:
+                    limit = max(1, limit // 2)
+                elif kind == "encode" and memory is not None and memory < ENCODE_MEMORY * 2:
+                    limit = max(1, limit - 1)
+                elif self._grew[kind] and self._last_rate[kind] and rate < self._last_rate[kind] * 1.05:
+                    # The extra job did not add throughput, so the device is already saturated
+                    self._ceiling[kind] = (limit, now + CEILING_SECONDS)
+                    limit = max(1, limit - 1)
+                elif busy and (stall is None or stall < PRESSURE_LOW) and not self._capped(kind, limit + 1, now):
+                    if kind != "encode" or memory is None or memory > ENCODE_MEMORY * (limit + 1):
+                        limit = min(most, limit + 1)
+                self._grew[kind] = limit > self.limits[kind]
+                if rate or busy:
+                    self._last_rate[kind] = rate
+                self.limits[kind] = limit
+            self.history.append((now, dict(self.limits), pressure, memory))
+            del self.history[:-100]
+        return True
@@ -0,0 +1,125 @@
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    # Plain Python lists do the same steps instead; slower on huge batches but the same plans
+    np = None
+
+# Durations are grouped on a 40 ms grid (one frame at 25 fps)
+RESOLUTION = 0.04
+# Only clips near the start of each order are considered, so a variant keeps its own opening
+WINDOW_FACTOR = 3.0
+
+
+def plan_compilations(durations, orders, target=120.0, resolution=RESOLUTION, window_factor=WINDOW_FACTOR):
+    # For every order (a list of clip indexes) pick the clips that reach target with the
+    # smallest overshoot, so the final trim only cuts that overshoot instead of whole clips.
+    # The first clip of each order is always kept and chosen clips keep their order. All
+    # orders are solved together with one dynamic-programming step per clip position.
+    # Returns {"clips", "total", "overshoot"} per order, or None if it cannot reach target.
+    #
+    # Sums are indexed on the grid, but each cell keeps the longest real total that lands on
+    # it, so a plan is always checked against the real seconds: rounding can never pass off a
+    # 119.99 s set as 2:00, and the plan is at most one grid step per clip over the best one.
+    if np is None:
+        return _plan_without_numpy(durations, orders, target, resolution, window_factor)
+    d = np.asarray(durations, dtype=float)
+    if not len(orders):
+        return []
+    width = max(len(o) for o in orders)
+    order_idx = np.full((len(orders), width), -1, dtype=np.int64)
+    for v, order in enumerate(orders):
+        order_idx[v, :len(order)] = order
+    valid = order_idx >= 0
+    seconds = np.where(valid, d[np.clip(order_idx, 0, None)], 0.0)
+    weights = np.maximum(np.round(seconds / resolution).astype(np.int64), 0)
+    t = int(np.ceil(target / resolution))
+    before = np.cumsum(weights, axis=1) - weights
+    active = valid & (weights > 0) & (before < window_factor * t)
+    active[:, 0] = valid[:, 0]
+    steps = int(np.max(np.nonzero(active.any(axis=0))[0], initial=0)) + 1
+    # A minimal-overshoot subset never exceeds target + longest clip, plus half a grid step of
+    # rounding per clip, so larger sums are dropped
+    cap = t + int(weights.max(initial=0)) + steps // 2 + 1
+
+    n_orders = len(orders)
+    rows = np.arange(n_orders)[:, None]
+    cols = np.arange(cap + 1)[None, :]
+    longest = np.full((n_orders, cap + 1), -np.inf)
+    longest[np.arange(n_orders), np.minimum(weights[:, 0], cap)] = np.where(valid[:, 0], seconds[:, 0], -np.inf)
+    history = []
+    for j in range(1, steps):
+        shift = np.where(active[:, j], weights[:, j], 0)[:, None]
+        src = cols - shift
+        taken = longest[rows, np.clip(src, 0, None)] + seconds[:, j][:, None]
+        took = (taken > longest) & (src >= 0) & (shift > 0)
+        history.append(np.packbits(took, axis=1))
+        longest = np.where(took, taken, longest)
+
+    reached = np.where(longest + 1e-9 >= target, longest, np.inf)
+    best = np.argmin(reached, axis=1)
+    plans = []
+    for v in range(n_orders):
+        s = int(best[v])
+        if not np.isfinite(reached[v, s]):
+            plans.append(None)
+            continue
+        chosen = []
+        for j in range(steps - 1, 0, -1):
+            if np.unpackbits(history[j - 1][v], count=cap + 1)[s]:
+                chosen.append(j)
+                s -= int(weights[v, j])
+        chosen.append(0)
+        clips = [int(order_idx[v, j]) for j in reversed(chosen)]
+        total = float(d[clips].sum())
+        plans.append({"clips": clips, "total": total, "overshoot": max(0.0, total - target)})
+    return plans
+
+
+def _plan_without_numpy(durations, orders, target, resolution, window_factor):
+    # Same steps as above, one order at a time, with a list per step instead of an array
+    if not len(orders):
+        return []
+    t = int(math.ceil(target / resolution))
+
+    plans = []
+    for order in orders:
+        if not order:
+            plans.append(None)
+            continue
+        w = [max(int(round(durations[i] / resolution)), 0) for i in order]
+        window = 1
+        before = w[0]
+        while window < len(order) and before < window_factor * t:
+            before += w[window]
+            window += 1
+        cap = t + max(w) + window // 2 + 1
+        longest = [-math.inf] * (cap + 1)
+        longest[min(w[0], cap)] = durations[order[0]]
+        history = []
+        for j in range(1, window):
+            if w[j] <= 0:
+                history.append(None)
+                continue
+            seconds = durations[order[j]]
+            taken = [-math.inf] * w[j] + [total + seconds for total in longest[:cap + 1 - w[j]]]
+            took = [a > b for a, b in zip(taken, longest)]
+            history.append(took)
+            longest = [a if took_here else b for a, b, took_here in zip(taken, longest, took)]
+
+        reached = [(total, s) for s, total in enumerate(longest) if total + 1e-9 >= target]
+        if not reached:
+            plans.append(None)
+            continue
+        s = min(reached)[1]
+        chosen = []
+        for j in range(len(history), 0, -1):
+            if history[j - 1] is not None and history[j - 1][s]:
+                chosen.append(j)
+                s -= w[j]
+        chosen.append(0)
+        clips = [order[j] for j in reversed(chosen)]
+        total = float(sum(durations[i] for i in clips))
+        plans.append({"clips": clips, "total": total, "overshoot": max(0.0, total - target)})
+    return plans
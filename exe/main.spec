@@ -1,11 +1,15 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
+import shutil
 
+# ffmpeg-bin is shipped next to the executable instead of inside the one-file archive, so
+# launches no longer extract it and the app runs ffmpeg straight from that folder.
 
 a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[('ffmpeg-bin', 'ffmpeg-bin')],
+    datas=[],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -36,3 +40,6 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+
+# SPECPATH is this folder, so the build works from any working directory
+shutil.copytree(os.path.join(SPECPATH, 'ffmpeg-bin'), os.path.join(DISTPATH, 'ffmpeg-bin'), dirs_exist_ok=True)
@@ -0,0 +1,240 @@
+import os
+import sys
+import hmac
+import json
+import time
+import uuid
+import secrets
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8765
+
+
+TOKEN_HEADER = "X-LegoPy-Token"
+
+
+def daemon_port():
+    return int(os.environ.get("LEGOPY_DAEMON_PORT") or DEFAULT_PORT)
+
+
+def daemon_file():
+    # Port and token of the running daemon. Only the user's own data folder can read it, so a
+    # web page or another account on the machine cannot submit jobs that write files as this user.
+    from utils import user_data_dir
+    return os.path.join(user_data_dir("daemon"), "daemon.json")
+
+
+def _write_daemon_file(port, token):
+    path = daemon_file()
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"port": port, "token": token, "pid": os.getpid()}, f)
+
+
+def read_daemon_file():
+    try:
+        with open(daemon_file(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Long-running export service. Probe results, clip signatures and merged intermediates stay
+# in memory between submissions, so only the first job touching a clip pays for probing it.
+class ExportDaemon:
+    def __init__(self, workers=2):
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.batches = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def submit(self, jobs):
+        batch_id = uuid.uuid4().hex[:12]
+        batch = {"total": len(jobs), "done": 0, "failed": [], "running": 0, "submitted_at": time.time()}
+        with self._lock:
+            self.batches[batch_id] = batch
+        for job in jobs:
+            self.executor.submit(self._run, batch, job)
+        return batch_id
+
+    def _run(self, batch, job):
+        from export_jobs import run_export_job
+        with self._lock:
+            batch["running"] += 1
+        ok = False
+        try:
+            ok = run_export_job(job)
+        finally:
+            with self._lock:
+                batch["running"] -= 1
+                batch["done"] += 1
+                if not ok:
+                    batch["failed"].append(os.path.basename(job["output_path"]))
+
+    def batch_status(self, batch_id):
+        with self._lock:
+            batch = self.batches.get(batch_id)
+            return dict(batch, failed=list(batch["failed"])) if batch else None
+
+    def probe(self, paths):
+        from probes import probe_cache
+        return {p: probe_cache.get(p) for p in paths}
+
+    def status(self):
+        from intermediates import intermediate_cache
+        from probes import probe_cache
+        return {
+            "pid": os.getpid(),
+            "uptime": time.time() - self.started_at,
+            "probe_cache_entries": len(probe_cache),
+            "intermediates": intermediate_cache.stats(),
+            "batches": len(self.batches)
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    export_daemon = None
+    token = ""
+
+    def _reply(self, code, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _authorized(self):
+        if hmac.compare_digest(self.headers.get(TOKEN_HEADER) or "", self.token):
+            return True
+        self._reply(403, {"error": "missing or wrong token"})
+        return False
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path == "/status":
+            return self._reply(200, self.export_daemon.status())
+        if self.path.startswith("/batches/"):
+            status = self.export_daemon.batch_status(self.path.rsplit("/", 1)[-1])
+            return self._reply(200 if status else 404, status or {"error": "unknown batch"})
+        self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        # Browsers can send text/plain forms anywhere without asking; only JSON is accepted
+        if (self.headers.get("Content-Type") or "").split(";")[0].strip().lower() != "application/json":
+            return self._reply(415, {"error": "expected application/json"})
+        try:
+            body = self._body()
+        except ValueError:
+            return self._reply(400, {"error": "invalid JSON"})
+        if self.path == "/jobs":
+            return self._reply(200, {"batch": self.export_daemon.submit(body.get("jobs", []))})
+        if self.path == "/probe":
+            return self._reply(200, self.export_daemon.probe(body.get("paths", [])))
+        self._reply(404, {"error": "not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=None, workers=2):
+    _Handler.export_daemon = ExportDaemon(workers=workers)
+    _Handler.token = secrets.token_hex(32)
+    # Bound to localhost only; the daemon runs exports for the user who started it, and every
+    # request must carry the token from that user's daemon file
+    server = ThreadingHTTPServer(("127.0.0.1", port or daemon_port()), _Handler)
+    _write_daemon_file(server.server_address[1], _Handler.token)
+    print(f"LegoPy export daemon listening on 127.0.0.1:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        info = read_daemon_file()
+        if info and info.get("token") == _Handler.token:
+            os.remove(daemon_file())
+
+
+class DaemonClient:
+    def __init__(self, port=None, timeout=5.0, token=None):
+        if token is None:
+            info = read_daemon_file() or {}
+            token = info.get("token", "")
+            port = port or info.get("port")
+        self.base_url = f"http://127.0.0.1:{port or daemon_port()}"
+        self.token = token
+        self.timeout = timeout
+
+    def _request(self, path, payload=None):
+        import urllib.request
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, headers={"Content-Type": "application/json", TOKEN_HEADER: self.token})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def is_running(self):
+        try:
+            self._request("/status")
+            return True
+        except OSError:
+            return False
+
+    def status(self):
+        return self._request("/status")
+
+    def submit(self, jobs):
+        return self._request("/jobs", {"jobs": jobs})["batch"]
+
+    def batch_status(self, batch_id):
+        return self._request(f"/batches/{batch_id}")
+
+    def probe(self, paths):
+        return self._request("/probe", {"paths": list(paths)})
+
+    def wait(self, batch_id, on_progress=None, poll_interval=0.5):
+        while True:
+            status = self.batch_status(batch_id)
+            if on_progress:
+                on_progress(status["done"], status["total"])
+            if status["done"] >= status["total"]:
+                return status
+            time.sleep(poll_interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LegoPy export daemon")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_cmd = sub.add_parser("serve", help="run the daemon in the foreground")
+    serve_cmd.add_argument("--port", type=int, default=None)
+    serve_cmd.add_argument("--workers", type=int, default=2)
+    submit_cmd = sub.add_parser("submit", help="submit a JSON file with a list of export jobs and wait")
+    submit_cmd.add_argument("jobs_file")
+    sub.add_parser("status", help="show daemon and cache status")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.port, args.workers)
+        return 0
+    client = DaemonClient()
+    if args.command == "status":
+        print(json.dumps(client.status(), indent=1))
+        return 0
+    with open(args.jobs_file, "r", encoding="utf-8") as f:
+        jobs = json.load(f)
+    status = client.wait(client.submit(jobs), on_progress=lambda done, total: print(f"{done}/{total}", flush=True))
+    if status["failed"]:
+        print("Failed: " + ", ".join(status["failed"]))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+import os
+import time
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Preflight first, then outputs whose inputs are ready before new intermediates, so a merged
+# file is cut into its outputs while it is still in the cache and the page cache
+STAGE_PRIORITY = {"probe": 0, "preflight": 1, "loudness": 2, "output": 3, "intermediate": 4}
+# Which concurrency budget a node draws from; outputs decide once their inputs are probed
+BUDGETS = {"probe": "probe", "preflight": "probe", "loudness": "encode", "intermediate": "copy", "output": "copy"}
+PROBE_WEIGHT = 1024 ** 2
+
+
+class _Node:
+    def __init__(self, key, kind, run, deps, weight, label, budget):
+        self.key = key
+        self.kind = kind
+        self.budget = budget or BUDGETS.get(kind, "copy")
+        self.run = run
+        self.deps = set(deps)
+        self.dependents = []
+        self.weight = weight
+        self.label = label
+        self.ok = None
+        self.rank = 0
+        # A failed critical node stops the batch; nothing that has not started yet runs
+        self.critical = False
+
+
+# A DAG of export work. Shared nodes (a clip's probe, a merged intermediate) are added once
+# however many outputs need them; each node runs after everything it depends on has finished.
+class ExportGraph:
+    def __init__(self):
+        self.nodes = {}
+        self.disk_budget = None
+        self.error = None
+
+    def add(self, key, kind, run, deps=(), weight=1, label=None, budget=None, unique=False):
+        # budget is a kind name or a callable returning one when the node is about to start.
+        # unique nodes (outputs) must not be merged: a second one would silently be dropped.
+        if key in self.nodes:
+            if unique:
+                raise ValueError(f"{label or key[-1]} is written by more than one export")
+            return key
+        self.nodes[key] = _Node(key, kind, run, deps, weight, label, budget)
+        return key
+
+    def _priority(self, node):
+        # Lower runs first: stage, then the planned locality order, then nodes that unblock
+        # the most work
+        return (STAGE_PRIORITY.get(node.kind, 9), node.rank, -len(node.dependents))
+
+    def run(self, controller=None, on_progress=None):
+        # Returns the labels of failed output nodes, or the error of a failed critical node.
+        # on_progress(done_weight, total_weight) is called from the calling thread and covers
+        # every node, so preflight, merges and outputs all move one figure. The controller
+        # decides how many nodes of each budget kind run at once and re-tunes that as it goes.
+        from concurrency import ConcurrencyController, ADJUST_INTERVAL
+        controller = controller or ConcurrencyController()
+        budget = self.disk_budget
+        for node in self.nodes.values():
+            node.deps &= self.nodes.keys()
+            for dep in node.deps:
+                self.nodes[dep].dependents.append(node.key)
+        total = sum(node.weight for node in self.nodes.values()) or 1
+        waiting = {key: len(node.deps) for key, node in self.nodes.items()}
+        ready = []
+        for node in self.nodes.values():
+            if not node.deps:
+                self._push(ready, node)
+        state = {"done": 0, "finished": 0, "running": 0}
+        lock = threading.Condition()
+
+        def complete(node, ok):
+            # Called with the lock held
+            node.ok = ok
+            state["done"] += node.weight
+            state["finished"] += 1
+            if not ok and node.critical:
+                self.error = self.error or node.label
+            for key in node.dependents:
+                waiting[key] -= 1
+                if waiting[key] == 0:
+                    self._push(ready, self.nodes[key])
+            lock.notify_all()
+
+        def execute(node):
+            started = time.monotonic()
+            try:
+                ok = node.run() is not False
+            except Exception:
+                ok = False
+            controller.finished(node.budget, node.weight)
+            if budget is not None:
+                budget.release(node.key)
+            with lock:
+                node.seconds = time.monotonic() - started
+                state["running"] -= 1
+                complete(node, ok)
+
+        def take_startable():
+            # Highest priority ready nodes whose budget still has room; the rest wait their turn
+            launch, skipped = [], []
+            while ready:
+                entry = heapq.heappop(ready)
+                node = self.nodes[entry[2]]
+                if self.error:
+                    complete(node, False)
+                    continue
+                if callable(node.budget):
+                    node.budget = node.budget() or "copy"
+                if not controller.can_start(node.budget):
+                    skipped.append(entry)
+                elif budget is not None and not budget.reserve(node.key):
+                    if state["running"] or launch:
+                        # The disk is too full for this one until running exports finish
+                        skipped.append(entry)
+                    else:
+                        node.critical = True
+                        node.label = f"Not enough free space to write {node.label or 'a merged clip'}"
+                        complete(node, False)
+                else:
+                    controller.started(node.budget)
+                    launch.append(node)
+            for entry in skipped:
+                heapq.heappush(ready, entry)
+            state["running"] += len(launch)
+            return launch
+
+        reported = 0
+        with ThreadPoolExecutor(max_workers=controller.max_workers) as pool:
+            while True:
+                controller.adjust()
+                with lock:
+                    launch = take_startable()
+                    if not launch and state["done"] == reported and state["finished"] < len(self.nodes):
+                        lock.wait(timeout=ADJUST_INTERVAL)
+                        launch = take_startable()
+                    done, finished = state["done"], state["finished"]
+                for node in launch:
+                    pool.submit(execute, node)
+                if on_progress and done != reported:
+                    on_progress(done, total)
+                reported = done
+                if finished == len(self.nodes):
+                    break
+        self.controller = controller
+        if self.error:
+            return [self.error]
+        return [node.label for node in self.nodes.values() if node.kind == "output" and not node.ok]
+
+    def _push(self, ready, node):
+        self._counter = getattr(self, "_counter", 0) + 1
+        heapq.heappush(ready, (self._priority(node), self._counter, node.key))
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _output_budget(job):
+    # Reframed aspect ratios are encoded; everything else is a stream copy (audio-only
+    # filters such as loudness are cheap next to reading the clips)
+    from export_jobs import job_outputs
+    aspects = {o.get("aspect") for o in job_outputs(job) if o.get("aspect")}
+    if not aspects:
+        return "copy"
+    from aspect_ratios import is_native
+    from probes import probe_cache
+    # Only the cached probe is read: this runs while the scheduler holds its lock
+    cached = probe_cache.peek(job["files"][0])
+    resolution = cached["probe"].get("resolution") if cached else None
+    if not resolution or any(not is_native(resolution, aspect) for aspect in aspects):
+        return "encode"
+    return "copy"
+
+
+def _merge(graph, files):
+    # The merge is what reads the clips of a trimmed export, so that is where the page cache is
+    # measured; a merge already in the cache reads nothing
+    from utils import merged_intermediate
+    from intermediates import intermediate_cache
+    if intermediate_cache.lookup(intermediate_cache.key_for(files)) is None:
+        graph.read_ahead.measure(files)
+    return bool(merged_intermediate(files))
+
+
+def build_export_graph(jobs):
+    # probe(clip) -> [loudness(clip)] -> [intermediate(clips)] -> output(job). Clips shared by
+    # many jobs are probed and measured once; trims of the same clips share one merge.
+    from export_jobs import run_export_job
+    from probes import probe_cache
+    from locality import order_by_locality, ReadAhead
+    from export_jobs import job_outputs
+    written = set()
+    for job in jobs:
+        for output in job_outputs(job):
+            path = os.path.abspath(output["output_path"])
+            if path in written:
+                raise ValueError(f"{os.path.basename(path)} is written by more than one export")
+            written.add(path)
+    graph = ExportGraph()
+    from scratch import DiskBudget, estimate_job_outputs, estimate_intermediate
+    order = order_by_locality(jobs)
+    graph.read_ahead = ReadAhead(jobs, order)
+    graph.disk_budget = DiskBudget()
+    writers = []
+
+    def probe_node(path):
+        return graph.add(("probe", path), "probe", lambda: probe_cache.get(path)["duration"] > 0,
+                         weight=PROBE_WEIGHT)
+
+    for job in jobs:
+        for path in job["files"]:
+            probe_node(path)
+
+    def preflight():
+        # Runs once every clip is probed: sizes every merge and output and stops the batch
+        # before anything is written if a disk would fill up halfway
+        for key, estimate in writers:
+            graph.disk_budget.estimate(key, estimate())
+        if not graph.disk_budget.check():
+            graph.nodes[("disk",)].label = graph.disk_budget.error
+            return False
+        return True
+    gate = graph.add(("disk",), "preflight", preflight, deps=[key for key in graph.nodes], weight=PROBE_WEIGHT)
+    graph.nodes[gate].critical = True
+    # Jobs are added in locality order, so a shared merge takes the rank of its first output
+    for rank, index in enumerate(order):
+        job = jobs[index]
+        deps = [("probe", path) for path in job["files"]] + [gate]
+        input_bytes = sum(_size(path) for path in job["files"])
+        if job.get("loudness_target") is not None:
+            from loudness import loudness_cache
+            for path in job["files"]:
+                deps.append(graph.add(("loudness", path), "loudness",
+                                      lambda path=path: loudness_cache.measure([path])[path] is not None,
+                                      deps=[("probe", path), gate], weight=_size(path) // 4 or 1))
+        if job["kind"] == "concat_trim":
+            files = list(job["files"])
+            key = ("intermediate",) + tuple(files)
+            if key not in graph.nodes:
+                graph.add(key, "intermediate", lambda files=files: _merge(graph, files),
+                          deps=[("probe", path) for path in files] + [gate], weight=input_bytes or 1)
+                graph.nodes[key].rank = rank
+                writers.append((key, lambda files=files: estimate_intermediate(files)))
+            deps.append(key)
+        key = graph.add(("output", job["output_path"]), "output",
+                        lambda index=index, job=job: graph.read_ahead.run(index, lambda: run_export_job(job),
+                                                                          measure=job["kind"] != "concat_trim"),
+                        deps=deps, weight=input_bytes or 1, label=os.path.basename(job["output_path"]),
+                        budget=lambda job=job: _output_budget(job), unique=True)
+        graph.nodes[key].rank = rank
+        writers.append((key, lambda job=job: estimate_job_outputs(job)))
+    return graph
+
+
+def run_export_graph(jobs, on_progress=None, controller=None):
+    from locality import last_report
+    try:
+        graph = build_export_graph(jobs)
+    except ValueError as e:
+        # Two jobs with one output file: report it like a failed export instead of writing one
+        return [str(e)]
+    failed = graph.run(controller=controller, on_progress=on_progress)
+    last_report["summary"] = graph.read_ahead.summary()
+    return failed
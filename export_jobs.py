@@ -0,0 +1,248 @@
+import os
+import json
+import hashlib
+import threading
+
+MANIFEST_NAME = ".legopy_manifest.json"
+_manifest_lock = threading.Lock()
+
+
+def make_job(kind, files, output_path, duration_sec=None, error_log="export_error.log", extra_outputs=(),
+             aspect=None, aspect_policy="crop", destinations=(), mp4_layout=None):
+    # kind is "concat" (stream copy of the whole list) or "concat_trim" (cut to duration_sec).
+    # extra_outputs are further outputs ({"output_path" plus "duration_sec", "aspect" or
+    # "language"/"audio_files"}) written by the same ffmpeg process as the main output.
+    return {
+        "kind": kind,
+        "files": [os.path.abspath(f) for f in files],
+        "output_path": os.path.abspath(output_path),
+        "duration_sec": duration_sec,
+        "aspect": aspect,
+        "aspect_policy": aspect_policy,
+        "extra_outputs": [
+            {"duration_sec": extra.get("duration_sec"), "aspect": extra.get("aspect"),
+             "language": extra.get("language"),
+             "audio_files": [os.path.abspath(f) for f in extra.get("audio_files", [])],
+             "output_path": os.path.abspath(extra["output_path"])}
+            for extra in extra_outputs
+        ],
+        "destinations": [os.path.abspath(d) for d in destinations],
+        "mp4_layout": mp4_layout,
+        "error_log": error_log
+    }
+
+
+def with_delivery_options(jobs, destinations=(), mp4_layout=None, loudness_target=None):
+    # destinations: extra folders (delivery share, backup disk) that receive a copy of every
+    # output; mp4_layout: None/"standard", "faststart" (moov first) or "fragmented";
+    # loudness_target: integrated loudness in LUFS the clips are normalized to, or None
+    for job in jobs:
+        job["destinations"] = [os.path.abspath(d) for d in destinations]
+        job["mp4_layout"] = None if mp4_layout == "standard" else mp4_layout
+        job["loudness_target"] = loudness_target
+    return jobs
+
+
+def make_concat_job(files, output_path, error_log="export_error.log", aspects=None, aspect_policy="crop", languages=None):
+    # Stream copy, or one decode reframed into every requested aspect ratio. Language variants
+    # take the video of the source-format output (or the first one when every format is
+    # reframed) with each language's audio, and are named after it with _T_ES, _T_DE, ...
+    outputs = [{"output_path": output_path, "aspect": None}]
+    if aspects:
+        from aspect_ratios import plan_aspect_outputs
+        from utils import get_video_resolution
+        resolution = get_video_resolution(files[0])
+        # Without a resolution nothing can be reframed, so the export stays a plain stream copy
+        if resolution:
+            outputs = plan_aspect_outputs(output_path, aspects, resolution)
+        if len(outputs) == 1 and outputs[0]["output_path"] == os.path.abspath(output_path):
+            # Only the source's own aspect ratio was asked for: a plain stream copy, as before
+            outputs = [{"output_path": output_path, "aspect": None}]
+    missing = {}
+    if languages:
+        from languages import plan_language_outputs
+        base = next((o for o in outputs if os.path.abspath(o["output_path"]) == os.path.abspath(output_path)), outputs[0])
+        language_outputs, missing = plan_language_outputs(files, base["output_path"], languages, base["aspect"])
+        outputs += language_outputs
+    job = make_job("concat", files, outputs[0]["output_path"], error_log=error_log, extra_outputs=outputs[1:],
+                   aspect=outputs[0]["aspect"], aspect_policy=aspect_policy)
+    if missing:
+        job["missing_languages"] = missing
+    return job
+
+
+def job_outputs(job):
+    # Every file the job writes, the main output first
+    main = {"output_path": job["output_path"], "duration_sec": job.get("duration_sec"), "aspect": job.get("aspect")}
+    return [main] + [dict(extra, aspect=extra.get("aspect")) for extra in job.get("extra_outputs", [])]
+
+
+def effective_inputs(job, duration_sec=None):
+    # A trimmed export only depends on the clips that start before the cut
+    duration_sec = duration_sec or job.get("duration_sec")
+    if job["kind"] != "concat_trim" or not duration_sec:
+        return list(job["files"])
+    from utils import get_video_duration
+    used = []
+    elapsed = 0.0
+    for f in job["files"]:
+        if elapsed >= duration_sec:
+            break
+        used.append(f)
+        elapsed += get_video_duration(f)
+    return used
+
+
+def job_input_key(job, output=None):
+    # Inputs count by content, so moving or renaming a source clip does not force a re-export
+    from fingerprints import clip_fingerprint
+    output = output or job_outputs(job)[0]
+    duration_sec = output.get("duration_sec")
+    digest = hashlib.sha256()
+    digest.update(f"{job['kind']}|{duration_sec}".encode("utf-8"))
+    if output.get("aspect"):
+        digest.update(f"|{output['aspect']}|{job.get('aspect_policy')}".encode("utf-8"))
+    if job.get("mp4_layout"):
+        digest.update(f"|{job['mp4_layout']}".encode("utf-8"))
+    if job.get("loudness_target") is not None and not output.get("language"):
+        digest.update(f"|{job['loudness_target']}LUFS".encode("utf-8"))
+    if output.get("language"):
+        digest.update(f"|{output['language']}".encode("utf-8"))
+        for f in output["audio_files"]:
+            digest.update(f"|{clip_fingerprint(f)}".encode("utf-8"))
+    for f in effective_inputs(job, duration_sec):
+        digest.update(f"|{clip_fingerprint(f)}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _manifest_path(output_path):
+    return os.path.join(os.path.dirname(output_path), MANIFEST_NAME)
+
+
+def _read_manifest(output_path):
+    try:
+        with open(_manifest_path(output_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def is_up_to_date(job):
+    for output in job_outputs(job):
+        output_path = output["output_path"]
+        if not os.path.isfile(output_path):
+            return False
+        recorded = _read_manifest(output_path).get(os.path.basename(output_path))
+        if recorded != job_input_key(job, output):
+            return False
+    return all(os.path.isfile(path) for paths in job_copies(job).values() for path in paths)
+
+
+def record_export(job):
+    for output in job_outputs(job):
+        output_path = output["output_path"]
+        key = job_input_key(job, output)
+        with _manifest_lock:
+            manifest = _read_manifest(output_path)
+            manifest[os.path.basename(output_path)] = key
+            target = _manifest_path(output_path)
+            # Workers on other processes or machines may update the same folder's manifest
+            tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=1)
+            os.replace(tmp_path, target)
+
+
+def destination_path(job, output_path, root):
+    # Mirrors the output's place below the clips folder (2min/..., sequences/comp1/...) under root
+    relative = os.path.relpath(output_path, os.path.dirname(job["files"][0]))
+    if relative.startswith(".."):
+        relative = os.path.basename(output_path)
+    return os.path.join(root, relative)
+
+
+def job_copies(job):
+    # {output_path: [the same file in every extra destination]}
+    roots = job.get("destinations") or []
+    return {
+        output["output_path"]: [destination_path(job, output["output_path"], root) for root in roots]
+        for output in job_outputs(job)
+    } if roots else {}
+
+
+def run_export_job(job):
+    from utils import concat_videos, concat_and_trim_videos, concat_to_aspect_ratios
+    out_dir = os.path.dirname(job["output_path"])
+    outputs = job_outputs(job)
+    copies = job_copies(job)
+    try:
+        audio_filter = None
+        if job.get("loudness_target") is not None:
+            from loudness import gain_filter
+            audio_filter = gain_filter(effective_inputs(job), job["loudness_target"])
+        for output in outputs:
+            os.makedirs(os.path.dirname(output["output_path"]), exist_ok=True)
+        for path in (p for paths in copies.values() for p in paths):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if job["kind"] == "concat_trim":
+            concat_and_trim_videos(job["files"], job["output_path"], duration_sec=job["duration_sec"],
+                                   extra_outputs=[(o["duration_sec"], o["output_path"]) for o in outputs[1:]],
+                                   copies=copies, mp4_layout=job.get("mp4_layout"), audio_filter=audio_filter)
+        elif len(outputs) > 1 or job.get("aspect"):
+            concat_to_aspect_ratios(job["files"], [(o["aspect"], o["output_path"]) for o in outputs if not o.get("language")],
+                                    policy=job.get("aspect_policy") or "crop",
+                                    language_outputs=[(o["language"], o["audio_files"], o["output_path"], o.get("aspect"))
+                                                      for o in outputs if o.get("language")],
+                                    copies=copies, mp4_layout=job.get("mp4_layout"), audio_filter=audio_filter)
+        else:
+            concat_videos(job["files"], job["output_path"], copies=copies, mp4_layout=job.get("mp4_layout"), audio_filter=audio_filter)
+        record_export(job)
+        if job.get("missing_languages"):
+            with open(os.path.join(out_dir, job["error_log"]), "a", encoding="utf-8") as logf:
+                for language, clips in job["missing_languages"].items():
+                    logf.write(f"\n{job['output_path']}\nNo {language} audio for: {', '.join(clips)}\n")
+        return True
+    except Exception as e:
+        with open(os.path.join(out_dir, job["error_log"]), "a", encoding="utf-8") as logf:
+            logf.write(f"\n{job['output_path']}\n{e}\n")
+        return False
+
+
+# (daemon file mtime, client or None) from the last check
+_daemon_check = [None, None]
+
+
+def _connected_daemon():
+    # Only probes when a daemon has written its file, and only again once that file changes,
+    # so exports without a daemon never wait on a connection
+    if os.environ.get("LEGOPY_NO_DAEMON"):
+        return None
+    from export_daemon import DaemonClient, daemon_file
+    try:
+        stamp = os.stat(daemon_file()).st_mtime_ns
+    except OSError:
+        return None
+    if _daemon_check[0] != stamp:
+        client = DaemonClient(timeout=1.0)
+        _daemon_check[:] = [stamp, client if client.is_running() else None]
+    return _daemon_check[1]
+
+
+def run_export_jobs(jobs, on_progress=None):
+    # Hands the jobs to a running export daemon when there is one, otherwise renders in-process.
+    # Returns the output file names that failed.
+    if not jobs:
+        return []
+    client = _connected_daemon()
+    if client is not None:
+        client.timeout = 30.0
+        try:
+            batch_id = client.submit(jobs)
+        except OSError:
+            # The daemon stopped since it was last seen; export here and check again next time
+            _daemon_check[:] = [None, None]
+        else:
+            return client.wait(batch_id, on_progress=on_progress)["failed"]
+    # Shared clips are probed, measured and merged once, then every output runs from the graph
+    from export_graph import run_export_graph
+    return run_export_graph(jobs, on_progress=on_progress)
@@ -0,0 +1,153 @@
+import os
+import mmap
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+SAMPLE_BYTES = 64 * 1024
+MIDDLE_SAMPLES = 16
+FULL_HASH_CHUNK = 4 * 1024 ** 2
+
+
+def sampled_fingerprint(path):
+    # Size plus the head, the tail and evenly spaced chunks in between. Renders that differ
+    # anywhere meaningful (length, header, moov, any stretch of frames) get a different value.
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        digest = hashlib.blake2b(str(size).encode("ascii"), digest_size=16)
+        if size <= SAMPLE_BYTES * (MIDDLE_SAMPLES + 2):
+            digest.update(f.read())
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                stride = (size - SAMPLE_BYTES) // (MIDDLE_SAMPLES + 1)
+                for i in range(MIDDLE_SAMPLES + 2):
+                    offset = min(i * stride, size - SAMPLE_BYTES)
+                    digest.update(view[offset:offset + SAMPLE_BYTES])
+    return f"{size:x}-{digest.hexdigest()}"
+
+
+def full_hash(path):
+    digest = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(FULL_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Content identity for clips, so a copy or a rename of a tip is recognised and a path that was
+# overwritten with a new render is not. Results are remembered per inode and mtime, so a clip is
+# only sampled again once it changes.
+class FingerprintService:
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _stat_key(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None, None
+        return (st.st_dev, st.st_ino), (st.st_size, st.st_mtime_ns)
+
+    def _entry(self, path):
+        inode, version = self._stat_key(path)
+        if inode is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(inode)
+            if entry and entry["version"] == version:
+                return entry
+        try:
+            sampled = sampled_fingerprint(path)
+        except (OSError, ValueError):
+            return None
+        entry = {"version": version, "sampled": sampled, "full": None}
+        with self._lock:
+            self._entries[inode] = entry
+        return entry
+
+    def fingerprint(self, path):
+        entry = self._entry(path)
+        return entry["sampled"] if entry else None
+
+    def known(self, path):
+        # (stat version, fingerprint) when the clip was already sampled and has not changed
+        # since; only a stat, so it is safe on the Tk thread
+        inode, version = self._stat_key(path)
+        with self._lock:
+            entry = self._entries.get(inode)
+        if inode is None or not entry or entry["version"] != version:
+            return None
+        return list(version), entry["sampled"]
+
+    def prime(self, path, version, sampled):
+        # Takes a fingerprint saved with a session, as long as the file's size and mtime are the
+        # ones it was saved with, so reopening a project reads no clips
+        inode, current = self._stat_key(path)
+        if inode is None or not version or list(current) != list(version):
+            return False
+        with self._lock:
+            if inode not in self._entries:
+                self._entries[inode] = {"version": current, "sampled": sampled, "full": None}
+        return True
+
+    def full(self, path):
+        entry = self._entry(path)
+        if entry is None:
+            return None
+        if entry["full"] is None:
+            try:
+                entry["full"] = full_hash(path)
+            except OSError:
+                return None
+        return entry["full"]
+
+    def warm_full_hashes(self, paths):
+        # Optional upgrade (LEGOPY_FULL_FINGERPRINTS=1): full hashes are read in the background,
+        # one file at a time, so duplicate checks later on do not have to read whole clips
+        if not os.environ.get("LEGOPY_FULL_FINGERPRINTS"):
+            return
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fingerprints")
+        for path in paths:
+            self._pool.submit(self.full, path)
+
+    def forget(self, path):
+        inode, _ = self._stat_key(path)
+        with self._lock:
+            self._entries.pop(inode, None)
+
+
+fingerprint_service = FingerprintService()
+
+
+def clip_fingerprint(path):
+    return fingerprint_service.fingerprint(os.path.abspath(path))
+
+
+def unique_clips(paths, existing=()):
+    # Drops clips whose content is already in the list (same sampled fingerprint, confirmed
+    # with a full hash). Returns (kept, skipped) where skipped pairs each duplicate with its original.
+    seen = {}
+    for path in existing:
+        seen.setdefault(clip_fingerprint(path), []).append(path)
+    kept = []
+    skipped = []
+    for path in paths:
+        fingerprint = clip_fingerprint(path)
+        original = None
+        if fingerprint is not None:
+            for other in seen.get(fingerprint, []):
+                if os.path.abspath(other) == os.path.abspath(path):
+                    continue
+                if fingerprint_service.full(path) == fingerprint_service.full(other):
+                    original = other
+                    break
+        if original:
+            skipped.append((path, original))
+            continue
+        kept.append(path)
+        seen.setdefault(fingerprint, []).append(path)
+    return kept, skipped
@@ -1,7 +1,8 @@
 from compilations import (
-    ScrollableFrame, CompilationFrame, SequenceCompilationsManager,
-    get_video_duration, FileItem
+    ScrollableFrame, CompilationFrame, SequenceCompilationsManager, FileItem, RenderQueuePanel, skip_duplicate_clips,
+    mark_changed
 )
+from variants import VARIANT_MODES, generate_variants
 from tkinter import ttk, messagebox, filedialog
 import tkinter as tk
 import threading
@@ -13,6 +14,8 @@ def format_first_file_duration(duration):
     return f"{m:02d}'{s:02d}"
 
 class FirstBatchFrame(ttk.Frame):
+    session_key = "first_batch"
+
     def __init__(self, parent, back_callback, get_project_code):
         super().__init__(parent)
         self.get_project_code = get_project_code
@@ -39,6 +42,22 @@ class FirstBatchFrame(ttk.Frame):
 
         ttk.Label(left_col, text="Load Tips:").pack(anchor="w", padx=5, pady=(5,0))
         ttk.Button(left_col, text="Load Tips Files", command=self.load_tips_files).pack(padx=5, pady=5)
+        variant_frame = ttk.Frame(left_col)
+        variant_frame.pack(padx=5, pady=(0, 5))
+        self.tip_files = []
+        self.variant_mode_var = tk.StringVar(value=VARIANT_MODES[0])
+        self.variant_count_var = tk.StringVar(value="")
+        self.variant_prefix_var = tk.StringVar(value="1")
+        self.variant_pair_depth_var = tk.StringVar(value="4")
+        ttk.Label(variant_frame, text="Variants:").pack(side="left")
+        ttk.Combobox(variant_frame, textvariable=self.variant_mode_var, values=VARIANT_MODES,
+                     state="readonly", width=22).pack(side="left", padx=(2, 6))
+        ttk.Label(variant_frame, text="Count:").pack(side="left")
+        ttk.Entry(variant_frame, textvariable=self.variant_count_var, width=4, justify="center").pack(side="left", padx=(2, 6))
+        ttk.Label(variant_frame, text="Unique first:").pack(side="left")
+        ttk.Entry(variant_frame, textvariable=self.variant_prefix_var, width=3, justify="center").pack(side="left", padx=(2, 6))
+        ttk.Label(variant_frame, text="No repeated pairs in first:").pack(side="left")
+        ttk.Entry(variant_frame, textvariable=self.variant_pair_depth_var, width=3, justify="center").pack(side="left", padx=(2, 0))
         ttk.Button(left_col, text="Add empty Tips compilation", command=self.add_empty_tips_compilation).pack(padx=5, pady=(0,5))
         self.container_tips = ScrollableFrame(left_col)
         self.container_tips.pack(fill="both", expand=True, padx=5, pady=5)
@@ -56,10 +75,29 @@ class FirstBatchFrame(ttk.Frame):
         self.container_intros = ScrollableFrame(left_col)
         self.container_intros.pack(fill="both", expand=True, padx=5, pady=5)
 
+        ttk.Separator(left_col, orient="horizontal").pack(fill="x", pady=10)
+        watch_frame = ttk.Frame(left_col)
+        watch_frame.pack(fill="x", padx=5)
+        self.watcher = None
+        self._watch_export_running = False
+        self._watch_export_again = False
+        self.btn_watch = ttk.Button(watch_frame, text="Watch Folder...", command=self.toggle_watch_folder)
+        self.btn_watch.pack(side="left", padx=(0, 6))
+        self.watch_status_var = tk.StringVar(value="Not watching")
+        ttk.Label(watch_frame, textvariable=self.watch_status_var).pack(side="left")
+
         export_frame = ttk.Frame(left_col)
         export_frame.pack(fill="x", pady=(12, 0))
         self.btn_process_all = ttk.Button(export_frame, text="Export Tips Compilations", command=self.start_processing_thread)
         self.btn_process_all.pack(anchor="center", pady=(0, 4))
+        self.optimize_fit_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(export_frame, text="Fit the longest duration with the least trimming", variable=self.optimize_fit_var).pack(anchor="center", pady=(0, 4))
+        from utils import load_settings
+        durations_frame = ttk.Frame(export_frame)
+        durations_frame.pack(anchor="center", pady=(0, 4))
+        ttk.Label(durations_frame, text="Durations:").pack(side="left")
+        self.duration_targets_var = tk.StringVar(value=load_settings().get("duration_targets", "2:00"))
+        ttk.Entry(durations_frame, textvariable=self.duration_targets_var, width=18).pack(side="left", padx=(2, 0))
         self.progress_var = tk.DoubleVar()
         self.progress_bar = ttk.Progressbar(export_frame, variable=self.progress_var, maximum=100)
         self.progress_bar.pack(fill="x", padx=14, pady=(0, 8))
@@ -85,6 +123,9 @@ class FirstBatchFrame(ttk.Frame):
         all_export_frame.pack(side="bottom", fill="x", padx=20, pady=(5, 12))
         self.btn_export_all = ttk.Button(all_export_frame, text="Export All Compilations", command=self.export_all_compilations)
         self.btn_export_all.pack(anchor="center")
+        self.btn_export_changed = ttk.Button(all_export_frame, text="Export Changed", command=self.export_changed)
+        self.btn_export_changed.pack(anchor="center", pady=(4, 0))
+        RenderQueuePanel(all_export_frame, collect_jobs=self.collect_queue_jobs).pack(anchor="center", pady=(6, 0))
         # --- KONIEC DODAWANIA ---
 
     def add_empty_tips_compilation(self):
@@ -114,27 +155,80 @@ class FirstBatchFrame(ttk.Frame):
         filepaths = filedialog.askopenfilenames(filetypes=[("Video files", "*.mp4 *.mov *.mkv *.avi *.flv *.wmv")])
         if not filepaths:
             return
+        skip_duplicate_clips(self, filepaths, self._load_tips)
+
+    def _load_tips(self, filepaths):
         self.clear_all_compilations()
-        n = len(filepaths)
-        for i in range(n):
-            # ROTACJA (ważne!)
-            rotated = filepaths[i:] + filepaths[:i]
+        self._set_tip_variants(list(filepaths))
+        self.sync_hooks_with_tips1()
+        self.update_compilation_numbers()
+        self.sequence_manager.load_sequences()
+
+    def _variant_options(self):
+        def as_int(var, default):
+            try:
+                return max(0, int(var.get()))
+            except ValueError:
+                return default
+        return {
+            "mode": self.variant_mode_var.get(),
+            "count": as_int(self.variant_count_var, None) or None,
+            "distinct_prefix": as_int(self.variant_prefix_var, 1),
+            "pair_depth": as_int(self.variant_pair_depth_var, 0) or None,
+            # Same project and tips always give the same random variants
+            "seed": f"{self.get_project_code()}:{len(self.tip_files)}"
+        }
+
+    def _set_tip_variants(self, filepaths):
+        # Existing frames are reused and only refreshed when their ordering actually changed
+        self.tip_files = [os.path.abspath(fp) for fp in filepaths]
+        options = self._variant_options()
+        variants = generate_variants(self.tip_files, options.pop("mode"), **options)
+        n = 0
+        for i, ordered in enumerate(variants):
+            n = i + 1
+            if i < len(self.compilations):
+                comp = self.compilations[i]
+                if comp.files != ordered:
+                    comp.files = ordered
+                    comp._refresh_file_items()
+                continue
             comp = CompilationFrame(
                 self.container_tips.scrollable_frame, i,
                 on_delete_callback=self.remove_tips_compilation,
                 allow_rename=False
             )
-            comp.add_files(rotated)
+            comp.add_files(ordered)
             comp.pack(fill="x", pady=5)
             self.compilations.append(comp)
-        self.sync_hooks_with_tips1()
-        self.update_compilation_numbers()
-        self.sequence_manager.load_sequences()
+        for comp in self.compilations[n:]:
+            comp.destroy()
+        del self.compilations[n:]
+
+    def _set_hook_files(self, filepaths):
+        current = [comp.files[0] for comp in self.hooks_compilations if comp.files]
+        if current == filepaths and len(current) == len(self.hooks_compilations):
+            return
+        for comp in self.hooks_compilations:
+            comp.destroy()
+        self.hooks_compilations.clear()
+        for i, hook_file in enumerate(filepaths):
+            comp = CompilationFrame(
+                self.container_hooks.scrollable_frame, i,
+                on_delete_callback=self.remove_hooks_compilation,
+                allow_rename=False
+            )
+            comp.add_file(hook_file)
+            comp.pack(fill="x", pady=5)
+            self.hooks_compilations.append(comp)
 
     def load_hooks_files(self):
         filepaths = filedialog.askopenfilenames(filetypes=[("Video files", "*.mp4 *.mov *.mkv *.avi *.flv *.wmv")])
         if not filepaths:
             return
+        skip_duplicate_clips(self, filepaths, self._load_hooks, existing=self.tip_files)
+
+    def _load_hooks(self, filepaths):
         for comp in self.hooks_compilations:
             comp.destroy()
         self.hooks_compilations.clear()
@@ -160,7 +254,10 @@ class FirstBatchFrame(ttk.Frame):
         filepaths = filedialog.askopenfilenames(filetypes=[("Video files", "*.mp4 *.mov *.mkv *.avi *.flv *.wmv")])
         if not filepaths:
             return
-        self.intro_files = [os.path.abspath(fp) for fp in filepaths]
+        skip_duplicate_clips(self, filepaths, self._load_intros)
+
+    def _load_intros(self, filepaths):
+        self.intro_files = filepaths
         self._refresh_intro_items()
         self.sequence_manager.load_sequences()
 
@@ -217,11 +314,103 @@ class FirstBatchFrame(ttk.Frame):
                 hooks_comp.files = tips1_files.copy()
             hooks_comp._refresh_file_items()
 
+    def _clip_owners(self):
+        return self.compilations + self.hooks_compilations + self.sequence_manager.all_sequences()
+
+    def clip_actions(self, path):
+        return [("Replace everywhere...", lambda: self.replace_clip_everywhere(path)),
+                ("Remove everywhere", lambda: self.remove_clip_everywhere(path))]
+
+    def replace_clip_everywhere(self, old_path):
+        # Only the compilations and sequences that use the clip are updated; their names,
+        # export checkboxes and the sequence list stay as they are
+        new_path = filedialog.askopenfilename(title=f"Replace {os.path.basename(old_path)}",
+                                              filetypes=[("Video files", "*.mp4 *.mov *.mkv *.avi *.flv *.wmv")])
+        if not new_path:
+            return
+        from clip_index import ClipIndex, replace_in_list
+        new_path = os.path.abspath(new_path)
+        index = ClipIndex(self._clip_owners())
+        if new_path != os.path.abspath(old_path) and index.owners(new_path):
+            messagebox.showwarning("Replace clip", f"{os.path.basename(new_path)} is already used here.")
+            return
+        changed = index.replace(old_path, new_path)
+        self.tip_files = replace_in_list(self.tip_files, old_path, new_path)
+        if os.path.abspath(old_path) in self.intro_files:
+            self.intro_files = replace_in_list(self.intro_files, old_path, new_path)
+            self._refresh_intro_items()
+        for frame in changed:
+            frame._refresh_file_items()
+            mark_changed(frame)
+        self.sequence_manager.mark_loaded()
+        messagebox.showinfo("Replace clip", f"Replaced in {len(changed)} compilations and sequences.")
+
+    def remove_clip_everywhere(self, path):
+        path = os.path.abspath(path)
+        hooks = [comp for comp in self.hooks_compilations if comp.files and comp.files[0] == path]
+        if hooks or path in self.intro_files:
+            # Hooks and intros are dimensions of the sequence matrix, so the sequences are rebuilt
+            for comp in hooks:
+                comp.destroy()
+                self.hooks_compilations.remove(comp)
+            if path in self.intro_files:
+                self.intro_files.remove(path)
+                self._refresh_intro_items()
+            self.update_compilation_numbers()
+            return
+        from clip_index import ClipIndex, remove_from_list
+        changed = ClipIndex(self._clip_owners()).remove(path)
+        self.tip_files = remove_from_list(self.tip_files, path)
+        for frame in changed:
+            frame._refresh_file_items()
+            mark_changed(frame)
+        self.sequence_manager.mark_loaded()
+
+    def export_changed(self):
+        # Only the compilations and sequences marked by Replace or Remove everywhere; of their
+        # outputs, the ones already exported with the same clips are skipped
+        frames = [frame for frame in self._clip_owners() if getattr(frame, "changed", False) and frame.files and frame.should_export()]
+        if not frames:
+            messagebox.showinfo("Info", "No compilation was changed since its last export.")
+            return
+        self.btn_export_changed.config(state="disabled")
+        threading.Thread(target=self._run_changed_exports, args=(frames,), daemon=True).start()
+
+    def _run_changed_exports(self, frames):
+        from export_jobs import is_up_to_date, run_export_jobs
+        count, failed, too_short = 0, [], []
+        try:
+            comps = [frame for frame in frames if frame in self.compilations or frame in self.hooks_compilations]
+            jobs, too_short = self.collect_compilation_jobs(comps)
+            if not too_short:
+                jobs.extend(self.sequence_manager.collect_jobs([frame for frame in frames if frame not in comps]))
+                stale = [job for job in jobs if not is_up_to_date(job)]
+                count = len(stale)
+                failed = run_export_jobs(stale, on_progress=lambda done, total: self.after(0, self.global_progress_var.set, done / total * 100))
+        finally:
+            self.after(0, self._finish_changed_exports, frames, count, failed, too_short)
+
+    def _finish_changed_exports(self, frames, count, failed, too_short):
+        self.btn_export_changed.config(state="normal")
+        self.global_progress_var.set(0)
+        if too_short:
+            from utils import format_duration_target
+            messagebox.showerror("Error", f"Compilation '{too_short[0]}' total duration less than "
+                                          f"{format_duration_target(self.duration_targets()[-1])}.")
+            return
+        if failed:
+            messagebox.showerror("Error", f"Failed to export: {', '.join(failed)}")
+            return
+        for frame in frames:
+            mark_changed(frame, False)
+        messagebox.showinfo("Info", f"Exported {count} changed outputs." if count else "Everything is up to date.")
+
     def clear_all_compilations(self):
         for comp in self.compilations + self.hooks_compilations:
             comp.destroy()
         self.compilations.clear()
         self.hooks_compilations.clear()
+        self.tip_files = []
         self.clear_intro_files(trigger_reload=False)
         self.global_resolution_ref["value"] = None
         self.update_compilation_numbers()
@@ -253,6 +442,207 @@ class FirstBatchFrame(ttk.Frame):
             comp.set_name(f"Compilation {idx+1}")
         self.sequence_manager.load_sequences()
 
+    def toggle_watch_folder(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+            self.btn_watch.config(text="Watch Folder...")
+            self.watch_status_var.set("Not watching")
+            return
+        folder = filedialog.askdirectory()
+        if not folder:
+            return
+        from watch_folder import FolderWatcher
+        self.watcher = FolderWatcher([folder], on_change=lambda snapshot: self.after(0, self.apply_watched_clips, snapshot))
+        self.watcher.start()
+        self.btn_watch.config(text="Stop Watching")
+        mode = "inotify" if self.watcher.uses_inotify else "polling"
+        self.watch_status_var.set(f"Watching {os.path.basename(folder) or folder} ({mode})")
+
+    def load_library_clips(self, snapshot):
+        tips = snapshot["tip"]
+        if tips != self.tip_files:
+            self._set_tip_variants(tips)
+        self._set_hook_files(snapshot["hook"] if tips else [])
+        if snapshot["intro"] != self.intro_files:
+            self.intro_files = list(snapshot["intro"])
+            self._refresh_intro_items()
+        self.sync_hooks_with_tips1()
+        self.update_compilation_numbers()
+
+    def apply_watched_clips(self, snapshot):
+        if self.watcher is None:
+            return
+        tips = snapshot["tip"]
+        self.load_library_clips(snapshot)
+        self.watch_status_var.set(
+            f"{len(tips)} tips, {len(snapshot['hook'])} hooks, {len(snapshot['intro'])} intros"
+        )
+        self._export_stale_outputs()
+
+    def _export_stale_outputs(self):
+        if self._watch_export_running:
+            self._watch_export_again = True
+            return
+        self._watch_export_running = True
+        threading.Thread(target=self._run_watch_exports, daemon=True).start()
+
+    def duration_targets(self):
+        from utils import parse_duration_targets
+        try:
+            return parse_duration_targets(self.duration_targets_var.get())
+        except ValueError:
+            return [120]
+
+    def _fitted_files(self, comps, target=120):
+        # Picks per compilation the clips that reach the longest cut with the smallest overshoot,
+        # so the trim only cuts that overshoot instead of minutes of concatenated footage
+        from utils import get_video_duration
+        from duration_optimizer import plan_compilations
+        clips = sorted({f for comp in comps for f in comp.files})
+        index = {f: i for i, f in enumerate(clips)}
+        durations = [get_video_duration(f) for f in clips]
+        plans = plan_compilations(durations, [[index[f] for f in comp.files] for comp in comps], target=target)
+        return [[clips[i] for i in plan["clips"]] if plan else comp.files for comp, plan in zip(comps, plans)]
+
+    def _output_suffixes(self):
+        # Variants that open with the same clip (the 2n Latin square rows for an odd number of
+        # Tips) would write the same file, so the later ones get _v2, _v3, ... Counted over every
+        # compilation, so exporting only some of them gives each the same name as Export All.
+        seen = {}
+        suffixes = {}
+        for comp in self.compilations + self.hooks_compilations:
+            if comp.files:
+                n = seen[comp.files[0]] = seen.get(comp.files[0], 0) + 1
+                suffixes[id(comp)] = f"_v{n}" if n > 1 else ""
+        return suffixes
+
+    def collect_compilation_jobs(self, frames=None):
+        # Every compilation gets the duration cuts it is long enough for; compilations shorter
+        # than the shortest cut are left out and reported by name
+        from utils import get_video_duration
+        targets = self.duration_targets()
+        comps = []
+        comp_targets = []
+        too_short = []
+        for comp in self.compilations + self.hooks_compilations if frames is None else frames:
+            total = sum(get_video_duration(f) for f in comp.files)
+            reachable = [t for t in targets if total >= t]
+            if not reachable:
+                too_short.append(comp.get_name())
+                continue
+            comps.append(comp)
+            comp_targets.append(reachable)
+        if comps and self.optimize_fit_var.get():
+            # Fitted to the longest cut each compilation gets; shorter cuts are prefixes of it
+            files = [None] * len(comps)
+            for longest in {t[0] for t in comp_targets}:
+                positions = [i for i, t in enumerate(comp_targets) if t[0] == longest]
+                fitted = self._fitted_files([comps[i] for i in positions], target=longest)
+                for i, f in zip(positions, fitted):
+                    files[i] = f
+        else:
+            files = [comp.files for comp in comps]
+        from export_jobs import with_delivery_options
+        suffixes = self._output_suffixes()
+        jobs = [comp.build_export_job(files=f, targets=t, suffix=suffixes.get(id(comp), ""))
+                for comp, f, t in zip(comps, files, comp_targets)]
+        return with_delivery_options(jobs, **self.sequence_manager.delivery_panel.delivery_options()), too_short
+
+    def collect_export_jobs(self):
+        jobs, too_short = self.collect_compilation_jobs()
+        jobs.extend(self.sequence_manager.collect_jobs())
+        return jobs, too_short
+
+    def collect_queue_jobs(self):
+        jobs, too_short = self.collect_export_jobs()
+        if too_short:
+            from utils import format_duration_target
+            shortest = format_duration_target(self.duration_targets()[-1])
+            messagebox.showerror("Error", f"Compilation '{too_short[0]}' total duration less than {shortest}.")
+            return []
+        return jobs
+
+    def _run_watch_exports(self):
+        from export_jobs import is_up_to_date, run_export_job
+        # Jobs are collected here, like Export All does, so probing new clips never blocks the window.
+        # Only outputs whose effective inputs changed since their last export are rendered again.
+        summary = "Export stopped"
+        try:
+            jobs, _ = self.collect_export_jobs()
+            stale = [job for job in jobs if not is_up_to_date(job)]
+            failed = 0
+            for idx, job in enumerate(stale):
+                self.after(0, self.watch_status_var.set, f"Exporting {idx + 1}/{len(stale)}: {os.path.basename(job['output_path'])}")
+                if not run_export_job(job):
+                    failed += 1
+            summary = f"Up to date ({len(jobs)} outputs)" if not stale else f"Exported {len(stale) - failed}/{len(stale)} changed outputs"
+        finally:
+            self.after(0, self._finish_watch_exports, summary)
+
+    def _finish_watch_exports(self, summary):
+        self._watch_export_running = False
+        self.watch_status_var.set(summary)
+        if self._watch_export_again and self.watcher is not None:
+            self._watch_export_again = False
+            self._export_stale_outputs()
+
+    def destroy(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+        super().destroy()
+
+    def get_session_state(self):
+        from project_session import ClipTable
+        clips = ClipTable()
+
+        def describe(comp):
+            return {
+                "name": comp.get_name(),
+                "files": clips.refs(comp.files),
+                "renamable": str(comp.name_entry.cget("state")) != "readonly",
+                "export": comp.should_export()
+            }
+        return {
+            "clips": clips,
+            "tips": [describe(c) for c in self.compilations],
+            "hooks": [describe(c) for c in self.hooks_compilations],
+            "tip_files": clips.refs(self.tip_files),
+            "intros": clips.refs(self.intro_files),
+            "sequences": [describe(c) for c in self.sequence_manager.sequence_frames],
+            "sequence_pattern": self.sequence_manager.pattern_var.get()
+        }
+
+    def apply_session_state(self, state):
+        clips = state["clips"]
+        self.clear_all_compilations()
+        for key, container, target, on_delete in (
+            ("tips", self.container_tips, self.compilations, self.remove_tips_compilation),
+            ("hooks", self.container_hooks, self.hooks_compilations, self.remove_hooks_compilation),
+        ):
+            for i, saved in enumerate(state.get(key, [])):
+                comp = CompilationFrame(
+                    container.scrollable_frame, i,
+                    on_delete_callback=on_delete,
+                    allow_rename=saved.get("renamable", False),
+                    files=clips.resolve(saved["files"]),
+                    lazy_rows=True
+                )
+                if comp.export_var is not None:
+                    comp.export_var.set(saved.get("export", True))
+                comp.pack(fill="x", pady=5)
+                target.append(comp)
+        self.tip_files = clips.resolve(state.get("tip_files", []))
+        self.intro_files = clips.resolve(state.get("intros", []))
+        self._refresh_intro_items()
+        self.update_compilation_numbers()
+        if state.get("sequence_pattern"):
+            self.sequence_manager.pattern_var.set(state["sequence_pattern"])
+        self.sequence_manager.restore_sequences(
+            [(s["name"], clips.resolve(s["files"]), s.get("export", True)) for s in state.get("sequences", [])]
+        )
+
     def start_processing_thread(self):
         self.btn_process_all.config(state="disabled")
         self.progress_var.set(0)
@@ -264,35 +654,65 @@ class FirstBatchFrame(ttk.Frame):
             messagebox.showinfo("Info", "No compilations to process.")
             self.btn_process_all.config(state="normal")
             return
-        for comp in all_compilations:
-            total_duration = sum(get_video_duration(f) for f in comp.files)
-            if total_duration < 120:
-                messagebox.showerror("Error",
-                    f"Compilation '{comp.get_name()}' total duration less than 2 minutes.")
-                self.btn_process_all.config(state="normal")
-                return
-        total = len(all_compilations)
-        for idx, comp in enumerate(all_compilations):
-            try:
-                comp.export()
-            except Exception as e:
-                messagebox.showerror("Error", f"Error processing compilation '{comp.get_name()}':\n{e}")
-                self.btn_process_all.config(state="normal")
-                return
-            progress_percent = ((idx + 1) / total) * 100
-            self.progress_var.set(progress_percent)
-        messagebox.showinfo("Info", "Exported Tips and Hooks Compilations.")
+        from utils import parse_duration_targets, format_duration_target, save_setting
+        try:
+            targets = parse_duration_targets(self.duration_targets_var.get())
+        except ValueError:
+            messagebox.showerror("Error", "Durations must look like '2:00, 1:30, 60'.")
+            self.btn_process_all.config(state="normal")
+            return
+        save_setting("duration_targets", self.duration_targets_var.get())
+        jobs, too_short = self.collect_compilation_jobs()
+        if too_short:
+            messagebox.showerror("Error",
+                f"Compilation '{too_short[0]}' total duration less than {format_duration_target(targets[-1])}.")
+            self.btn_process_all.config(state="normal")
+            return
+        from export_jobs import run_export_jobs
+        failed = run_export_jobs(jobs, on_progress=lambda done, total: self.progress_var.set(done / total * 100))
+        if failed:
+            messagebox.showerror("Error", f"Failed to export: {', '.join(failed)}")
+        else:
+            messagebox.showinfo("Info", "Exported Tips and Hooks Compilations.")
         self.btn_process_all.config(state="normal")
         self.progress_var.set(0)
 
-    # --- DODAJ TO NA KOŃCU ---
     def export_all_compilations(self):
+        # Tips, Hooks and sequences go into one export graph: every clip is probed once, shared
+        # merges are built once, and the bottom progress bar follows the whole batch
+        from utils import parse_duration_targets, save_setting
+        try:
+            parse_duration_targets(self.duration_targets_var.get())
+        except ValueError:
+            messagebox.showerror("Error", "Durations must look like '2:00, 1:30, 60'.")
+            return
+        save_setting("duration_targets", self.duration_targets_var.get())
+        self.btn_export_all.config(state="disabled")
         self.global_progress_var.set(0)
-        def tips_export():
-            self.start_processing_thread()
-            self.global_progress_var.set(50)
-        def sequences_export():
-            self.sequence_manager.export_sequences()
-            self.global_progress_var.set(100)
-        threading.Thread(target=tips_export, daemon=True).start()
-        threading.Thread(target=sequences_export, daemon=True).start()
+        threading.Thread(target=self._run_export_all, daemon=True).start()
+
+    def _run_export_all(self):
+        from utils import format_duration_target, get_video_resolution
+        from export_jobs import run_export_jobs
+        try:
+            jobs, too_short = self.collect_export_jobs()
+            if too_short:
+                shortest = format_duration_target(self.duration_targets()[-1])
+                self.after(0, messagebox.showerror, "Error", f"Compilation '{too_short[0]}' total duration less than {shortest}.")
+                return
+            sequence_files = self.sequence_manager.export_files()
+            if len({get_video_resolution(f) for f in sequence_files}) > 1:
+                self.after(0, messagebox.showerror, "Resolution mismatch", "Not all files in all sequences have the same resolution!")
+                return
+            failed = run_export_jobs(jobs, on_progress=lambda done, total: self.after(0, self.global_progress_var.set, done / total * 100))
+            if failed:
+                self.after(0, messagebox.showerror, "Error", f"Failed to export: {', '.join(failed)}")
+            else:
+                from locality import last_report
+                message = f"Exported {len(jobs)} Tips, Hooks and sequence compilations."
+                if last_report["summary"]:
+                    message += f"\n{last_report['summary']}"
+                self.after(0, messagebox.showinfo, "Info", message)
+        finally:
+            self.after(0, self.btn_export_all.config, {"state": "normal"})
+            self.after(0, self.global_progress_var.set, 0)
@@ -0,0 +1,136 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 4 * 1024 ** 3
+
+
+# Stream-copied concatenations keyed by the content of their input clips. A compilation that is
+# cut to several lengths, or re-exported after a rename, reuses the merged file instead
+# of reading every source clip again. Least recently used entries are evicted past max_bytes,
+# except entries pinned by a caller whose ffmpeg has not finished reading them.
+class IntermediateCache:
+    def __init__(self, folder=None, max_bytes=DEFAULT_MAX_BYTES, name="intermediates"):
+        self._folder = folder
+        self.name = name
+        self.max_bytes = max_bytes
+        self._entries = None
+        self._lock = threading.Lock()
+        self._building = {}
+        # key -> number of callers still using the file
+        self._pins = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def folder(self):
+        if self._folder is None:
+            from utils import user_cache_dir
+            self._folder = str(user_cache_dir(self.name))
+        return self._folder
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        entries = []
+        for entry in os.scandir(self.folder):
+            if entry.is_file() and entry.name.endswith(".mp4"):
+                st = entry.stat()
+                entries.append((st.st_atime, entry.name[:-4], entry.path, st.st_size))
+        self._entries = OrderedDict((key, (path, size)) for _, key, path, size in sorted(entries))
+
+    def key_for(self, file_list, variant=""):
+        # Keyed by content only: the same clips copied to another project reuse the merge
+        from fingerprints import clip_fingerprint
+        digest = hashlib.sha256(variant.encode("utf-8"))
+        for f in file_list:
+            digest.update(f"|{clip_fingerprint(f) or os.path.abspath(f)}".encode("utf-8"))
+        return digest.hexdigest()[:32]
+
+    def lookup(self, key, pin=False):
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry and os.path.isfile(entry[0]):
+                self._entries.move_to_end(key)
+                if pin:
+                    self._pins[key] = self._pins.get(key, 0) + 1
+                return entry[0]
+            self._entries.pop(key, None)
+            return None
+
+    def get_or_build(self, file_list, builder, variant="", pin=False):
+        # With pin=True the file is not evicted until release(path) is called
+        key = self.key_for(file_list, variant)
+        with self._lock:
+            event = self._building.get(key)
+            if event is None:
+                self._building[key] = threading.Event()
+        if event is not None:
+            # Another thread is producing the same intermediate; wait and reuse it
+            event.wait()
+        try:
+            cached = self.lookup(key, pin)
+            if cached:
+                self.hits += 1
+                return cached
+            if event is not None:
+                return self.get_or_build(file_list, builder, variant, pin)
+            self.misses += 1
+            final_path = os.path.join(self.folder, f"{key}.mp4")
+            tmp_path = os.path.join(self.folder, f".{key}.{os.getpid()}.part.mp4")
+            try:
+                builder(tmp_path)
+                os.replace(tmp_path, final_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            with self._lock:
+                self._entries[key] = (final_path, os.path.getsize(final_path))
+                if pin:
+                    self._pins[key] = self._pins.get(key, 0) + 1
+                self._evict(keep=key)
+            return final_path
+        finally:
+            if event is None:
+                with self._lock:
+                    self._building.pop(key).set()
+
+    def release(self, path):
+        # Ends a pin from get_or_build/lookup; the cache is trimmed again if it waited on this file
+        key = os.path.basename(path)[:-len(".mp4")]
+        with self._lock:
+            count = self._pins.get(key, 0) - 1
+            if count > 0:
+                self._pins[key] = count
+                return
+            self._pins.pop(key, None)
+            self._evict(keep=None)
+
+    def _evict(self, keep):
+        total = sum(size for _, size in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep or key in self._pins:
+                continue
+            path, size = self._entries.pop(key)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def stats(self):
+        with self._lock:
+            self._load()
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(size for _, size in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+intermediate_cache = IntermediateCache()
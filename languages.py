@@ -0,0 +1,81 @@
+import os
+import re
+
+BASE_LANGUAGE = "EN"
+# ES/, de/ ... folders next to the clips hold the other languages' audio
+LANGUAGE_CODE = re.compile(r"^[A-Za-z]{2}$")
+AUDIO_EXTENSIONS = (".wav", ".m4a", ".aac", ".mp3", ".flac")
+# Video files only count as another language inside a language subfolder; next to the clips
+# they would be taken for clips of their own
+FOLDER_EXTENSIONS = AUDIO_EXTENSIONS + (".mp4", ".mov")
+
+
+def parse_languages(text):
+    # "ES, de fr" -> ["ES", "DE", "FR"]; the base language is always the clip's own audio
+    languages = []
+    for part in text.replace(",", " ").replace(";", " ").split():
+        code = part.strip().upper()
+        if code and code != BASE_LANGUAGE and code not in languages:
+            languages.append(code)
+    return languages
+
+
+def find_language_audio(clip_path, language):
+    # <stem>_ES.wav next to the clip, or ES/<stem>.wav (or .mp4/.mov) in a language subfolder
+    folder, name = os.path.split(clip_path)
+    stem = os.path.splitext(name)[0]
+    candidates = []
+    for ext in FOLDER_EXTENSIONS:
+        if ext in AUDIO_EXTENSIONS:
+            candidates.append(os.path.join(folder, f"{stem}_{language}{ext}"))
+        candidates.append(os.path.join(folder, language, f"{stem}{ext}"))
+        candidates.append(os.path.join(folder, language.lower(), f"{stem}{ext}"))
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def language_output_path(output_path, language):
+    base, ext = os.path.splitext(output_path)
+    marker = f"_T_{BASE_LANGUAGE}"
+    if marker in base:
+        head, _, tail = base.rpartition(marker)
+        return f"{head}_T_{language}{tail}{ext}"
+    return f"{base}_T_{language}{ext}"
+
+
+def plan_language_outputs(files, output_path, languages, aspect=None):
+    # Returns (outputs, missing): a language is only delivered when every clip has its audio.
+    # Each output has the same frame (aspect) as the file at output_path it is named after.
+    outputs = []
+    missing = {}
+    for language in languages:
+        audio_files = [find_language_audio(f, language) for f in files]
+        absent = [os.path.basename(f) for f, audio in zip(files, audio_files) if not audio]
+        if absent:
+            missing[language] = absent
+            continue
+        outputs.append({
+            "output_path": language_output_path(output_path, language),
+            "language": language,
+            "audio_files": audio_files,
+            "aspect": aspect
+        })
+    return outputs, missing
+
+
+def is_language_folder(name):
+    return bool(LANGUAGE_CODE.match(name))
+
+
+def language_tracks(paths):
+    # Files that are another language's version of a clip in the same list (<stem>_ES.mp4 next
+    # to it), so clip scans do not load them as tips, hooks or intros of their own
+    stems = {os.path.splitext(os.path.abspath(p))[0].lower() for p in paths}
+    tracks = set()
+    for path in paths:
+        head, sep, code = os.path.splitext(os.path.abspath(path))[0].rpartition("_")
+        if sep and LANGUAGE_CODE.match(code) and head.lower() in stems:
+            tracks.add(path)
+    return tracks
@@ -0,0 +1,70 @@
+import os
+import csv
+
+# A layout is a table with one compilation per column: the header row holds the
+# compilation names and every cell below it names one clip by alias.
+DELIMITERS = "\t,;"
+
+
+def _column_letter(idx):
+    letters = ""
+    idx += 1
+    while idx:
+        idx, rem = divmod(idx - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def build_alias_index(tips_files, hooks_files=()):
+    # T1..Tn and H1..Hn, plus every file name with and without its extension. A file name
+    # shared by clips in different folders maps to None so it is reported as ambiguous.
+    index = {}
+    names = {}
+    for prefix, files in (("T", tips_files), ("H", hooks_files)):
+        for i, path in enumerate(files, start=1):
+            index[f"{prefix}{i}"] = path
+            base = os.path.basename(path).upper()
+            for name in (base, os.path.splitext(base)[0]):
+                if names.get(name, path) != path:
+                    names[name] = None
+                else:
+                    names[name] = path
+    for name, path in names.items():
+        index.setdefault(name, path)
+    return index
+
+
+def parse_layout(text):
+    text = text.strip("\r\n")
+    if not text.strip():
+        return []
+    first_line = text.splitlines()[0]
+    delimiter = max(DELIMITERS, key=first_line.count)
+    rows = list(csv.reader(text.splitlines(), delimiter=delimiter))
+    return [[cell.strip() for cell in row] for row in rows]
+
+
+def resolve_layout(rows, index):
+    # Returns ([(name, files)], errors); nothing should be built unless errors is empty
+    if len(rows) < 2:
+        return [], ["The table needs a header row with compilation names and at least one row of clips."]
+    headers = rows[0]
+    compilations = []
+    errors = []
+    for col, header in enumerate(headers):
+        files = []
+        for row_idx, row in enumerate(rows[1:], start=2):
+            alias = row[col] if col < len(row) else ""
+            if not alias:
+                continue
+            key = alias.upper()
+            cell = f"{_column_letter(col)}{row_idx}"
+            if key not in index:
+                errors.append(f"{cell}: unknown clip '{alias}'")
+            elif index[key] is None:
+                errors.append(f"{cell}: '{alias}' matches clips in several folders, use its T/H alias")
+            else:
+                files.append(index[key])
+        if header or files:
+            compilations.append((header, files))
+    return compilations, errors
@@ -0,0 +1,197 @@
+import os
+import re
+import gzip
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+INDEX_VERSION = 1
+# Project folders are listed in parallel; on a NAS most of the time is spent waiting on the network
+SCAN_WORKERS = 8
+# "E123", "E123 Cooking", "b45_final" -> E123, E123, B045
+PROJECT_CODE = re.compile(r"^([A-Za-z]+)[ _-]?(\d{1,3})(?!\d)")
+# Folders LegoPy exports into: duration cuts next to the tips (2min, 1min30s, 45s) and sequences/comp1, comp2
+DURATION_FOLDER = re.compile(r"^(\d+min(\d+s)?|\d+s)$", re.IGNORECASE)
+
+
+def project_code(name):
+    match = PROJECT_CODE.match(name)
+    if not match:
+        return None
+    return f"{match.group(1).upper()}{match.group(2).zfill(3)}"
+
+
+def index_path():
+    from utils import user_data_dir
+    return os.path.join(user_data_dir("library"), "index.json.gz")
+
+
+def _output_kind(parts):
+    # Name of the export folder a directory belongs to, or None for clip folders
+    for i, part in enumerate(parts):
+        name = part.lower()
+        if DURATION_FOLDER.match(name):
+            return name
+        if name == "sequences":
+            return parts[i + 1].lower() if i + 1 < len(parts) else name
+    return None
+
+
+def _list_dir(folder, mtime):
+    from watch_folder import VIDEO_EXTENSIONS
+    entry = {"mtime": mtime, "videos": {}, "subdirs": []}
+    try:
+        with os.scandir(folder) as it:
+            for item in it:
+                if item.name.startswith("."):
+                    continue
+                if item.is_dir(follow_symlinks=False):
+                    entry["subdirs"].append(item.name)
+                elif item.name.lower().endswith(VIDEO_EXTENSIONS):
+                    st = item.stat()
+                    entry["videos"][item.name] = [st.st_size, st.st_mtime_ns]
+    except OSError:
+        return None
+    return entry
+
+
+def _scan_tree(folder, old, new):
+    # A directory whose mtime did not change keeps its stored listing, so an unchanged project
+    # costs one stat per folder. Returns how many directories were listed again.
+    try:
+        mtime = os.stat(folder).st_mtime_ns
+    except OSError:
+        return 0
+    listed = 0
+    entry = old.get(folder)
+    if entry is None or entry["mtime"] != mtime:
+        entry = _list_dir(folder, mtime)
+        if entry is None:
+            return 0
+        listed = 1
+    new[folder] = entry
+    for name in entry["subdirs"]:
+        listed += _scan_tree(os.path.join(folder, name), old, new)
+    return listed
+
+
+def _summarize(folder, tree):
+    from watch_folder import classify_clip, _natural_key
+    from languages import is_language_folder, language_tracks
+    clips = {"tip": [], "hook": [], "intro": []}
+    exports = {}
+    newest_clip = newest_export = 0
+    for path, entry in tree.items():
+        parts = os.path.relpath(path, folder).split(os.sep) if path != folder else []
+        output = _output_kind(parts)
+        if not output and any(is_language_folder(part) for part in parts):
+            # ES/, DE/ ... hold other languages of the clips, not clips of their own
+            continue
+        tracks = language_tracks(list(entry["videos"]))
+        for name, (_, mtime) in entry["videos"].items():
+            if output:
+                exports[output] = exports.get(output, 0) + 1
+                newest_export = max(newest_export, mtime)
+                continue
+            if name in tracks:
+                continue
+            role = classify_clip(os.path.join(path, name))
+            if role:
+                clips[role].append(os.path.join(path, name))
+                newest_clip = max(newest_clip, mtime)
+    return {
+        "folder": folder,
+        "clips": {role: sorted(paths, key=_natural_key) for role, paths in clips.items()},
+        "exports": exports,
+        "newest_clip": newest_clip,
+        "newest_export": newest_export,
+    }
+
+
+def export_status(project):
+    if not project["exports"]:
+        return "not exported"
+    if project["newest_clip"] > project["newest_export"]:
+        return "clips changed since the last export"
+    return "exported"
+
+
+def describe(project):
+    clips = project["clips"]
+    return (f"{len(clips['tip'])} tips, {len(clips['hook'])} hooks, {len(clips['intro'])} intros"
+            f" - {export_status(project)}")
+
+
+# Persistent index of a library root: project code -> tips, hooks and intros plus what was
+# exported. The stored directory listings make a rescan only list folders that changed.
+class LibraryIndex:
+    def __init__(self, root, path=None):
+        self.root = os.path.abspath(root)
+        self.path = path or index_path()
+        self.projects = {}
+        self._trees = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        # Reads the stored index; large libraries take a while, so call it off the Tk thread
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != INDEX_VERSION or data.get("root") != self.root:
+            return
+        with self._lock:
+            self._trees = data.get("trees", {})
+            self.projects = data.get("projects", {})
+
+    def save(self):
+        with self._lock:
+            data = {"version": INDEX_VERSION, "root": self.root, "trees": self._trees, "projects": self.projects}
+        tmp_path = self.path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def scan(self, workers=SCAN_WORKERS):
+        # Returns how many directories had to be listed again
+        try:
+            with os.scandir(self.root) as it:
+                folders = [(item.path, project_code(item.name)) for item in it
+                           if item.is_dir() and not item.name.startswith(".")]
+        except OSError:
+            return 0
+        folders = sorted((path, code) for path, code in folders if code)
+        old = self._trees
+
+        def scan_project(folder):
+            new = {}
+            listed = _scan_tree(folder, old.get(folder, {}), new)
+            return new, listed
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(scan_project, [path for path, _ in folders]))
+        trees, projects, listed = {}, {}, 0
+        for (folder, code), (tree, count) in zip(folders, results):
+            trees[folder] = tree
+            listed += count
+            project = _summarize(folder, tree)
+            # Two folders with the same code ("E123", "E123 old"): the one with more clips wins
+            current = projects.get(code)
+            if current is None or sum(map(len, project["clips"].values())) > sum(map(len, current["clips"].values())):
+                projects[code] = project
+        with self._lock:
+            self._trees = trees
+            self.projects = projects
+        return listed
+
+    def project(self, code):
+        with self._lock:
+            return self.projects.get(code)
+
+    def clips(self, code):
+        # Same shape as a watch folder snapshot: {"tip": [...], "hook": [...], "intro": [...]}
+        project = self.project(code)
+        if not project or not any(project["clips"].values()):
+            return None
+        return {role: list(paths) for role, paths in project["clips"].items()}
@@ -0,0 +1,191 @@
+import os
+import sys
+import heapq
+import threading
+
+LOOKAHEAD = 2
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def order_by_locality(jobs):
+    # Greedy order: each next job is the one sharing the most clips with the last two jobs,
+    # whose clips are the ones most likely still in the page cache. Ties keep list order.
+    # Scores live in a heap and only the jobs using a clip that became warm or cold are
+    # rescored, so a step costs the size of those clips' job lists instead of a full scan.
+    files = [set(job["files"]) for job in jobs]
+    users = {}
+    for i, clips in enumerate(files):
+        for path in clips:
+            users.setdefault(path, []).append(i)
+    score = [0] * len(jobs)
+    done = [False] * len(jobs)
+    heap = [(0, i) for i in range(len(jobs))]
+    warm = {}
+    recent = []
+    order = []
+
+    def rescore(path, change):
+        for j in users[path]:
+            if not done[j]:
+                score[j] += change
+                heapq.heappush(heap, (-score[j], j))
+
+    while heap:
+        negative, best = heapq.heappop(heap)
+        if done[best] or -negative != score[best]:
+            # Already ordered, or an entry from before the score changed
+            continue
+        done[best] = True
+        order.append(best)
+        recent.append(best)
+        for path in files[best]:
+            warm[path] = warm.get(path, 0) + 1
+            if warm[path] == 1:
+                rescore(path, 1)
+        if len(recent) > 2:
+            for path in files[recent.pop(0)]:
+                warm[path] -= 1
+                if not warm[path]:
+                    del warm[path]
+                    rescore(path, -1)
+    return order
+
+
+def _advise(path, advice):
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, advice)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _load_mincore():
+    if not sys.platform.startswith("linux"):
+        return None
+    import ctypes
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+    except OSError:
+        return None
+    libc.mmap.restype = ctypes.c_void_p
+    libc.mmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_long]
+    libc.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+    libc.mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_void_p]
+    return libc
+
+
+_libc = None
+_libc_loaded = False
+
+
+def resident_bytes(path):
+    # Bytes of the file currently in the page cache (mincore on a read-only mapping), or None
+    global _libc, _libc_loaded
+    if not _libc_loaded:
+        _libc = _load_mincore()
+        _libc_loaded = True
+    if _libc is None:
+        return None
+    import ctypes
+    import mmap
+    try:
+        size = os.path.getsize(path)
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        if size == 0:
+            return 0
+        addr = _libc.mmap(None, size, mmap.PROT_READ, mmap.MAP_SHARED, fd, 0)
+        if addr in (None, ctypes.c_void_p(-1).value):
+            return None
+        try:
+            pages = (size + _PAGE - 1) // _PAGE
+            vec = (ctypes.c_ubyte * pages)()
+            if _libc.mincore(addr, size, vec) != 0:
+                return None
+            return min(size, sum(b & 1 for b in vec) * _PAGE)
+        finally:
+            _libc.munmap(addr, size)
+    finally:
+        os.close(fd)
+
+
+# Follows a batch in its planned order: asks the kernel to read ahead the clips of the next
+# jobs, drops clips nobody needs any more, and counts how much input was already cached.
+class ReadAhead:
+    def __init__(self, jobs, order, lookahead=LOOKAHEAD):
+        self.jobs = jobs
+        self.order = order
+        self.lookahead = lookahead
+        self.rank = {index: position for position, index in enumerate(order)}
+        self.refs = {}
+        for job in jobs:
+            for path in set(job["files"]):
+                self.refs[path] = self.refs.get(path, 0) + 1
+        self._started = set()
+        self._lock = threading.Lock()
+        self.read_bytes = 0
+        self.cached_bytes = 0
+        self.measured = False
+
+    def measure(self, paths):
+        # Counts how much of the clips a node is about to read is already in the page cache
+        for path in set(paths):
+            resident = resident_bytes(path)
+            if resident is not None:
+                with self._lock:
+                    self.measured = True
+                    self.read_bytes += os.path.getsize(path)
+                    self.cached_bytes += resident
+
+    def starting(self, index, measure=True):
+        # measure=False for outputs that read a merged file rather than the clips; their
+        # clips are measured by the merge node instead
+        with self._lock:
+            self._started.add(index)
+            position = self.rank[index]
+            upcoming = [i for i in self.order[position + 1:] if i not in self._started][:self.lookahead]
+        if measure:
+            self.measure(self.jobs[index]["files"])
+        for i in upcoming:
+            for path in self.jobs[i]["files"]:
+                _advise(path, getattr(os, "POSIX_FADV_WILLNEED", 3))
+
+    def finished(self, index):
+        released = []
+        with self._lock:
+            for path in set(self.jobs[index]["files"]):
+                self.refs[path] -= 1
+                if self.refs[path] == 0:
+                    released.append(path)
+        for path in released:
+            _advise(path, getattr(os, "POSIX_FADV_DONTNEED", 4))
+
+    def run(self, index, action, measure=True):
+        self.starting(index, measure)
+        try:
+            return action()
+        finally:
+            self.finished(index)
+
+    def hit_rate(self):
+        if not self.measured or not self.read_bytes:
+            return None
+        return self.cached_bytes / self.read_bytes
+
+    def summary(self):
+        rate = self.hit_rate()
+        if rate is None:
+            return ""
+        return f"Source clips already in memory: {rate:.0%} of {self.read_bytes / 1024 ** 3:.1f} GB read"
+
+
+last_report = {"summary": ""}
@@ -0,0 +1,105 @@
+import os
+import re
+import json
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+LOUDNESS_TARGETS = {"Off": None, "-14 LUFS": -14.0, "-16 LUFS": -16.0, "-23 LUFS": -23.0}
+TRUE_PEAK_LIMIT = -1.0
+# Clips quieter than this are treated as silence and left alone
+SILENCE_LUFS = -70.0
+
+
+def measure_clip(path):
+    # The expensive EBU R128 analysis (first loudnorm pass); audio only, the video is not decoded
+    from utils import get_ffmpeg_path
+    cmd = [get_ffmpeg_path(), "-hide_banner", "-nostats", "-i", path, "-vn",
+           "-af", "loudnorm=print_format=json", "-f", "null", "-"]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    match = re.search(r"\{[^{}]*\"input_i\"[^{}]*\}", result.stderr)
+    if result.returncode != 0 or not match:
+        return None
+    stats = json.loads(match.group(0))
+    return {key: float(stats[key]) for key in ("input_i", "input_tp", "input_lra", "input_thresh")}
+
+
+# Per-clip measurements kept on disk, so each source clip is analysed once while it is unchanged
+class LoudnessCache:
+    def __init__(self, path=None):
+        self._path = path
+        self._entries = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        if self._path is None:
+            from utils import user_cache_dir
+            self._path = str(user_cache_dir() / "loudness.json")
+        return self._path
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+
+    def _key(self, path):
+        from fingerprints import clip_fingerprint
+        return clip_fingerprint(path) or os.path.abspath(path)
+
+    def lookup(self, path):
+        with self._lock:
+            self._load()
+            return self._entries.get(self._key(path))
+
+    def store(self, path, stats):
+        with self._lock:
+            self._load()
+            self._entries[self._key(path)] = stats
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+
+    def measure(self, paths, workers=None):
+        # Measures the clips that are not cached yet in parallel; returns {path: stats or None}
+        results = {p: self.lookup(p) for p in paths}
+        missing = sorted({p for p, stats in results.items() if stats is None})
+        if missing:
+            workers = workers or max(1, (os.cpu_count() or 2) // 2)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for path, stats in zip(missing, pool.map(measure_clip, missing)):
+                    results[path] = stats
+                    if stats is not None:
+                        self.store(path, stats)
+        return results
+
+
+loudness_cache = LoudnessCache()
+
+
+def clip_gain_db(stats, target):
+    if not stats or stats["input_i"] <= SILENCE_LUFS:
+        return 0.0
+    # Never push a clip's true peak above the limit; quiet but peaky clips stay a little quieter
+    return min(target - stats["input_i"], TRUE_PEAK_LIMIT - stats["input_tp"])
+
+
+def gain_filter(files, target):
+    # One volume filter for the whole concatenation: a piecewise gain that switches at each
+    # clip boundary, built from cached measurements so export needs a single audio pass
+    from utils import get_video_duration
+    stats = loudness_cache.measure(files)
+    gains = [10 ** (clip_gain_db(stats[f], target) / 20) for f in files]
+    ends = []
+    elapsed = 0.0
+    for f in files:
+        elapsed += get_video_duration(f)
+        ends.append(elapsed)
+    expression = f"{gains[-1]:.4f}"
+    for gain, end in zip(reversed(gains[:-1]), reversed(ends[:-1])):
+        expression = f"if(lt(t,{end:.3f}),{gain:.4f},{expression})"
+    return f"volume='{expression}':eval=frame"
@@ -1,7 +1,6 @@
+import os
 import tkinter as tk
 from tkinter import ttk
-from first_batch_frame import FirstBatchFrame
-from next_batch_frame import NextBatchFrame
 
 class BatchSwitcherApp(tk.Tk):
     def __init__(self):
@@ -13,9 +12,106 @@ class BatchSwitcherApp(tk.Tk):
         self.main_frame.pack(fill="both", expand=True)
         self.project_code_prefix = tk.StringVar(value="E")
         self.project_code_digits = tk.StringVar()
+        self.current_screen = None
+        self.library = None
+        self.library_scanning = False
+        self.library_status_var = tk.StringVar()
+        self.project_code_prefix.trace_add("write", lambda *_: self.update_library_status())
+        self.project_code_digits.trace_add("write", lambda *_: self.update_library_status())
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         self.show_batch_menu()
+        from utils import load_settings
+        root = load_settings().get("library_root")
+        if root and os.path.isdir(root):
+            self.open_library(root)
+
+    def open_library(self, root):
+        # The stored index is read in the scan thread and usable as soon as it is loaded; the
+        # rescan then only lists folders that changed
+        import threading
+        from library import LibraryIndex
+        self.library = LibraryIndex(root)
+        self.library_scanning = True
+        self.update_library_status()
+        threading.Thread(target=self._scan_library, args=(self.library,), daemon=True).start()
+
+    def choose_library(self):
+        from tkinter import filedialog
+        root = filedialog.askdirectory()
+        if not root:
+            return
+        from utils import save_setting
+        save_setting("library_root", os.path.abspath(root))
+        self.open_library(root)
+
+    def _scan_library(self, library):
+        library.load()
+        self.after(0, self._library_loaded, library)
+        library.scan()
+        try:
+            library.save()
+        except OSError:
+            pass
+        self.after(0, self._library_scanned, library)
+
+    def _library_loaded(self, library):
+        if library is self.library:
+            self.update_library_status()
+
+    def _library_scanned(self, library):
+        if library is self.library:
+            self.library_scanning = False
+            self.update_library_status()
+
+    def update_library_status(self):
+        if self.library is None:
+            self.library_status_var.set("No library folder chosen")
+            return
+        from library import describe
+        code = self.get_project_code()
+        project = self.library.project(code)
+        if project:
+            text = f"{code}: {describe(project)}"
+        else:
+            text = f"{code} is not in the library"
+        self.library_status_var.set(text + (" (scanning...)" if self.library_scanning else ""))
+
+    def save_current_session(self):
+        screen, self.current_screen = self.current_screen, None
+        if screen is None:
+            return
+        state = screen.get_session_state()
+        # An emptied screen is saved as empty so clearing a project sticks; a project that never
+        # had clips is left unsaved so the library can still fill it in later
+        if not state["clips"].paths and not getattr(screen, "had_session", False):
+            return
+        from project_session import save_screen_state
+        try:
+            save_screen_state(self.get_project_code(), screen.session_key, state)
+        except OSError as e:
+            from tkinter import messagebox
+            messagebox.showwarning("Project", f"Could not save project session:\n{e}")
+
+    def restore_session(self, screen):
+        from project_session import load_screen_state
+        state = load_screen_state(self.get_project_code(), screen.session_key)
+        screen.had_session = bool(state)
+        if state:
+            screen.apply_session_state(state)
+        elif self.library is not None:
+            # A project opened for the first time starts with its clips from the library
+            clips = self.library.clips(self.get_project_code())
+            if clips:
+                screen.load_library_clips(clips)
+                screen.had_session = True
+        self.current_screen = screen
+
+    def on_close(self):
+        self.save_current_session()
+        self.destroy()
 
     def clear_main(self):
+        self.save_current_session()
         for widget in self.main_frame.winfo_children():
             widget.destroy()
 
@@ -41,18 +137,31 @@ class BatchSwitcherApp(tk.Tk):
         entry_digits = ttk.Entry(proj_frame, textvariable=self.project_code_digits, font=("Arial", 13), width=5, justify="center")
         entry_digits.pack(side="left")
 
+        library_frame = ttk.Frame(self.main_frame)
+        library_frame.pack(pady=(0, 20))
+        ttk.Button(library_frame, text="Library Folder...", command=self.choose_library).pack(side="left", padx=(0, 8))
+        ttk.Label(library_frame, textvariable=self.library_status_var).pack(side="left")
+        self.update_library_status()
+
         btn_first = ttk.Button(self.main_frame, text="First Batch", width=25, command=self.show_first_batch)
         btn_first.pack(pady=8)
         btn_next = ttk.Button(self.main_frame, text="Next Batch", width=25, command=self.show_next_batch)
         btn_next.pack(pady=8)
 
     def show_first_batch(self):
+        # Screens are imported on first use so the menu renders without the export stack
+        from first_batch_frame import FirstBatchFrame
         self.clear_main()
-        FirstBatchFrame(self.main_frame, back_callback=self.show_batch_menu, get_project_code=self.get_project_code).pack(fill="both", expand=True)
+        screen = FirstBatchFrame(self.main_frame, back_callback=self.show_batch_menu, get_project_code=self.get_project_code)
+        screen.pack(fill="both", expand=True)
+        self.restore_session(screen)
 
     def show_next_batch(self):
+        from next_batch_frame import NextBatchFrame
         self.clear_main()
-        NextBatchFrame(self.main_frame, back_callback=self.show_batch_menu, get_project_code=self.get_project_code).pack(fill="both", expand=True)
+        screen = NextBatchFrame(self.main_frame, back_callback=self.show_batch_menu, get_project_code=self.get_project_code)
+        screen.pack(fill="both", expand=True)
+        self.restore_session(screen)
 
 if __name__ == "__main__":
     BatchSwitcherApp().mainloop()
@@ -1,13 +1,15 @@
-from compilations import ScrollableFrame, FileItem
-from utils import get_video_resolution, ensure_folder_for_export, safe_filename, get_ffmpeg_path
+from compilations import (
+    ScrollableFrame, FileItem, RenderQueuePanel, DeliveryPanel, skip_duplicate_clips, mark_changed, preview_compilation,
+    defer_file_items
+)
 from tkinter import ttk, messagebox, filedialog
 import tkinter as tk
+import threading
 import os
-import tempfile
-import subprocess
 
 class ManualCompilationFrame(ttk.LabelFrame):
-    def __init__(self, parent, title, files, on_delete_callback, allow_rename=True, duplicate_callback=None, export_checkbox=True):
+    def __init__(self, parent, title, files, on_delete_callback, allow_rename=True, duplicate_callback=None, export_checkbox=True,
+                 lazy_rows=False):
         super().__init__(parent)
         self.on_delete_callback = on_delete_callback
         self.files = [os.path.abspath(f) for f in files if f]
@@ -26,9 +28,13 @@ class ManualCompilationFrame(ttk.LabelFrame):
             ttk.Checkbutton(self, text="Export", variable=self.export_var).grid(row=0, column=4, padx=2, pady=4)
         self.files_frame = ttk.Frame(self)
         self.files_frame.grid(row=1, column=0, columnspan=5, sticky="ew")
-        self._refresh_file_items()
+        if lazy_rows:
+            defer_file_items(self)
+        else:
+            self._refresh_file_items()
         self.btn_add = ttk.Button(self, text="Add files", command=self.add_files_dialog)
         self.btn_add.grid(row=2, column=0, sticky="w", padx=(5,0), pady=(2,5))
+        ttk.Button(self, text="Preview", command=lambda: preview_compilation(self)).grid(row=2, column=1, sticky="w", padx=2, pady=(2,5))
 
     def set_name(self, name):
         self.name_var.set(name)
@@ -74,44 +80,23 @@ class ManualCompilationFrame(ttk.LabelFrame):
     def should_export(self):
         return self.export_var.get() if self.export_var is not None else True
 
-    def export(self):
+    def build_export_job(self, aspects=None, aspect_policy="crop", languages=None):
+        from utils import safe_filename
+        from export_jobs import make_concat_job
+        name = self.get_name() or "compilation"
+        out_dir = os.path.join(os.path.dirname(self.files[0]), "sequences", "comp2")
+        return make_concat_job(self.files, os.path.join(out_dir, safe_filename(name) + ".mp4"),
+                               aspects=aspects, aspect_policy=aspect_policy, languages=languages)
+
+    def export(self, aspects=None, aspect_policy="crop", languages=None):
         if not self.files or not self.should_export():
             return False
-        try:
-            first_file = self.files[0]
-            base_dir = os.path.dirname(first_file)
-            out_dir = os.path.join(base_dir, "sequences", "comp2")
-            os.makedirs(out_dir, exist_ok=True)
-            name = self.get_name() or "compilation"
-            safe_name = safe_filename(name) + ".mp4"
-            output_path = os.path.join(out_dir, safe_name)
-            with tempfile.TemporaryDirectory() as tmpdir:
-                concat_list = os.path.join(tmpdir, "files.txt")
-                with open(concat_list, "w", encoding="utf-8") as f:
-                    for video_path in self.files:
-                        f.write(f"file '{video_path}'\n")
-                ffmpeg_path = get_ffmpeg_path()
-                cmd = [
-                    ffmpeg_path, "-y", "-f", "concat", "-safe", "0",
-                    "-i", concat_list,
-                    "-c", "copy", output_path
-                ]
-                result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                if result.returncode != 0:
-                    with open(os.path.join(out_dir, "export_error.log"), "a", encoding="utf-8") as logf:
-                        logf.write(f"CMD: {' '.join(cmd)}\n")
-                        logf.write(f"STDOUT:\n{result.stdout}\n\nSTDERR:\n{result.stderr}\n")
-                    return False
-            return True
-        except Exception as e:
-            with open(os.path.join(out_dir, "export_error.log"), "a", encoding="utf-8") as logf:
-                logf.write(str(e))
-            return False
-import tkinter as tk
-from tkinter import ttk
-import platform
+        from export_jobs import run_export_job
+        return run_export_job(self.build_export_job(aspects, aspect_policy, languages))
 
 class NextBatchFrame(ttk.Frame):
+    session_key = "next_batch"
+
     def __init__(self, parent, back_callback, get_project_code):
         super().__init__(parent)
         self.get_project_code = get_project_code
@@ -141,10 +126,15 @@ class NextBatchFrame(ttk.Frame):
         self.btn_add_manual = ttk.Button(left, text="Add Empty Compilation", command=self.add_empty_compilation)
         self.btn_add_manual.pack(pady=5, fill="x")
         self.btn_export_sequences = ttk.Button(left, text="Export All", command=self.export_sequences)
-        self.btn_export_sequences.pack(pady=10, fill="x")
+        self.btn_export_sequences.pack(pady=(10, 2), fill="x")
+        self.btn_export_changed = ttk.Button(left, text="Export Changed", command=self.export_changed)
+        self.btn_export_changed.pack(pady=(0, 10), fill="x")
         self.progress_var = tk.DoubleVar()
         self.progress_bar = ttk.Progressbar(left, variable=self.progress_var, maximum=100)
         self.progress_bar.pack(fill="x", padx=2, pady=(0,10))
+        self.delivery_panel = DeliveryPanel(left, lambda: self._project_code_value())
+        self.delivery_panel.pack(pady=(0, 10))
+        RenderQueuePanel(left, collect_jobs=self.collect_export_jobs).pack(fill="x", pady=(0, 10))
         # ...panel boczny left...
         self.columns_var = tk.StringVar(value="2")  # domyślnie 2 kolumny
         ttk.Label(left, text="Columns (Without Hooks):").pack(pady=(10, 0))
@@ -181,17 +171,20 @@ class NextBatchFrame(ttk.Frame):
         self.reset_compilations()
 
 
-       # ttk.Label(left, text="1. Copy table from Excel (Ctrl+C)\n2. Click 'Paste' or paste manually:", font=("Arial", 10), foreground="#008").pack(pady=(12,2))
-       # self.excel_text = tk.Text(left, height=8, width=30, wrap="none")
-       # self.excel_text.pack(padx=2, pady=(2,2))
-       # buttons_frame = ttk.Frame(left)
-       # buttons_frame.pack(fill="x", pady=(1,3))
-       # self.btn_paste = ttk.Button(buttons_frame, text="Paste", width=9, command=self.paste_from_clipboard)
-       # self.btn_paste.pack(side="left", padx=(0,4))
-       # self.btn_clear_table = ttk.Button(buttons_frame, text="Clear table", width=12, command=self.clear_excel_table)
-       # self.btn_clear_table.pack(side="left", padx=(2,0))
-       # self.btn_generate = ttk.Button(left, text="Generate compilations from table", command=self.paste_excel_table)
-       # self.btn_generate.pack(pady=5, fill="x")
+        ttk.Label(left, text="1. Copy table from Excel (Ctrl+C)\n2. Click 'Paste' or load a TSV/CSV file:", font=("Arial", 10), foreground="#008").pack(pady=(12,2))
+        self.excel_text = tk.Text(left, height=8, width=30, wrap="none")
+        self.excel_text.pack(padx=2, pady=(2,2))
+        buttons_frame = ttk.Frame(left)
+        buttons_frame.pack(fill="x", pady=(1,3))
+        self.btn_paste = ttk.Button(buttons_frame, text="Paste", width=9, command=self.paste_from_clipboard)
+        self.btn_paste.pack(side="left", padx=(0,4))
+        self.btn_load_table = ttk.Button(buttons_frame, text="Load file", width=9, command=self.load_table_file)
+        self.btn_load_table.pack(side="left", padx=(0,4))
+        self.btn_clear_table = ttk.Button(buttons_frame, text="Clear table", width=12, command=self.clear_excel_table)
+        self.btn_clear_table.pack(side="left", padx=(2,0))
+        self.btn_generate = ttk.Button(left, text="Generate compilations from table", command=self.paste_excel_table)
+        self.btn_generate.pack(pady=5, fill="x")
+
     def on_change_columns(self):
         try:
             num_cols = int(self.columns_var.get())
@@ -236,6 +229,9 @@ class NextBatchFrame(ttk.Frame):
         filepaths = filedialog.askopenfilenames(filetypes=[("Video files", "*.mp4 *.mov *.mkv *.avi *.flv *.wmv")])
         if not filepaths:
             return
+        skip_duplicate_clips(self, filepaths, self._load_tips)
+
+    def _load_tips(self, filepaths):
         self.tips_files = []
         self.reset_compilations()
         for path in filepaths:
@@ -245,10 +241,21 @@ class NextBatchFrame(ttk.Frame):
         self.rebuild_hook_combinations()
         messagebox.showinfo("Loaded", f"Loaded {len(self.tips_files)} Tips files.")
 
+    def load_library_clips(self, clips):
+        self.reset_compilations()
+        self.tips_files = list(clips["tip"])
+        self.hooks_files = list(clips["hook"])
+        if self.tips_files:
+            self.add_compilation_from_files(self.tips_files)
+        self.rebuild_hook_combinations()
+
     def load_hooks_files(self):
         filepaths = filedialog.askopenfilenames(filetypes=[("Video files", "*.mp4 *.mov *.mkv *.avi *.flv *.wmv")])
         if not filepaths:
             return
+        skip_duplicate_clips(self, filepaths, self._load_hooks, existing=self.tips_files + self.hooks_files)
+
+    def _load_hooks(self, filepaths):
         for path in filepaths:
             abspath = os.path.abspath(path)
             if abspath not in self.hooks_files:
@@ -256,56 +263,78 @@ class NextBatchFrame(ttk.Frame):
         self.rebuild_hook_combinations()
         messagebox.showinfo("Loaded", f"Loaded {len(filepaths)} new Hooks files (total: {len(self.hooks_files)})")
 
-    # def paste_from_clipboard(self):
-    #     try:
-    #         self.excel_text.delete("1.0", tk.END)
-    #         raw = self.clipboard_get()
-    #         self.excel_text.insert("1.0", raw)
-    #     except tk.TclError:
-    #         messagebox.showwarning("Clipboard error", "Clipboard error.")
-
-    # def clear_excel_table(self):
-    #     self.excel_text.delete("1.0", tk.END)
-    #     for cf in self.generated_from_table:
-    #         cf.destroy()
-    #     self.generated_from_table = []
-    #     self.rebuild_hook_combinations()
-
-    # def paste_excel_table(self):
-    #     raw = self.excel_text.get("1.0", tk.END).strip()
-    #     if not raw:
-    #         messagebox.showwarning("No table", "No table to paste.")
-    #         return
-    #     if not self.tips_files or len(self.tips_files) == 0:
-    #         messagebox.showwarning("No tips", "Load Tips files first!")
-    #         return
-    #     try:
-    #         rows = [r for r in raw.strip().split('\n') if r]
-    #         data = [row.split('\t') for row in rows]
-    #         if not data or len(data) < 2:
-    #             messagebox.showwarning("Table error", "Table error!")
-    #             return
-    #         headers = data[0]
-    #         columns = list(zip(*data[1:]))
-    #         alias_to_path = {}
-    #         for path in self.tips_files:
-    #             base = os.path.basename(path)
-    #             idx = self.tips_files.index(path)
-    #             alias = f"T{idx+1}"
-    #             alias_to_path[alias.upper()] = path
-    #         self.generated_from_table = []
-    #         for col_idx, col_name in enumerate(headers):
-    #             files_aliases = columns[col_idx]
-    #             files_real = []
-    #             for alias in files_aliases:
-    #                 alias_lc = alias.strip().upper()
-    #                 if alias_lc in alias_to_path:
-    #                     files_real.append(alias_to_path[alias_lc])
-    #             cf = self.add_compilation_from_files(files_real, table_label=col_name)
-    #             self.generated_from_table.append(cf)
-    #         self.rebuild_hook_combinations()
-    #     except Exception as e:
-    #         messagebox.showwarning("Table error", f"Error: {e}")
+    def paste_from_clipboard(self):
+        try:
+            raw = self.clipboard_get()
+        except tk.TclError:
+            messagebox.showwarning("Clipboard error", "Clipboard error.")
+            return
+        self.excel_text.delete("1.0", tk.END)
+        self.excel_text.insert("1.0", raw)
+
+    def load_table_file(self):
+        path = filedialog.askopenfilename(filetypes=[("Tables", "*.tsv *.csv *.txt"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            with open(path, "r", encoding="utf-8-sig") as f:
+                raw = f.read()
+        except OSError as e:
+            messagebox.showerror("Table error", f"Could not read {os.path.basename(path)}: {e}")
+            return
+        self.excel_text.delete("1.0", tk.END)
+        self.excel_text.insert("1.0", raw)
+
+    def clear_excel_table(self):
+        self.excel_text.delete("1.0", tk.END)
+        self._remove_table_compilations()
+        self.relayout_compilations()
+        self.rebuild_hook_combinations()
+
+    def _remove_table_compilations(self):
+        for cf in self.generated_from_table:
+            cf.destroy()
+            if cf in self.compilation_frames:
+                self.compilation_frames.remove(cf)
+        self.generated_from_table = []
+
+    def paste_excel_table(self):
+        from layout_import import build_alias_index, parse_layout, resolve_layout
+        raw = self.excel_text.get("1.0", tk.END)
+        if not raw.strip():
+            messagebox.showwarning("No table", "No table to paste.")
+            return
+        if not self.tips_files:
+            messagebox.showwarning("No tips", "Load Tips files first!")
+            return
+        index = build_alias_index(self.tips_files, self.hooks_files)
+        layout, errors = resolve_layout(parse_layout(raw), index)
+        # Every reference is checked before any frame is built, so a typo never leaves half a layout
+        if errors:
+            shown = "\n".join(errors[:15])
+            if len(errors) > 15:
+                shown += f"\n...and {len(errors) - 15} more"
+            messagebox.showwarning("Table error", shown)
+            return
+        self._remove_table_compilations()
+        for label, files in layout:
+            cf = ManualCompilationFrame(
+                self.container,
+                title=label,
+                files=files,
+                on_delete_callback=self.remove_compilation_frame,
+                allow_rename=True,
+                duplicate_callback=self.duplicate_compilation,
+                export_checkbox=True
+            )
+            self.compilation_frames.append(cf)
+            self.generated_from_table.append(cf)
+        self.relayout_compilations()
+        for cf, (label, _) in zip(self.generated_from_table, layout):
+            if label:
+                cf.set_name(label)
+        self.rebuild_hook_combinations()
+        messagebox.showinfo("Table", f"Created {len(layout)} compilations from the table.")
 
     def add_compilation_from_files(self, files, table_label=None):
         idx = len(self.compilation_frames)
@@ -364,6 +393,77 @@ class NextBatchFrame(ttk.Frame):
         self.relayout_compilations()
         self.rebuild_hook_combinations()
 
+    def clip_actions(self, path):
+        return [("Replace everywhere...", lambda: self.replace_clip_everywhere(path)),
+                ("Remove everywhere", lambda: self.remove_clip_everywhere(path))]
+
+    def replace_clip_everywhere(self, old_path):
+        # Hand-edited compilations keep their order and names; only the ones using the clip change
+        new_path = filedialog.askopenfilename(title=f"Replace {os.path.basename(old_path)}",
+                                              filetypes=[("Video files", "*.mp4 *.mov *.mkv *.avi *.flv *.wmv")])
+        if not new_path:
+            return
+        from clip_index import ClipIndex, replace_in_list
+        new_path = os.path.abspath(new_path)
+        index = ClipIndex(self.compilation_frames + self.hooks_compilation_frames)
+        if new_path != os.path.abspath(old_path) and index.owners(new_path):
+            messagebox.showwarning("Replace clip", f"{os.path.basename(new_path)} is already used here.")
+            return
+        changed = index.replace(old_path, new_path)
+        self.tips_files = replace_in_list(self.tips_files, old_path, new_path)
+        self.hooks_files = replace_in_list(self.hooks_files, old_path, new_path)
+        for frame in changed:
+            frame._refresh_file_items()
+            mark_changed(frame)
+        messagebox.showinfo("Replace clip", f"Replaced in {len(changed)} compilations.")
+
+    def remove_clip_everywhere(self, path):
+        from clip_index import ClipIndex, remove_from_list
+        path = os.path.abspath(path)
+        if path in self.hooks_files:
+            # A hook compilation without its hook would only repeat a compilation without hooks
+            for cf in [cf for cf in self.hooks_compilation_frames if cf.files and cf.files[0] == path]:
+                cf.destroy()
+                self.hooks_compilation_frames.remove(cf)
+            self.hooks_files.remove(path)
+        changed = ClipIndex(self.compilation_frames + self.hooks_compilation_frames).remove(path)
+        self.tips_files = remove_from_list(self.tips_files, path)
+        for frame in changed:
+            frame._refresh_file_items()
+            mark_changed(frame)
+
+    def export_changed(self):
+        # Only the compilations marked by Replace or Remove everywhere, exported in a thread like
+        # on the First Batch screen; outputs already exported with the same clips are skipped
+        frames = [frame for frame in self.compilation_frames + self.hooks_compilation_frames
+                  if getattr(frame, "changed", False) and frame.files and frame.should_export()]
+        if not frames:
+            messagebox.showinfo("Export", "No compilation was changed since its last export.")
+            return
+        self.progress_var.set(0)
+        self.btn_export_changed.config(state="disabled")
+        threading.Thread(target=self._run_changed_exports, args=(frames,), daemon=True).start()
+
+    def _run_changed_exports(self, frames):
+        from export_jobs import is_up_to_date, run_export_jobs
+        count, failed = 0, []
+        try:
+            stale = [job for job in self.collect_export_jobs(frames) if not is_up_to_date(job)]
+            count = len(stale)
+            failed = run_export_jobs(stale, on_progress=lambda done, total: self.after(0, self.progress_var.set, 100 * done / total))
+        finally:
+            self.after(0, self._finish_changed_exports, frames, count, failed)
+
+    def _finish_changed_exports(self, frames, count, failed):
+        self.btn_export_changed.config(state="normal")
+        self.progress_var.set(0)
+        if failed:
+            messagebox.showerror("Export error", "\n".join(failed))
+            return
+        for frame in frames:
+            mark_changed(frame, False)
+        messagebox.showinfo("Export", f"Exported {count} changed outputs." if count else "Everything is up to date.")
+
     def update_compilation_names(self):
         for idx, frame in enumerate(self.compilation_frames):
             frame.set_name(self._format_tip_name(idx))
@@ -380,17 +480,65 @@ class NextBatchFrame(ttk.Frame):
             for idx, base_comp in enumerate(self.compilation_frames):
                 files = [hook_path] + base_comp.files
                 name = self._format_hook_name(idx, hook_idx)
-                cf = ManualCompilationFrame(
-                    self.hooks_container.scrollable_frame,
-                    title=name,
-                    files=files,
-                    on_delete_callback=lambda f: f.destroy(),
-                    allow_rename=True,
-                    duplicate_callback=None,
-                    export_checkbox=True
-                )
-                cf.pack(fill="x", pady=4)
-                self.hooks_compilation_frames.append(cf)
+                self._add_hook_compilation_frame(name, files)
+
+    def _add_hook_compilation_frame(self, name, files, export=True, lazy_rows=False):
+        cf = ManualCompilationFrame(
+            self.hooks_container.scrollable_frame,
+            title=name,
+            files=files,
+            on_delete_callback=lambda f: f.destroy(),
+            allow_rename=True,
+            duplicate_callback=None,
+            export_checkbox=True,
+            lazy_rows=lazy_rows
+        )
+        cf.export_var.set(export)
+        cf.pack(fill="x", pady=4)
+        self.hooks_compilation_frames.append(cf)
+        return cf
+
+    def get_session_state(self):
+        from project_session import ClipTable
+        clips = ClipTable()
+
+        def describe(cf):
+            return {"name": cf.get_name(), "files": clips.refs(cf.files), "export": cf.should_export()}
+        return {
+            "clips": clips,
+            "columns": self.columns_var.get(),
+            "tips_files": clips.refs(self.tips_files),
+            "hooks_files": clips.refs(self.hooks_files),
+            "compilations": [describe(cf) for cf in self.compilation_frames],
+            "hook_compilations": [describe(cf) for cf in self.hooks_compilation_frames]
+        }
+
+    def apply_session_state(self, state):
+        clips = state["clips"]
+        self.reset_compilations()
+        self.columns_var.set(state.get("columns", "2"))
+        self.tips_files = clips.resolve(state.get("tips_files", []))
+        self.hooks_files = clips.resolve(state.get("hooks_files", []))
+        # Frames are created in one batch with a single relayout instead of one per compilation
+        for saved in state.get("compilations", []):
+            cf = ManualCompilationFrame(
+                self.container,
+                title=saved["name"],
+                files=clips.resolve(saved["files"]),
+                on_delete_callback=self.remove_compilation_frame,
+                allow_rename=True,
+                duplicate_callback=self.duplicate_compilation,
+                export_checkbox=True,
+                lazy_rows=True
+            )
+            cf.export_var.set(saved.get("export", True))
+            self.compilation_frames.append(cf)
+        self.relayout_compilations()
+        for cf, saved in zip(self.compilation_frames, state.get("compilations", [])):
+            cf.set_name(saved["name"])
+        for saved in state.get("hook_compilations", []):
+            self._add_hook_compilation_frame(saved["name"], clips.resolve(saved["files"]), saved.get("export", True),
+                                             lazy_rows=True)
 
     def reset_compilations(self):
         for cf in getattr(self, "compilation_frames", []):
@@ -403,6 +551,14 @@ class NextBatchFrame(ttk.Frame):
         if hasattr(self, "excel_text"):
             self.excel_text.delete("1.0", tk.END)
 
+    def collect_export_jobs(self, frames=None):
+        from export_jobs import with_delivery_options
+        panel = self.delivery_panel
+        frames = self.compilation_frames + self.hooks_compilation_frames if frames is None else frames
+        jobs = [cf.build_export_job(panel.selected_aspects(), panel.policy(), panel.languages())
+                for cf in frames if cf.files and cf.should_export()]
+        return with_delivery_options(jobs, **panel.delivery_options())
+
     def export_sequences(self):
         export_list = [cf for cf in self.compilation_frames if cf.should_export()]
         hooks_list = [cf for cf in self.hooks_compilation_frames if cf.should_export()]
@@ -410,6 +566,7 @@ class NextBatchFrame(ttk.Frame):
         if not total:
             messagebox.showinfo("Export", "No compilations to export (none selected for export).")
             return
+        from utils import get_video_resolution
         base_res = None
         for cf in export_list + hooks_list:
             for f in cf.files:
@@ -419,17 +576,13 @@ class NextBatchFrame(ttk.Frame):
                     messagebox.showerror("Resolution mismatch", "Not all files in all compilations have the same resolution!")
                     return
         self.progress_var.set(0)
-        errors = []
-        all_frames = export_list + hooks_list
-        for idx, cf in enumerate(all_frames):
-            try:
-                ok = cf.export()
-                if not ok:
-                    errors.append(f"{cf.get_name()}")
-            except Exception as e:
-                errors.append(f"{cf.get_name()}: {e}")
-            self.progress_var.set(100*(idx+1)/total)
+        from export_jobs import run_export_jobs
+        all_frames = [cf for cf in export_list + hooks_list if cf.files]
+
+        def on_progress(done, total):
+            self.progress_var.set(100 * done / total)
             self.update()
+        errors = run_export_jobs(self.collect_export_jobs(), on_progress=on_progress)
         if errors:
             messagebox.showerror("Export error", "\n".join(errors))
         else:
@@ -0,0 +1,94 @@
+import os
+import sys
+import subprocess
+from intermediates import IntermediateCache
+
+# Seconds kept on both sides of every join, and from the start of the first clip
+JOIN_SECONDS = 2.0
+PREVIEW_MAX_BYTES = 512 * 1024 ** 2
+# Small, fast encode: cut points are frame-accurate, unlike a stream copy that starts each
+# segment at the keyframe before it
+PREVIEW_HEIGHT = 360
+ENCODE_ARGS = ["-c:v", "libx264", "-preset", "ultrafast", "-crf", "30", "-pix_fmt", "yuv420p",
+               "-c:a", "aac", "-b:a", "96k"]
+
+
+def preview_segments(durations, seconds=JOIN_SECONDS):
+    # (clip index, inpoint, outpoint) for the opening and both sides of every join; None means
+    # the start or end of the clip. A clip too short to cut is kept whole.
+    segments = []
+    last = len(durations) - 1
+    for i, duration in enumerate(durations):
+        tail = seconds if i < last else 0
+        if seconds + tail >= duration:
+            segments.append((i, None, None))
+            continue
+        segments.append((i, None, seconds))
+        if tail:
+            segments.append((i, duration - tail, None))
+    return segments
+
+
+def _preview_size(resolution):
+    # The first clip's shape at PREVIEW_HEIGHT (or less), with even sides for libx264
+    try:
+        width, height = (int(v) for v in resolution.split("x"))
+    except ValueError:
+        width, height = 16, 9
+    out_height = min(PREVIEW_HEIGHT, height) // 2 * 2 or 2
+    return max(2, round(width * out_height / height / 2) * 2), out_height
+
+
+# Previews are small and only useful while a compilation is being reviewed, so they get
+# their own folder and a much smaller limit than the merged intermediates
+preview_cache = IntermediateCache(max_bytes=PREVIEW_MAX_BYTES, name="previews")
+
+
+def build_preview(files, seconds=JOIN_SECONDS):
+    # Low-bitrate proxy of only the seconds around each join. Every segment is seeked and cut
+    # on its own input, so it starts and ends exactly where asked, and the concat filter
+    # joins them without overlapping timestamps. Cached by the clips' content, so an unchanged
+    # compilation opens at once.
+    from probes import probe_cache
+    from utils import get_ffmpeg_path
+    files = list(files)
+
+    def build(out_path):
+        probes = [probe_cache.get(p) for p in files]
+        width, height = _preview_size(probes[0]["resolution"])
+        with_audio = all(p.get("sample_rate") for p in probes)
+        cmd = [get_ffmpeg_path(), "-y", "-hide_banner", "-loglevel", "error"]
+        chains = []
+        pads = ""
+        segments = preview_segments([p["duration"] for p in probes], seconds)
+        for n, (index, inpoint, outpoint) in enumerate(segments):
+            if inpoint is not None:
+                cmd += ["-ss", f"{inpoint:.3f}"]
+            if outpoint is not None:
+                cmd += ["-t", f"{outpoint - (inpoint or 0):.3f}"]
+            cmd += ["-i", files[index]]
+            # Clips of another shape are fitted with bars so the concat filter accepts them
+            chains.append(f"[{n}:v]scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                          f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1[v{n}]")
+            pads += f"[v{n}]"
+            if with_audio:
+                chains.append(f"[{n}:a]aresample=48000[a{n}]")
+                pads += f"[a{n}]"
+        chains.append(f"{pads}concat=n={len(segments)}:v=1:a={int(with_audio)}[v]" + ("[a]" if with_audio else ""))
+        cmd += ["-filter_complex", ";".join(chains), "-map", "[v]"] + (["-map", "[a]"] if with_audio else [])
+        cmd += ENCODE_ARGS + ["-movflags", "+faststart", "-f", "mp4", out_path]
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Error while building the preview:\n{result.stderr}")
+
+    return preview_cache.get_or_build(files, build, variant=f"preview-encoded:{seconds}")
+
+
+def open_in_player(path):
+    # The system's default video player; raises OSError when there is none
+    if os.name == "nt":
+        os.startfile(path)
+    elif sys.platform == "darwin":
+        subprocess.Popen(["open", path])
+    else:
+        subprocess.Popen(["xdg-open", path])
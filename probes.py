@@ -0,0 +1,77 @@
+import os
+import threading
+
+
+def clip_signature(path):
+    # Content fingerprint of the clip; the same tip under another name or folder shares it
+    from fingerprints import clip_fingerprint
+    return clip_fingerprint(path)
+
+
+# Probe results keyed by clip content rather than path
+class ProbeCache:
+    def __init__(self):
+        self._entries = {}
+        self._stored = {}
+        self._lock = threading.Lock()
+
+    def get(self, filepath):
+        from utils import probe_video
+        from fingerprints import fingerprint_service
+        path = os.path.abspath(filepath)
+        with self._lock:
+            stored = self._stored.pop(path, None)
+        if stored is not None and stored[0] is not None:
+            # Unchanged size and mtime since the session was saved: its fingerprint is reused
+            fingerprint_service.prime(path, stored[2], stored[0])
+        signature = clip_signature(path)
+        with self._lock:
+            cached = self._entries.get(signature)
+        if cached is not None:
+            return cached
+        if stored is not None and signature is not None and stored[0] == signature:
+            with self._lock:
+                self._entries[signature] = stored[1]
+            return stored[1]
+        info = probe_video(path)
+        if signature is not None and info["duration"] > 0:
+            with self._lock:
+                self._entries[signature] = info
+        return info
+
+    def peek(self, filepath):
+        # What a session save stores for the clip. Never reads the clip: a clip that was not
+        # fingerprinted since it last changed has nothing to store.
+        from fingerprints import fingerprint_service
+        path = os.path.abspath(filepath)
+        with self._lock:
+            stored = self._stored.get(path)
+        if stored is not None:
+            # Not needed since the session was opened: carried over to the next save unchecked
+            return {"signature": stored[0], "probe": dict(stored[1]), "stat": stored[2]}
+        known = fingerprint_service.known(path)
+        if known is None:
+            return None
+        with self._lock:
+            probe = self._entries.get(known[1])
+            return {"signature": known[1], "probe": dict(probe), "stat": known[0]} if probe else None
+
+    def seed(self, path, signature, probe, stat=None):
+        # Results stored in a session are only checked when the clip is first needed, and only
+        # trusted while the file on disk still has the same size and mtime, or else content
+        with self._lock:
+            self._stored[os.path.abspath(path)] = (signature, dict(probe), stat)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def forget(self, filepath):
+        from fingerprints import fingerprint_service
+        path = os.path.abspath(filepath)
+        signature = clip_signature(path)
+        fingerprint_service.forget(path)
+        with self._lock:
+            self._entries.pop(signature, None)
+
+
+probe_cache = ProbeCache()
@@ -0,0 +1,86 @@
+import os
+import json
+import gzip
+import time
+
+SESSION_VERSION = 1
+
+
+def session_path(project_code):
+    from utils import user_data_dir, safe_filename
+    return os.path.join(user_data_dir("projects"), f"{safe_filename(project_code) or 'E000'}.json.gz")
+
+
+# Layouts store small indexes into one clip table instead of repeating absolute paths
+class ClipTable:
+    def __init__(self, paths=None):
+        self.paths = list(paths or [])
+        self._index = {p: i for i, p in enumerate(self.paths)}
+
+    def ref(self, path):
+        path = os.path.abspath(path)
+        if path not in self._index:
+            self._index[path] = len(self.paths)
+            self.paths.append(path)
+        return self._index[path]
+
+    def refs(self, paths):
+        return [self.ref(p) for p in paths]
+
+    def resolve(self, refs):
+        return [self.paths[i] for i in refs if 0 <= i < len(self.paths)]
+
+
+def _read(project_code):
+    path = session_path(project_code)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != SESSION_VERSION:
+        return None
+    return data
+
+
+def save_screen_state(project_code, screen_key, state):
+    from probes import probe_cache
+    data = _read(project_code) or {"version": SESSION_VERSION, "code": project_code, "screens": {}}
+    clips = state.pop("clips")
+    clip_rows = []
+    for path in clips.paths:
+        row = {"path": path}
+        cached = probe_cache.peek(path)
+        if cached:
+            row["signature"] = cached["signature"]
+            row["probe"] = cached["probe"]
+            row["stat"] = cached["stat"]
+        clip_rows.append(row)
+    state["clips"] = clip_rows
+    state["saved_at"] = time.time()
+    data["screens"][screen_key] = state
+    target = session_path(project_code)
+    tmp_path = target + ".tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp_path, target)
+
+
+def load_screen_state(project_code, screen_key):
+    from probes import probe_cache
+    data = _read(project_code)
+    if not data:
+        return None
+    state = data.get("screens", {}).get(screen_key)
+    if not state:
+        return None
+    rows = state.get("clips", [])
+    # Stored probes are only reused for clips whose size and mtime (or else content fingerprint)
+    # still match, so changed files get probed again on first use and nothing else does
+    for row in rows:
+        if "probe" in row:
+            probe_cache.seed(row["path"], row.get("signature"), row["probe"], row.get("stat"))
+    state["clips"] = ClipTable(row["path"] for row in rows)
+    return state
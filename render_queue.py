@@ -0,0 +1,278 @@
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import argparse
+import threading
+
+# Directory-based job queue on shared storage. Every state change is a rename inside the
+# queue folder, which is atomic on one filesystem (including SMB/NFS shares), so exactly one
+# worker wins each claim without relying on SQLite locking over the network.
+#
+# Job ids are <enqueue time>-<batch id>-<random>, so the order of names is the order of
+# submission and a batch's jobs can be counted from the folder listings alone.
+#
+#   pending/<id>.json  waiting for a worker
+#   claimed/<id>.json  being rendered; claimed/<id>.lease is touched while the worker is alive
+#   done/<id>.json     finished, with the worker's result
+#   failed/<id>.json   the export failed
+STATES = ("pending", "claimed", "done", "failed")
+DEFAULT_LEASE_SECONDS = 60
+
+
+def _ensure_layout(queue_dir):
+    for state in STATES:
+        os.makedirs(os.path.join(queue_dir, state), exist_ok=True)
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def enqueue_jobs(queue_dir, jobs, batch_id=None):
+    _ensure_layout(queue_dir)
+    batch_id = batch_id or uuid.uuid4().hex[:12]
+    for job in jobs:
+        job_id = f"{time.time_ns():020d}-{batch_id}-{uuid.uuid4().hex[:8]}"
+        entry = {"id": job_id, "batch": batch_id, "job": job, "submitted_at": time.time()}
+        # Written outside pending/ first so workers never see a half-written file
+        staging = os.path.join(queue_dir, f".{job_id}.json")
+        _write_json(staging, entry)
+        os.replace(staging, os.path.join(queue_dir, "pending", f"{job_id}.json"))
+    return batch_id
+
+
+def _batch_of(name):
+    # Batch id from a job file name; None for names from before the batch was part of it
+    stem = name[:-len(".json")]
+    if len(stem) <= 29:
+        return None
+    return stem[21:-9]
+
+
+def batch_status(queue_dir, batch_id):
+    # Counted from the file names, so the history in done/ is listed but never read; only this
+    # batch's failed jobs are opened, for the names of their outputs
+    counts = {state: 0 for state in STATES}
+    failed = []
+    for state in STATES:
+        folder = os.path.join(queue_dir, state)
+        if not os.path.isdir(folder):
+            continue
+        for name in os.listdir(folder):
+            if not name.endswith(".json"):
+                continue
+            batch = _batch_of(name)
+            if batch is not None and batch != batch_id:
+                continue
+            entry = None
+            if batch is None or state == "failed":
+                entry = _read_json(os.path.join(folder, name))
+                if not entry or entry.get("batch") != batch_id:
+                    continue
+            counts[state] += 1
+            if state == "failed":
+                failed.append(os.path.basename(entry["job"]["output_path"]))
+    counts["failed_outputs"] = failed
+    return counts
+
+
+def requeue_expired(queue_dir, lease_seconds=DEFAULT_LEASE_SECONDS):
+    claimed_dir = os.path.join(queue_dir, "claimed")
+    now = time.time()
+    for name in os.listdir(claimed_dir):
+        if not name.endswith(".json"):
+            continue
+        job_path = os.path.join(claimed_dir, name)
+        lease_path = job_path[:-len(".json")] + ".lease"
+        try:
+            last_beat = os.path.getmtime(lease_path)
+        except OSError:
+            try:
+                last_beat = os.path.getmtime(job_path)
+            except OSError:
+                continue
+        if now - last_beat < lease_seconds:
+            continue
+        try:
+            os.replace(job_path, os.path.join(queue_dir, "pending", name))
+        except OSError:
+            continue
+        try:
+            os.remove(lease_path)
+        except OSError:
+            pass
+
+
+class _Lease:
+    def __init__(self, lease_path, worker_id, lease_seconds):
+        self.lease_path = lease_path
+        self.worker_id = worker_id
+        self.interval = max(1.0, lease_seconds / 3)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, daemon=True)
+
+    def __enter__(self):
+        self._touch()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        try:
+            os.remove(self.lease_path)
+        except OSError:
+            pass
+
+    def _touch(self):
+        with open(self.lease_path, "w", encoding="utf-8") as f:
+            f.write(self.worker_id)
+
+    def _beat(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._touch()
+            except OSError:
+                pass
+
+
+def claim_next(queue_dir):
+    pending_dir = os.path.join(queue_dir, "pending")
+    for name in sorted(os.listdir(pending_dir)):
+        if not name.endswith(".json"):
+            continue
+        pending_path = os.path.join(pending_dir, name)
+        claimed_path = os.path.join(queue_dir, "claimed", name)
+        try:
+            # A rename keeps the mtime from when the job was queued, and until the lease file
+            # exists that mtime is the claim's only heartbeat; without the touch a job that
+            # waited longer than a lease would be requeued by another worker at once
+            os.utime(pending_path)
+            os.replace(pending_path, claimed_path)
+        except OSError:
+            # Another worker claimed it first
+            continue
+        entry = _read_json(claimed_path)
+        if entry is None:
+            os.replace(claimed_path, os.path.join(queue_dir, "failed", name))
+            continue
+        return claimed_path, entry
+    return None, None
+
+
+def _slashed(path):
+    # Forward slashes and an upper-case drive letter, so Z:\Projects, z:/Projects and
+    # Z:/Projects/ all compare equal
+    path = path.replace("\\", "/")
+    if len(path) >= 2 and path[1] == ":":
+        path = path[0].upper() + path[1:]
+    return path
+
+
+def _map_paths(job, path_map):
+    if not path_map:
+        return job
+    prefixes = [(_slashed(src).rstrip("/"), dst.rstrip("/\\")) for src, dst in path_map]
+    def remap(path):
+        slashed = _slashed(path)
+        for src, dst in prefixes:
+            if slashed == src or slashed.startswith(src + "/"):
+                return dst + slashed[len(src):]
+        return path
+    job = dict(job)
+    job["files"] = [remap(f) for f in job["files"]]
+    job["output_path"] = remap(job["output_path"])
+    job["destinations"] = [remap(d) for d in job.get("destinations", [])]
+    job["extra_outputs"] = [
+        dict(extra, output_path=remap(extra["output_path"]), audio_files=[remap(f) for f in extra.get("audio_files", [])])
+        for extra in job.get("extra_outputs", [])
+    ]
+    return job
+
+
+def run_worker(queue_dir, worker_id=None, lease_seconds=DEFAULT_LEASE_SECONDS, poll_interval=2.0, once=False, path_map=None,
+               runner=None):
+    # runner(job) -> bool renders one job; bench_render_queue.py passes a stand-in
+    if runner is None:
+        from export_jobs import run_export_job as runner
+    _ensure_layout(queue_dir)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    while True:
+        requeue_expired(queue_dir, lease_seconds)
+        claimed_path, entry = claim_next(queue_dir)
+        if entry is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+        name = os.path.basename(claimed_path)
+        lease_path = claimed_path[:-len(".json")] + ".lease"
+        started = time.time()
+        # The lease is kept until the job has left claimed/, otherwise requeue_expired would see
+        # no lease, fall back to the claim's mtime and send a long render back to pending
+        with _Lease(lease_path, worker_id, lease_seconds):
+            ok = runner(_map_paths(entry["job"], path_map))
+            entry["result"] = {"ok": ok, "worker": worker_id, "started_at": started, "finished_at": time.time()}
+            finished_path = os.path.join(queue_dir, "done" if ok else "failed", name)
+            try:
+                # Moved before the result is written, so a job that was requeued meanwhile is
+                # never recreated in claimed/
+                os.replace(claimed_path, finished_path)
+            except OSError:
+                # The lease expired and the job went back to pending; leave it for the next claim
+                continue
+            _write_json(finished_path, entry)
+        print(f"[{worker_id}] {'done' if ok else 'FAILED'}: {entry['job']['output_path']}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LegoPy shared render queue")
+    sub = parser.add_subparsers(dest="command", required=True)
+    worker = sub.add_parser("worker", help="claim and render jobs from a queue folder")
+    worker.add_argument("--queue", required=True, help="queue folder on shared storage")
+    worker.add_argument("--processes", type=int, default=1, help="number of worker processes to start")
+    worker.add_argument("--lease", type=int, default=DEFAULT_LEASE_SECONDS, help="seconds before an unrenewed claim is requeued")
+    worker.add_argument("--once", action="store_true", help="exit when the queue is empty")
+    worker.add_argument("--map", action="append", default=[], metavar="FROM=TO",
+                        help="rewrite path prefixes, e.g. Z:/Projects=/mnt/nas/Projects")
+    status = sub.add_parser("status", help="show job counts for a batch")
+    status.add_argument("--queue", required=True)
+    status.add_argument("batch")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        print(json.dumps(batch_status(args.queue, args.batch), indent=1))
+        return 0
+    path_map = [tuple(item.split("=", 1)) for item in args.map if "=" in item]
+    if args.processes > 1:
+        import multiprocessing
+        procs = [
+            multiprocessing.Process(target=run_worker, args=(args.queue,),
+                                    kwargs={"lease_seconds": args.lease, "once": args.once, "path_map": path_map})
+            for _ in range(args.processes)
+        ]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+        return 0
+    run_worker(args.queue, lease_seconds=args.lease, once=args.once, path_map=path_map)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
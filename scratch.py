@@ -0,0 +1,129 @@
+import os
+import shutil
+import threading
+
+# Kept free on every disk on top of the estimates, for logs, manifests and estimate error
+SAFETY_MARGIN = 1024 ** 3
+
+
+def _existing_folder(path):
+    folder = os.path.abspath(path)
+    while not os.path.isdir(folder):
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            break
+        folder = parent
+    return folder
+
+
+def disk_of(path):
+    # (device id, folder to ask for free space) of the filesystem path will be written to
+    folder = _existing_folder(path)
+    try:
+        return os.stat(folder).st_dev, folder
+    except OSError:
+        return None, folder
+
+
+def free_bytes(folder):
+    try:
+        return shutil.disk_usage(folder).free
+    except OSError:
+        return None
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def estimate_job_outputs(job):
+    # {path: bytes} for every output and delivery copy. Stream copies are about as large as
+    # the part of the inputs they use; trims scale with the share of the footage kept.
+    from export_jobs import job_outputs, job_copies
+    from utils import get_video_duration
+    input_bytes = sum(_size(f) for f in job["files"])
+    total = sum(get_video_duration(f) for f in job["files"]) if job["kind"] == "concat_trim" else 0
+    estimates = {}
+    copies = job_copies(job)
+    for output in job_outputs(job):
+        size = input_bytes
+        if output.get("duration_sec") and total > 0:
+            size = int(input_bytes * min(1.0, output["duration_sec"] / total))
+        for path in [output["output_path"]] + copies.get(output["output_path"], []):
+            estimates[path] = size
+    return estimates
+
+
+def estimate_intermediate(files):
+    # A merge that is not cached yet needs about the size of its inputs in the cache folder
+    from intermediates import intermediate_cache
+    if intermediate_cache.lookup(intermediate_cache.key_for(files)):
+        return {}
+    return {os.path.join(intermediate_cache.folder, "merge.mp4"): sum(_size(f) for f in files)}
+
+
+def by_disk(estimates):
+    needs = {}
+    folders = {}
+    for path, size in estimates.items():
+        device, folder = disk_of(os.path.dirname(path))
+        needs[device] = needs.get(device, 0) + size
+        folders.setdefault(device, folder)
+    return needs, folders
+
+
+def _gb(value):
+    return f"{value / 1024 ** 3:.1f} GB"
+
+
+# Space planning for one batch. check() compares the whole batch with the free space of every
+# disk it writes to; reserve() holds a node back while the disk is too full for it right now.
+class DiskBudget:
+    def __init__(self, margin=SAFETY_MARGIN):
+        self.margin = margin
+        self.estimates = {}
+        self.reserved = {}
+        self._lock = threading.Lock()
+        self.error = None
+
+    def estimate(self, key, estimates):
+        self.estimates[key] = by_disk(estimates)
+
+    def check(self):
+        totals = {}
+        folders = {}
+        for needs, node_folders in self.estimates.values():
+            for device, size in needs.items():
+                totals[device] = totals.get(device, 0) + size
+                folders.setdefault(device, node_folders[device])
+        problems = []
+        for device, need in totals.items():
+            free = free_bytes(folders[device])
+            if free is not None and need + self.margin > free:
+                problems.append(f"Not enough space in {folders[device]}: the exports need about "
+                                f"{_gb(need)} and only {_gb(free)} is free")
+        self.error = "; ".join(problems) or None
+        return not problems
+
+    def reserve(self, key):
+        # True when the node fits next to what running nodes are still going to write
+        needs, folders = self.estimates.get(key, ({}, {}))
+        with self._lock:
+            for device, size in needs.items():
+                free = free_bytes(folders[device])
+                in_flight = sum(n.get(device, 0) for n, _ in self.reserved.values())
+                if free is not None and size + in_flight + self.margin > free:
+                    return False
+            self.reserved[key] = (needs, folders)
+        return True
+
+    def release(self, key):
+        with self._lock:
+            self.reserved.pop(key, None)
+
+    def holding(self):
+        with self._lock:
+            return bool(self.reserved)
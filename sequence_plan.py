@@ -0,0 +1,126 @@
+import os
+import re
+from itertools import product
+
+_PART = re.compile(r"([VHI])\s*(\*|[\d,\s-]+)", re.IGNORECASE)
+
+
+def _parse_spec(spec, size):
+    spec = spec.replace(" ", "")
+    if spec == "*":
+        return range(size)
+    picked = []
+    for chunk in filter(None, spec.split(",")):
+        if "-" in chunk:
+            start, _, end = chunk.partition("-")
+            picked.extend(range(int(start), min(int(end), size - 1) + 1))
+        elif int(chunk) < size:
+            picked.append(int(chunk))
+    return sorted(set(picked))
+
+
+def parse_pattern(pattern, sizes):
+    # "V0-4H*", "V*H1I0", "V0,2H1-3": missing letters mean "all"
+    pattern = pattern.strip()
+    if not pattern:
+        return None
+    consumed = "".join(m.group(0) for m in _PART.finditer(pattern)).replace(" ", "")
+    if consumed.upper() != pattern.replace(" ", "").upper():
+        raise ValueError(f"Invalid sequence pattern: {pattern}")
+    parts = {letter: range(sizes[letter]) for letter in "VHI"}
+    for match in _PART.finditer(pattern):
+        letter = match.group(1).upper()
+        parts[letter] = _parse_spec(match.group(2), sizes[letter])
+    return parts["V"], parts["H"], parts["I"]
+
+
+# The full Variant x Hook x Intro matrix as an index space. H0 is the sequence without a
+# hook and, when no intros are loaded, the I dimension has one slot meaning "no intro".
+# Nothing is built until a selection is iterated, so counts and size estimates are instant.
+class SequencePlan:
+    def __init__(self, variants, hooks, intros):
+        self.variants = [list(v) for v in variants]
+        self.hooks = [None] + list(hooks)
+        self.intros = list(intros) or [None]
+        self.has_intros = bool(intros)
+        self._sizes = {}
+
+    @property
+    def sizes(self):
+        return {"V": len(self.variants), "H": len(self.hooks), "I": len(self.intros)}
+
+    def _usable(self, vs, hs):
+        # Hook slots without a clip are skipped instead of duplicating H0, and empty Tips
+        # compilations keep their V number but give no sequences
+        return [v for v in vs if self.variants[v]], [h for h in hs if h == 0 or self.hooks[h]]
+
+    def __len__(self):
+        # Only the sequences select() can return
+        vs, hs = self._usable(range(len(self.variants)), range(len(self.hooks)))
+        return len(vs) * len(hs) * len(self.intros)
+
+    def files_for(self, v, h, i):
+        files = list(self.variants[v])
+        if self.hooks[h]:
+            files = [self.hooks[h]] + files
+        if self.intros[i]:
+            files = [self.intros[i]] + files
+        return files
+
+    def select(self, patterns):
+        # Union of the patterns (separated by ';', '|' or spaces), without duplicates
+        selections = []
+        for pattern in re.split(r"\s*[;|]\s*|\s+(?=[Vv])", patterns.strip()):
+            parsed = parse_pattern(pattern, self.sizes)
+            if parsed:
+                vs, hs, is_ = parsed
+                vs, hs = self._usable(vs, hs)
+                selections.append((vs, hs, is_))
+        return Selection(self, selections)
+
+    def _clip_size(self, path):
+        if path not in self._sizes:
+            try:
+                self._sizes[path] = os.path.getsize(path)
+            except OSError:
+                self._sizes[path] = 0
+        return self._sizes[path]
+
+    def _size_of(self, dimension, index):
+        if dimension == "V":
+            return sum(self._clip_size(f) for f in self.variants[index])
+        item = (self.hooks if dimension == "H" else self.intros)[index]
+        return self._clip_size(item) if item else 0
+
+
+class Selection:
+    def __init__(self, plan, selections):
+        self.plan = plan
+        self.selections = selections
+
+    def __iter__(self):
+        seen = set()
+        for vs, hs, is_ in self.selections:
+            for combo in product(vs, hs, is_):
+                if len(self.selections) > 1:
+                    if combo in seen:
+                        continue
+                    seen.add(combo)
+                yield combo
+
+    def __len__(self):
+        if len(self.selections) == 1:
+            vs, hs, is_ = self.selections[0]
+            return len(vs) * len(hs) * len(is_)
+        return sum(1 for _ in self)
+
+    def estimated_bytes(self):
+        # Stream-copied sequences are about as large as their inputs put together
+        plan = self.plan
+        if len(self.selections) != 1:
+            return sum(sum(plan._clip_size(f) for f in plan.files_for(*combo)) for combo in self)
+        vs, hs, is_ = self.selections[0]
+        v_total = sum(plan._size_of("V", v) for v in vs)
+        h_total = sum(plan._size_of("H", h) for h in hs)
+        i_total = sum(plan._size_of("I", i) for i in is_)
+        return v_total * len(hs) * len(is_) + h_total * len(vs) * len(is_) + i_total * len(vs) * len(hs)
@@ -0,0 +1,136 @@
+import os
+import hashlib
+import threading
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+THUMB_SIZE = (64, 36)
+DEFAULT_MAX_BYTES = 32 * 1024 ** 2
+DEFAULT_WORKERS = 2
+
+
+def poster_position(duration):
+    # A little way in, so fades from black are skipped; short clips use their middle
+    return max(0.0, min(1.0, duration / 2.0))
+
+
+def extract_thumbnail(path, out_path, position=0.0):
+    # Input seek plus skip_frame nokey: only the keyframe the seek lands on is decoded
+    from utils import get_ffmpeg_path
+    width, height = THUMB_SIZE
+    cmd = [get_ffmpeg_path(), "-y", "-hide_banner", "-loglevel", "error",
+           "-skip_frame", "nokey", "-noaccurate_seek", "-ss", f"{position:.3f}", "-i", path,
+           "-an", "-frames:v", "1",
+           "-vf", f"scale={width}:{height}:force_original_aspect_ratio=decrease",
+           "-f", "image2", "-c:v", "png", out_path]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    return result.returncode == 0 and os.path.isfile(out_path) and os.path.getsize(out_path) > 0
+
+
+# Poster frames on disk, keyed by the clip's content so a re-rendered clip gets a new one.
+# Extraction runs on a small worker pool; least recently used files are evicted past max_bytes.
+class ThumbnailCache:
+    def __init__(self, folder=None, max_bytes=DEFAULT_MAX_BYTES, workers=DEFAULT_WORKERS):
+        self._folder = folder
+        self.max_bytes = max_bytes
+        self._entries = None
+        self._lock = threading.Lock()
+        self._waiting = {}
+        self._failed = set()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnails")
+
+    @property
+    def folder(self):
+        if self._folder is None:
+            from utils import user_cache_dir
+            self._folder = str(user_cache_dir("thumbnails"))
+        return self._folder
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        entries = []
+        for entry in os.scandir(self.folder):
+            if entry.is_file() and entry.name.endswith(".png"):
+                st = entry.stat()
+                entries.append((st.st_atime, entry.name[:-4], entry.path, st.st_size))
+        self._entries = OrderedDict((key, (path, size)) for _, key, path, size in sorted(entries))
+
+    def key_for(self, path):
+        from fingerprints import clip_fingerprint
+        fingerprint = clip_fingerprint(path)
+        if fingerprint is None:
+            return None
+        return hashlib.sha256(f"{fingerprint}|{THUMB_SIZE}".encode("utf-8")).hexdigest()[:32]
+
+    def lookup(self, key):
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry and os.path.isfile(entry[0]):
+                self._entries.move_to_end(key)
+                return entry[0]
+            self._entries.pop(key, None)
+            return None
+
+    def request(self, path, callback):
+        # Never blocks: fingerprinting, lookup and extraction all happen on the pool, which
+        # calls callback(image_path or None) from a worker thread
+        path = os.path.abspath(path)
+        with self._lock:
+            if path in self._waiting:
+                self._waiting[path].append(callback)
+                return
+            self._waiting[path] = [callback]
+        self._pool.submit(self._build, path)
+
+    def _build(self, path):
+        image_path = None
+        try:
+            key = self.key_for(path)
+            if key is not None and key not in self._failed:
+                image_path = self.lookup(key) or self._extract(key, path)
+        except Exception:
+            image_path = None
+        with self._lock:
+            callbacks = self._waiting.pop(path, [])
+        for callback in callbacks:
+            callback(image_path)
+
+    def _extract(self, key, path):
+        from probes import probe_cache
+        final_path = os.path.join(self.folder, f"{key}.png")
+        tmp_path = os.path.join(self.folder, f".{key}.{os.getpid()}.part.png")
+        try:
+            duration = probe_cache.get(path)["duration"]
+            if not extract_thumbnail(path, tmp_path, poster_position(duration)):
+                with self._lock:
+                    self._failed.add(key)
+                return None
+            os.replace(tmp_path, final_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        with self._lock:
+            self._load()
+            self._entries[key] = (final_path, os.path.getsize(final_path))
+            self._evict(keep=key)
+        return final_path
+
+    def _evict(self, keep):
+        total = sum(size for _, size in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            path, size = self._entries.pop(key)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+thumbnail_cache = ThumbnailCache()
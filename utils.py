@@ -15,18 +15,83 @@ def resource_path(relative_path):
     return str(_application_root() / relative_path)
 
 
+def user_cache_dir(*parts):
+    if os.name == "nt":
+        base = Path(os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local")
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+    else:
+        base = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    folder = base.joinpath("LegoPy", *parts)
+    folder.mkdir(parents=True, exist_ok=True)
+    return folder
+
+
+def user_data_dir(*parts):
+    if os.name == "nt":
+        base = Path(os.environ.get("APPDATA") or Path.home() / "AppData" / "Roaming")
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Application Support"
+    else:
+        base = Path(os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share")
+    folder = base.joinpath("LegoPy", *parts)
+    folder.mkdir(parents=True, exist_ok=True)
+    return folder
+
+
+def load_project_setting(code, key, default=None):
+    return load_settings().get("projects", {}).get(code or "", {}).get(key, default)
+
+
+def save_project_setting(code, key, value):
+    projects = load_settings().get("projects", {})
+    projects.setdefault(code or "", {})[key] = value
+    save_setting("projects", projects)
+
+
+def load_settings():
+    import json
+    try:
+        with open(user_data_dir() / "settings.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_setting(key, value):
+    import json
+    settings = load_settings()
+    settings[key] = value
+    target = user_data_dir() / "settings.json"
+    with open(f"{target}.tmp", "w", encoding="utf-8") as f:
+        json.dump(settings, f, indent=1)
+    os.replace(f"{target}.tmp", target)
+
+
+def _toolchain_folders():
+    # The frozen build ships ffmpeg-bin next to the executable, so launches extract nothing and
+    # ffmpeg runs from there; a source checkout uses its own ffmpeg-bin folder
+    candidates = []
+    if getattr(sys, "frozen", False):
+        candidates.append(Path(sys.executable).resolve().parent / "ffmpeg-bin")
+    candidates.append(_application_root() / "ffmpeg-bin")
+    return candidates
+
+
 def _resolve_ffmpeg_binary(binary_name):
     exe = f"{binary_name}.exe" if os.name == "nt" else binary_name
     env_override = os.environ.get(f"{binary_name.upper()}_PATH")
     if env_override and Path(env_override).is_file():
         return str(Path(env_override))
-    bundle_candidate = _application_root() / "ffmpeg-bin" / exe
-    if bundle_candidate.is_file():
-        return str(bundle_candidate)
+    folders = _toolchain_folders()
+    for folder in folders:
+        if (folder / exe).is_file():
+            return str(folder / exe)
     system_candidate = shutil.which(exe)
     if system_candidate:
         return system_candidate
-    raise FileNotFoundError(f"{exe} not found. Expected it at {bundle_candidate}")
+    expected = " or ".join(str(folder / exe) for folder in folders)
+    raise FileNotFoundError(f"{exe} not found. Expected it at {expected} or on the PATH")
 
 
 
@@ -42,76 +107,328 @@ def get_ffprobe_path():
     return _resolve_ffmpeg_binary("ffprobe")
 
 
-def get_video_resolution(filepath):
+def probe_video(filepath):
     ffprobe_path = get_ffprobe_path()
     cmd = [
-        ffprobe_path, "-v", "error", "-select_streams", "v:0",
-        "-show_entries", "stream=width,height",
-        "-of", "csv=s=x:p=0", filepath
+        ffprobe_path, "-v", "error",
+        "-show_entries", "format=duration,bit_rate:stream=codec_type,width,height,avg_frame_rate,sample_rate",
+        "-of", "json", filepath
     ]
+    info = {"duration": 0.0, "resolution": "", "bit_rate": 0, "fps": 0.0, "sample_rate": 0}
     try:
+        import json
         result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        res = result.stdout.strip()
-        if "x" in res:
-            return res
-    except Exception:
+        if result.returncode != 0:
+            return info
+        data = json.loads(result.stdout or "{}")
+        fmt = data.get("format", {})
+        info["duration"] = float(fmt.get("duration") or 0.0)
+        info["bit_rate"] = int(fmt.get("bit_rate") or 0)
+        for stream in data.get("streams", []):
+            if stream.get("codec_type") == "video" and not info["resolution"]:
+                if stream.get("width") and stream.get("height"):
+                    info["resolution"] = f"{stream['width']}x{stream['height']}"
+                num, _, den = (stream.get("avg_frame_rate") or "0/1").partition("/")
+                if float(den or 1):
+                    info["fps"] = float(num) / float(den or 1)
+            elif stream.get("codec_type") == "audio" and not info["sample_rate"]:
+                info["sample_rate"] = int(stream.get("sample_rate") or 0)
+    except (OSError, ValueError):
         pass
-    return ""
+    return info
+
+
+def get_video_resolution(filepath):
+    from probes import probe_cache
+    return probe_cache.get(filepath)["resolution"]
 
 
 def get_video_duration(filepath):
-    ffprobe_path = get_ffprobe_path()
-    cmd = [
-        ffprobe_path, "-v", "error", "-show_entries",
-        "format=duration", "-of",
-        "default=noprint_wrappers=1:nokey=1", filepath
-    ]
-    try:
+    from probes import probe_cache
+    return probe_cache.get(filepath)["duration"]
+
+
+# Language tracks are resampled to this rate before they are encoded
+LANGUAGE_SAMPLE_RATE = 48000
+
+_TEE_FORMATS = {".mp4": "mp4", ".m4v": "mp4", ".mov": "mov", ".mkv": "matroska"}
+
+
+def _part_path(path):
+    folder, name = os.path.split(path)
+    return os.path.join(folder, f".{name}.part")
+
+
+MP4_LAYOUTS = {"standard": "Standard", "faststart": "Fast start", "fragmented": "Fragmented"}
+
+
+def predict_moov_size(duration, fps, sample_rate):
+    # Upper bound for the moov atom of a stream-copied MP4: per video sample a size, a
+    # composition offset, a time-to-sample entry, a sync flag and a chunk offset (32 bytes);
+    # per AAC frame (1024 samples) a size, a time entry and a chunk offset (20 bytes)
+    if not duration or not fps:
+        return 0
+    video_samples = duration * fps
+    audio_samples = duration * sample_rate / 1024 if sample_rate else 0
+    return int((16384 + video_samples * 32 + audio_samples * 20) * 1.1)
+
+
+def _mp4_options(layout, duration=0, fps=0, sample_rate=0):
+    # Muxer options for the chosen layout. Fast start reserves a predicted moov size so the
+    # index is written in front of the media without the second pass +faststart needs.
+    if layout == "faststart":
+        size = predict_moov_size(duration, fps, sample_rate)
+        return {"moov_size": str(size)} if size else {"movflags": "+faststart"}
+    if layout == "faststart_rewrite":
+        return {"movflags": "+faststart"}
+    if layout == "fragmented":
+        return {"movflags": "+frag_keyframe+empty_moov+default_base_moof"}
+    return {}
+
+
+def _stream_info(file_list):
+    # Total duration with the highest frame and sample rate of any clip, so the reserved moov
+    # space is an upper bound even when a later clip has more samples per second than the first
+    from probes import probe_cache
+    probes = [probe_cache.get(f) for f in file_list]
+    return (sum(p["duration"] for p in probes), max(p.get("fps") or 0 for p in probes),
+            max(p.get("sample_rate") or 0 for p in probes))
+
+
+def _output_target(output_path, copies=None, muxer_options=None):
+    # Output arguments for one ffmpeg output. Every file is written as a .part next to its final
+    # name, on the same filesystem, and renamed into place once ffmpeg succeeded. With extra
+    # copies the tee muxer writes the same packets to every destination.
+    muxer_options = muxer_options or {}
+    fmt = _TEE_FORMATS.get(os.path.splitext(output_path)[1].lower(), "mp4")
+    if not copies:
+        args = ["-f", fmt]
+        for key, value in muxer_options.items():
+            args += [f"-{key}", value]
+        return args + [_part_path(output_path)], [(_part_path(output_path), output_path)]
+    renames = [(_part_path(path), path) for path in [output_path] + list(copies)]
+    options = "".join(f":{key}={value}" for key, value in muxer_options.items())
+    escaped = (Path(part).as_posix().replace("\\", "\\\\").replace("|", "\\|")
+               .replace("[", "\\[").replace("]", "\\]") for part, _ in renames)
+    return ["-f", "tee", "|".join(f"[f={fmt}{options}]{part}" for part in escaped)], renames
+
+
+def _finish_outputs(renames, ok):
+    for part, final in renames:
+        if ok:
+            os.replace(part, final)
+        else:
+            try:
+                os.remove(part)
+            except OSError:
+                pass
+
+
+def _run_outputs(build_cmd, mp4_layout=None):
+    # build_cmd(layout) -> (cmd, renames). If the predicted moov space turns out too small,
+    # the export is repeated once with a regular +faststart instead of failing.
+    attempts = [mp4_layout, "faststart_rewrite"] if mp4_layout == "faststart" else [mp4_layout]
+    for layout in attempts:
+        cmd, renames = build_cmd(layout)
         result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        # DIAGNOSTICS!
-        with open("duration_diag.log", "a", encoding="utf-8") as f:
-            f.write(f"\n--- Checking: {filepath}\nCMD: {' '.join(cmd)}\nRET: {result.returncode}\nOUT: {result.stdout}\nERR: {result.stderr}\n")
+        _finish_outputs(renames, result.returncode == 0)
+        if result.returncode == 0 or "reserved_moov_size" not in result.stderr:
+            break
+    return cmd, result
+
+
+def _audio_args(audio_filter=None):
+    if not audio_filter:
+        return ["-c:a", "copy"]
+    return ["-af", audio_filter, "-c:a", "aac", "-b:a", "192k"]
+
+
+def _copy_args(audio_filter=None):
+    # Stream copy, or copied video with the audio run once through audio_filter
+    if not audio_filter:
+        return ["-c", "copy"]
+    return ["-c:v", "copy"] + _audio_args(audio_filter)
+
+
+def concat_videos(file_list, output_path, copies=None, mp4_layout=None, audio_filter=None):
+    ffmpeg_path = get_ffmpeg_path()
+    import tempfile
+    duration, fps, sample_rate = _stream_info(file_list) if mp4_layout == "faststart" else (0, 0, 0)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        list_file_path = os.path.join(tmpdir, "files.txt")
+        with open(list_file_path, "w", encoding="utf-8") as f:
+            for file in file_list:
+                f.write(f"file '{format_for_ffmpeg_concat(file)}'\n")
+
+        def build_cmd(layout):
+            target, renames = _output_target(output_path, (copies or {}).get(output_path),
+                                             _mp4_options(layout, duration, fps, sample_rate))
+            return [
+                ffmpeg_path, "-y", "-f", "concat", "-safe", "0",
+                "-i", list_file_path, "-map", "0:v", "-map", "0:a?"
+            ] + _copy_args(audio_filter) + target, renames
+        cmd, result = _run_outputs(build_cmd, mp4_layout)
         if result.returncode != 0:
-            return 0.0
-        return float(result.stdout.strip())
-    except Exception as e:
-        with open("duration_diag.log", "a", encoding="utf-8") as f:
-            f.write(f"\nEXC for {filepath}: {e}\n")
-        return 0.0
+            raise RuntimeError(f"CMD: {' '.join(cmd)}\nRET: {result.returncode}\nSTDOUT:\n{result.stdout}\n\nSTDERR:\n{result.stderr}")
 
 
-def concat_and_trim_videos(file_list, output_path, duration_sec=120):
+def merged_intermediate(file_list, pin=False):
+    # Stream-copied concatenation of file_list, shared through the intermediate cache. With
+    # pin=True it stays on disk until intermediate_cache.release(path), even if other exports
+    # push the cache over its limit meanwhile.
     ffmpeg_path = get_ffmpeg_path()
     import tempfile
+    from intermediates import intermediate_cache
+
+    def build_merged(merged_path):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            list_file_path = os.path.join(tmpdir, "files.txt")
+            with open(list_file_path, "w", encoding="utf-8") as f:
+                for file in file_list:
+                    f.write(f"file '{format_for_ffmpeg_concat(file)}'\n")
+            cmd_concat = [
+                ffmpeg_path, "-y", "-f", "concat", "-safe", "0",
+                "-i", list_file_path, "-c", "copy", merged_path
+            ]
+            result_concat = subprocess.run(cmd_concat, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            # DIAGNOSTICS!
+            with open("ffmpeg_concat_diag.log", "a", encoding="utf-8") as f:
+                f.write(f"\nCMD: {' '.join(cmd_concat)}\nRET: {result_concat.returncode}\nOUT: {result_concat.stdout}\nERR: {result_concat.stderr}\n")
+            if result_concat.returncode != 0:
+                raise RuntimeError(f"Error during concatenation:\n{result_concat.stderr}")
+
+    return intermediate_cache.get_or_build(file_list, build_merged, pin=pin)
+
+
+def concat_and_trim_videos(file_list, output_path, duration_sec=120, extra_outputs=(), copies=None, mp4_layout=None,
+                           audio_filter=None):
+    from intermediates import intermediate_cache
+    # Pinned until ffmpeg is done, so a merge for another export cannot evict it first
+    merged_path = merged_intermediate(file_list, pin=True)
+    try:
+        _trim_merged(merged_path, file_list, output_path, duration_sec, extra_outputs, copies, mp4_layout, audio_filter)
+    finally:
+        intermediate_cache.release(merged_path)
+
+
+def _trim_merged(merged_path, file_list, output_path, duration_sec, extra_outputs, copies, mp4_layout, audio_filter):
+    ffmpeg_path = get_ffmpeg_path()
+    total, fps, sample_rate = _stream_info(file_list) if mp4_layout == "faststart" else (0, 0, 0)
+
+    # Every (duration_sec, output_path) target is cut from one read of the merged file
+    def build_cmd(layout):
+        cmd = [ffmpeg_path, "-y", "-i", merged_path]
+        renames = []
+        for target_sec, target_path in [(duration_sec, output_path)] + list(extra_outputs):
+            options = _mp4_options(layout, min(total, target_sec), fps, sample_rate)
+            target, target_renames = _output_target(target_path, (copies or {}).get(target_path), options)
+            cmd += ["-map", "0:v", "-map", "0:a?", "-t", str(target_sec)] + _copy_args(audio_filter) + target
+            renames += target_renames
+        return cmd, renames
+    cmd_trim, result_trim = _run_outputs(build_cmd, mp4_layout)
+    with open("ffmpeg_trim_diag.log", "a", encoding="utf-8") as f:
+        f.write(f"\nCMD: {' '.join(cmd_trim)}\nRET: {result_trim.returncode}\nOUT: {result_trim.stdout}\nERR: {result_trim.stderr}\n")
+    if result_trim.returncode != 0:
+        raise RuntimeError(f"Error during trimming:\n{result_trim.stderr}")
+
+
+def concat_to_aspect_ratios(file_list, outputs, policy="crop", language_outputs=(), copies=None, mp4_layout=None,
+                            audio_filter=None):
+    # Decodes the concatenated clips once and writes every (aspect, output_path) from one
+    # filter graph; an aspect that matches the source (or None) is stream-copied instead of
+    # re-encoded. Each (language, audio_files, output_path, aspect) puts that language's audio
+    # under the video of that aspect's output, every audio clip padded or cut to the length of
+    # its video clip.
+    from aspect_ratios import build_aspect_graph, ENCODE_ARGS
+    ffmpeg_path = get_ffmpeg_path()
+    import tempfile
+    aspects = [aspect for aspect, _ in outputs if aspect]
+    graph, labels = None, {}
+    extra_maps = {}
+    for *_, aspect in language_outputs:
+        if aspect:
+            extra_maps[aspect] = extra_maps.get(aspect, 0) + 1
+    if aspects:
+        resolution = get_video_resolution(file_list[0])
+        if not resolution:
+            raise RuntimeError(f"Could not read the resolution of {file_list[0]}")
+        graph, labels = build_aspect_graph(resolution, aspects, policy, extra_maps)
+    total, fps, sample_rate = _stream_info(file_list) if mp4_layout == "faststart" else (0, 0, 0)
+    chains = [graph] if graph else []
+    audio_inputs = []
+    for language, audio_files, _, _ in language_outputs:
+        parts = []
+        for j, (clip, audio) in enumerate(zip(file_list, audio_files)):
+            index = 1 + len(audio_inputs) // 2
+            audio_inputs += ["-i", audio]
+            chains.append(f"[{index}:a]aresample={LANGUAGE_SAMPLE_RATE},apad,atrim=0:{get_video_duration(clip):.3f},"
+                          f"asetpts=PTS-STARTPTS[a{language}{j}]")
+            parts.append(f"[a{language}{j}]")
+        chains.append(f"{''.join(parts)}concat=n={len(parts)}:v=0:a=1[a{language}]")
     with tempfile.TemporaryDirectory() as tmpdir:
         list_file_path = os.path.join(tmpdir, "files.txt")
         with open(list_file_path, "w", encoding="utf-8") as f:
             for file in file_list:
                 f.write(f"file '{format_for_ffmpeg_concat(file)}'\n")
-        merged_path = os.path.join(tmpdir, "merged.mp4")
-        cmd_concat = [
-            ffmpeg_path, "-y", "-f", "concat", "-safe", "0",
-            "-i", list_file_path, "-c", "copy", merged_path
-        ]
-        result_concat = subprocess.run(cmd_concat, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        # DIAGNOSTICS!
-        with open("ffmpeg_concat_diag.log", "a", encoding="utf-8") as f:
-            f.write(f"\nCMD: {' '.join(cmd_concat)}\nRET: {result_concat.returncode}\nOUT: {result_concat.stdout}\nERR: {result_concat.stderr}\n")
-        if result_concat.returncode != 0:
-            raise RuntimeError(f"Error during concatenation:\n{result_concat.stderr}")
-
-        cmd_trim = [
-            ffmpeg_path, "-y",
-            "-i", merged_path,
-            "-t", str(duration_sec),
-            "-c", "copy",
-            output_path
-        ]
-        result_trim = subprocess.run(cmd_trim, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        with open("ffmpeg_trim_diag.log", "a", encoding="utf-8") as f:
-            f.write(f"\nCMD: {' '.join(cmd_trim)}\nRET: {result_trim.returncode}\nOUT: {result_trim.stdout}\nERR: {result_trim.stderr}\n")
-        if result_trim.returncode != 0:
-            raise RuntimeError(f"Error during trimming:\n{result_trim.stderr}")
+
+        def build_cmd(layout):
+            cmd = [ffmpeg_path, "-y", "-f", "concat", "-safe", "0", "-i", list_file_path] + audio_inputs
+            if chains:
+                cmd += ["-filter_complex", ";".join(chains)]
+            renames = []
+            for aspect, output_path in outputs:
+                options = _mp4_options(layout, total, fps, sample_rate)
+                target, target_renames = _output_target(output_path, (copies or {}).get(output_path), options)
+                renames += target_renames
+                if labels.get(aspect):
+                    cmd += ["-map", labels[aspect], "-map", "0:a?"] + ENCODE_ARGS + _audio_args(audio_filter) + target
+                else:
+                    cmd += ["-map", "0:v", "-map", "0:a?"] + _copy_args(audio_filter) + target
+            used = {}
+            for language, _, output_path, aspect in language_outputs:
+                options = _mp4_options(layout, total, fps, LANGUAGE_SAMPLE_RATE)
+                target, target_renames = _output_target(output_path, (copies or {}).get(output_path), options)
+                renames += target_renames
+                if labels.get(aspect):
+                    # A reframed format has no stream to copy, so its language versions are encoded too
+                    k = used[aspect] = used.get(aspect, -1) + 1
+                    video = ["-map", labels[(aspect, k)]] + ENCODE_ARGS
+                else:
+                    video = ["-map", "0:v", "-c:v", "copy"]
+                cmd += video + ["-map", f"[a{language}]", "-c:a", "aac", "-b:a", "192k"] + target
+            return cmd, renames
+        cmd, result = _run_outputs(build_cmd, mp4_layout)
+        if result.returncode != 0:
+            raise RuntimeError(f"CMD: {' '.join(cmd)}\nRET: {result.returncode}\nSTDOUT:\n{result.stdout}\n\nSTDERR:\n{result.stderr}")
+
+
+def parse_duration_targets(text):
+    # "2:00, 1:30, 60" -> [120, 90, 60], longest first
+    targets = set()
+    for part in text.replace(";", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        minutes, _, seconds = part.rpartition(":")
+        value = int(minutes or 0) * 60 + int(seconds)
+        if value <= 0:
+            raise ValueError(f"Invalid duration: {part}")
+        targets.add(value)
+    if not targets:
+        raise ValueError("No duration given")
+    return sorted(targets, reverse=True)
+
+
+def format_duration_target(seconds):
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def duration_folder(seconds):
+    # 120 -> "2min", 90 -> "1min30s", 45 -> "45s"
+    minutes, rest = divmod(int(seconds), 60)
+    if not minutes:
+        return f"{rest}s"
+    return f"{minutes}min{rest}s" if rest else f"{minutes}min"
 
 
 def ensure_folder_for_export(first_file_path, folder_name=None):
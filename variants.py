@@ -0,0 +1,94 @@
+import random
+from itertools import islice
+
+VARIANT_MODES = ("Rotations", "Balanced (Latin square)", "Random with rules")
+
+
+def rotation_orders(n):
+    for i in range(n):
+        yield [(i + j) % n for j in range(n)]
+
+
+def latin_square_orders(n):
+    # Williams design: every clip takes every position equally often and directly follows every
+    # other clip equally often. For an even number of clips that takes n rows, with each ordered
+    # pair adjacent exactly once. An odd number has no such square, so the n mirrored rows follow
+    # and the full 2n rows have each ordered pair adjacent exactly twice; stopping after n rows
+    # repeats some pairs.
+    if n < 1:
+        return
+    first = [0]
+    low, high = 1, n - 1
+    while len(first) < n:
+        first.append(low)
+        low += 1
+        if len(first) < n:
+            first.append(high)
+            high -= 1
+    for i in range(n):
+        yield [(c + i) % n for c in first]
+    if n % 2:
+        for i in range(n):
+            yield [(c + i) % n for c in reversed(first)]
+
+
+def _pairs(order, depth):
+    end = len(order) if depth is None else min(len(order), depth)
+    return {frozenset(order[j:j + 2]) for j in range(end - 1)}
+
+
+def _random_walk(n, rng, used_pairs, depth):
+    remaining = list(range(n))
+    rng.shuffle(remaining)
+    order = [remaining.pop()]
+    while remaining and (depth is None or len(order) < depth):
+        allowed = [c for c in remaining if frozenset((order[-1], c)) not in used_pairs]
+        if not allowed:
+            return None
+        pick = rng.choice(allowed)
+        remaining.remove(pick)
+        order.append(pick)
+    return order + remaining
+
+
+def constrained_orders(n, distinct_prefix=1, pair_depth=None, seed=None, max_attempts=500):
+    # Random orders where no two variants share their first `distinct_prefix` clips and no
+    # unordered pair of clips is adjacent twice within the first `pair_depth` positions
+    # (None = the whole order). Stops once no further order satisfies the rules.
+    rng = random.Random(seed)
+    used_prefixes = set()
+    used_pairs = set()
+    seen = set()
+    while True:
+        for _ in range(max_attempts):
+            order = _random_walk(n, rng, used_pairs, pair_depth)
+            if order is None:
+                continue
+            key = tuple(order)
+            prefix = key[:distinct_prefix] if distinct_prefix else key
+            if key in seen or prefix in used_prefixes:
+                continue
+            break
+        else:
+            return
+        seen.add(key)
+        used_prefixes.add(prefix)
+        used_pairs |= _pairs(order, pair_depth)
+        yield order
+
+
+def generate_variants(files, mode="Rotations", count=None, distinct_prefix=1, pair_depth=None, seed=None):
+    # Lazily yields orderings of `files`; only the requested number is ever built. Without a
+    # count there is one variant per file, or the whole balanced design for the Latin square.
+    files = list(files)
+    n = len(files)
+    if mode == VARIANT_MODES[1]:
+        orders = latin_square_orders(n)
+        if count is None and n % 2:
+            count = 2 * n
+    elif mode == VARIANT_MODES[2]:
+        orders = constrained_orders(n, distinct_prefix=distinct_prefix, pair_depth=pair_depth, seed=seed)
+    else:
+        orders = rotation_orders(n)
+    for order in islice(orders, count if count is not None else n):
+        yield [files[i] for i in order]
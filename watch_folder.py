@@ -0,0 +1,195 @@
+import os
+import re
+import sys
+import time
+import threading
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".mkv", ".avi", ".flv", ".wmv")
+
+# First matching rule wins. A rule matches either the clip's file name or the name of
+# the folder it sits in, so "E123_hook2.mp4" and "hooks/E123_02.mp4" are both hooks.
+NAMING_RULES = [
+    ("intro", re.compile(r"(^|[^a-z])intros?([^a-z]|$)|_I\d+$", re.IGNORECASE)),
+    ("hook", re.compile(r"(^|[^a-z])hooks?([^a-z]|$)|_H\d+$", re.IGNORECASE)),
+    ("tip", re.compile(r"(^|[^a-z])tips?([^a-z]|$)|_T\d+$", re.IGNORECASE)),
+]
+
+# Folders written by LegoPy itself are never treated as input: these, and every duration
+# cut folder (2min, 1min30s, 45s, ...)
+IGNORED_FOLDERS = {"sequences", "comp1", "comp2"}
+
+
+def classify_clip(path, rules=None):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    parent = os.path.basename(os.path.dirname(path))
+    for role, pattern in rules or NAMING_RULES:
+        if pattern.search(stem) or pattern.search(parent):
+            return role
+    return None
+
+
+def _is_output_folder(name):
+    from library import DURATION_FOLDER
+    return name.lower() in IGNORED_FOLDERS or DURATION_FOLDER.match(name) is not None
+
+
+def _natural_key(path):
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", os.path.basename(path))]
+
+
+def _scan(folder):
+    from languages import is_language_folder
+    found = {}
+    try:
+        entries = list(os.scandir(folder))
+    except OSError:
+        return found
+    for entry in entries:
+        if entry.name.startswith("."):
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            if not _is_output_folder(entry.name) and not is_language_folder(entry.name):
+                found.update(_scan(entry.path))
+        elif entry.name.lower().endswith(VIDEO_EXTENSIONS):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            found[os.path.abspath(entry.path)] = (st.st_size, st.st_mtime_ns)
+    return found
+
+
+class _Inotify:
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watched = set()
+
+    def watch_tree(self, folder):
+        for root, dirs, _ in os.walk(folder):
+            dirs[:] = [d for d in dirs if not _is_output_folder(d) and not d.startswith(".")]
+            if root in self._watched:
+                continue
+            if self._libc.inotify_add_watch(self.fd, os.fsencode(root), self.WATCH_MASK) >= 0:
+                self._watched.add(root)
+
+    def wait(self, timeout):
+        import select
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            while os.read(self.fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+# Reports the settled set of tips, hooks and intros found in the watched folders. A clip
+# only counts once its size and mtime stayed the same for settle_seconds, so files that
+# are still being rendered or copied are not picked up half-written. On Linux inotify
+# wakes the watcher up as soon as something changes; otherwise the folders are polled.
+class FolderWatcher:
+    def __init__(self, folders, on_change, settle_seconds=5.0, poll_interval=2.0, rules=None):
+        self.folders = [os.path.abspath(f) for f in folders]
+        self.on_change = on_change
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.rules = rules
+        self._pending = {}
+        self._settled = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._inotify = None
+
+    def start(self):
+        if sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError):
+                self._inotify = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def uses_inotify(self):
+        return self._inotify is not None
+
+    def _wait(self):
+        timeout = self.poll_interval
+        if self._pending:
+            timeout = min(timeout, self.settle_seconds / 2)
+        if self._inotify is None:
+            self._stop.wait(timeout)
+            return
+        for folder in self.folders:
+            self._inotify.watch_tree(folder)
+        # Without pending files we can sleep until the kernel reports a change
+        self._inotify.wait(timeout if self._pending else max(timeout, 30.0))
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                if self._refresh():
+                    self.on_change(self.snapshot())
+                self._wait()
+        finally:
+            if self._inotify is not None:
+                self._inotify.close()
+
+    def _refresh(self):
+        now = time.monotonic()
+        current = {}
+        for folder in self.folders:
+            current.update(_scan(folder))
+        changed = False
+        for path in list(self._settled):
+            if path not in current:
+                del self._settled[path]
+                changed = True
+        for path, stat in current.items():
+            # A clip being overwritten keeps its old entry until the new render settles
+            if self._settled.get(path) == stat:
+                continue
+            seen = self._pending.get(path)
+            if seen is None or seen[0] != stat:
+                self._pending[path] = (stat, now)
+            elif now - seen[1] >= self.settle_seconds and stat[0] > 0:
+                self._settled[path] = stat
+                del self._pending[path]
+                changed = True
+        for path in list(self._pending):
+            if path not in current:
+                del self._pending[path]
+        return changed
+
+    def snapshot(self):
+        from languages import language_tracks
+        roles = {"tip": [], "hook": [], "intro": []}
+        tracks = language_tracks(self._settled)
+        for path in self._settled:
+            if path in tracks:
+                continue
+            role = classify_clip(path, self.rules)
+            if role:
+                roles[role].append(path)
+        return {role: sorted(paths, key=_natural_key) for role, paths in roles.items()}